@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the latency of the user lookups behind the typeahead fields.
+
+    $ python benchmarks/user_lookup.py --users 100000
+
+Each keystroke of a few names is looked up with a leading-wildcard ILIKE
+scan of a scratch table and with the in-process user search index. When
+`--db-uri` points to a PostgreSQL database, the lookup is also timed
+against the trigram indexes, ranked by similarity.
+"""
+import random
+import statistics
+import string
+import time
+import uuid
+
+import click
+from sqlalchemy import create_engine, text
+
+from chaoshubdashboard.dashboard.search import UserSearchIndex
+
+QUERIES = ["j", "ja", "jan", "jane", "jane d", "smi", "smith", "x9q"]
+
+
+def make_users(count: int) -> list:
+    first = ["jane", "john", "alice", "bob", "carol", "dave", "erin", "frank"]
+    last = ["smith", "doe", "martin", "garcia", "lee", "brown", "wilson"]
+    users = []
+    for _ in range(count):
+        (given, family) = (random.choice(first), random.choice(last))
+        suffix = "".join(random.choices(string.ascii_lowercase, k=4))
+        users.append({
+            "account_id": uuid.uuid4().hex,
+            "username": "{}{}{}".format(given[0], family, suffix),
+            "fullname": "{} {}".format(given.title(), family.title())
+        })
+    return users
+
+
+def timed(lookup, queries: list, repeat: int = 5) -> list:
+    """
+    Median latency of each lookup, in milliseconds.
+    """
+    latencies = []
+    for q in queries:
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            lookup(q)
+            durations.append(time.perf_counter() - started)
+        latencies.append(statistics.median(durations) * 1000)
+    return latencies
+
+
+def bench_database(db_uri: str, users: list) -> dict:
+    engine = create_engine(db_uri)
+    is_pg = engine.dialect.name == 'postgresql'
+    results = {}
+
+    with engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS bench_user_info"))
+        conn.execute(text(
+            "CREATE TABLE bench_user_info (account_id CHAR(32) PRIMARY KEY, "
+            "username VARCHAR, fullname VARCHAR)"))
+        conn.execute(text(
+            "INSERT INTO bench_user_info VALUES "
+            "(:account_id, :username, :fullname)"), users)
+        conn.execute(text(
+            "CREATE INDEX bench_user_info_username ON bench_user_info "
+            "(username)"))
+        conn.execute(text(
+            "CREATE INDEX bench_user_info_fullname ON bench_user_info "
+            "(fullname)"))
+
+        # the lookups as they were: leading wildcards defeat the btrees
+        scan = text(
+            "SELECT account_id FROM bench_user_info WHERE username LIKE :p "
+            "OR fullname LIKE :p LIMIT 10" if not is_pg else
+            "SELECT account_id FROM bench_user_info WHERE username ILIKE :p "
+            "OR fullname ILIKE :p LIMIT 10")
+        results["ILIKE scan ({})".format(engine.dialect.name)] = timed(
+            lambda q: conn.execute(scan, p="%{}%".format(q)).fetchall(),
+            QUERIES)
+
+        if is_pg:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(
+                "CREATE INDEX bench_user_info_username_trgm ON "
+                "bench_user_info USING gin (username gin_trgm_ops)"))
+            conn.execute(text(
+                "CREATE INDEX bench_user_info_fullname_trgm ON "
+                "bench_user_info USING gin (fullname gin_trgm_ops)"))
+            conn.execute(text("ANALYZE bench_user_info"))
+            ranked = text(
+                "SELECT account_id FROM bench_user_info WHERE username ILIKE "
+                ":p OR fullname ILIKE :p ORDER BY greatest("
+                "similarity(username, :q), similarity(fullname, :q)) DESC "
+                "LIMIT 10")
+            results["pg_trgm ranked"] = timed(
+                lambda q: conn.execute(
+                    ranked, p="%{}%".format(q), q=q).fetchall(), QUERIES)
+
+        conn.execute(text("DROP TABLE bench_user_info"))
+
+    return results
+
+
+@click.command()
+@click.option('--users', default=100000, show_default=True,
+              help='Number of users to look up from.')
+@click.option('--db-uri', envvar='BENCHMARK_DB_URI', default='sqlite://',
+              show_default=True,
+              help='Database the scratch table is created in.')
+def run(users: int, db_uri: str):
+    population = make_users(users)
+
+    results = bench_database(db_uri, population)
+
+    index = UserSearchIndex(refresh_interval=3600)
+    started = time.perf_counter()
+    index.load([
+        (u["account_id"], u["username"], u["fullname"]) for u in population])
+    click.echo("Indexed {} users in {:.0f} ms".format(
+        users, (time.perf_counter() - started) * 1000))
+    results["in-process index"] = timed(index.search, QUERIES)
+
+    click.echo("{:<24}".format("median latency (ms)") + "".join(
+        "{:>9}".format(repr(q)) for q in QUERIES))
+    for (name, latencies) in results.items():
+        click.echo("{:<24}".format(name) + "".join(
+            "{:>9.2f}".format(latency) for latency in latencies))
+
+
+if __name__ == '__main__':
+    run()
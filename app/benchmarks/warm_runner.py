@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the latency of running short experiments by starting the chaostoolkit
+CLI for each of them versus handing them to the warm worker processes of the
+local scheduler.
+
+    $ python benchmarks/warm_runner.py --runs 20 --chaos $(which chaos)
+
+Both runners are given the same experiment, made of a single probe, so that
+what is measured is mostly what it costs to get to run it. As runs come back
+to back here, the first warm run, and the one following the replacement of a
+worker, wait for a new worker to import chaoslib.
+"""
+import os
+import statistics
+import subprocess
+from tempfile import TemporaryDirectory
+import time
+
+import click
+
+# the application's packages import one another, load them as the app does
+import chaoshubdashboard.app  # noqa: F401
+from chaoshubdashboard.experiment.scheduler.local import prepare_run, \
+    write_run_files
+from chaoshubdashboard.experiment.scheduler.output import ExecutionOutput, \
+    RotatingLog
+from chaoshubdashboard.experiment.scheduler.warm import WarmPool
+
+EXPERIMENT = {
+    "title": "benchmark",
+    "description": "A single and fast probe",
+    "method": [
+        {
+            "type": "probe",
+            "name": "path-exists",
+            "provider": {
+                "type": "python",
+                "module": "os.path",
+                "func": "exists",
+                "arguments": {"path": "."}
+            }
+        }
+    ]
+}
+
+CONTEXT = {
+    "org": {"name": "benchmark"},
+    "workspace": {"name": "benchmark"},
+    "experiment": {"payload": EXPERIMENT}
+}
+
+
+def run_cli(chaos: str) -> float:
+    with TemporaryDirectory() as dname:
+        cmd = prepare_run(chaos, CONTEXT, dname)
+        started = time.perf_counter()
+        subprocess.run(
+            cmd, cwd=dname, check=True, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL)
+        return time.perf_counter() - started
+
+
+def run_warm(pool: WarmPool) -> float:
+    with TemporaryDirectory() as dname:
+        (settings_path, experiment_path) = write_run_files(CONTEXT, dname)
+        output = ExecutionOutput(
+            RotatingLog(os.path.join(dname, "output.log")))
+        started = time.perf_counter()
+        worker = pool.acquire()
+        try:
+            journal = worker.run({
+                "dname": dname,
+                "settings_path": settings_path,
+                "experiment_path": experiment_path,
+                "org": None,
+                "workspace": None
+            }, output)
+        finally:
+            pool.release(worker)
+        elapsed = time.perf_counter() - started
+        output.close()
+        if journal is None or journal["status"] != "completed":
+            raise click.ClickException("Warm run failed")
+        return elapsed
+
+
+def report(name: str, durations: list):
+    durations = [d * 1000 for d in durations]
+    click.echo("{:<24}{:>10.1f}{:>10.1f}{:>10.1f}{:>12.1f}".format(
+        name, statistics.median(durations), min(durations), max(durations),
+        sum(durations)))
+
+
+@click.command()
+@click.option('--runs', default=20, show_default=True,
+              help='Number of experiments run by each runner.')
+@click.option('--chaos', default='chaos', show_default=True,
+              help='Path to the chaostoolkit CLI.')
+@click.option('--max-runs', default=50, show_default=True,
+              help='Runs after which a warm worker is replaced.')
+def run(runs: int, chaos: str, max_runs: int):
+    results = {"cli": [run_cli(chaos) for _ in range(runs)]}
+
+    pool = WarmPool(size=1, max_runs=max_runs)
+    started = time.perf_counter()
+    pool.start()
+    click.echo("Started the warm pool in {:.0f} ms".format(
+        (time.perf_counter() - started) * 1000))
+    try:
+        results["warm (max-runs={})".format(max_runs)] = [
+            run_warm(pool) for _ in range(runs)]
+    finally:
+        pool.shutdown()
+
+    click.echo("{:<24}{:>10}{:>10}{:>10}{:>12}".format(
+        "latency (ms)", "median", "min", "max", "total"))
+    for (name, durations) in results.items():
+        report(name, durations)
+
+
+if __name__ == '__main__':
+    run()
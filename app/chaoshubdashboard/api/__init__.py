@@ -1,18 +1,32 @@
 # -*- coding: utf-8 -*-
 from functools import wraps
-from typing import List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from authlib.flask.oauth2 import current_token
 from chaoslib.extension import get_extension
-from flask import abort, request, current_app
+from flask import abort, current_app, jsonify, request
 from chaoshubdashboard.model import db
 import shortuuid
+import simplejson as json
 
 from .services import DashboardService, ExperimentService
 from .types import Experiment, Extension, UserClaim, Workspace
 
 __all__ = ["load_context"]
 
+# expected types of the fields of a chaostoolkit journal, when present
+JOURNAL_FIELDS: Dict[str, Union[type, Tuple[type, ...]]] = {
+    "status": str,
+    "experiment": dict,
+    "start": str,
+    "end": str,
+    "duration": (int, float),
+    "deviated": bool,
+    "steady_states": (dict, type(None)),
+    "run": list,
+    "rollbacks": list
+}
+
 
 def load_context(permissions: Tuple[str, ...] = ('view',)):
     """
@@ -119,6 +133,73 @@ def load_payload():
     return inner
 
 
+def load_batch_payload():
+    """
+    Load a batch of payloads from the request, sent either as a JSON array
+    or as newline-delimited JSON documents.
+
+    Each item is either the decoded document or `None` when it could not be
+    decoded. It is up to the view to validate and report those.
+    """
+    def inner(f):
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            if request.mimetype == "application/x-ndjson":
+                payloads = []
+                data = request.get_data(as_text=True)
+                for line in data.splitlines():
+                    if not line.strip():
+                        continue
+                    try:
+                        payloads.append(json.loads(line))
+                    except ValueError:
+                        payloads.append(None)
+            else:
+                payloads = request.get_json(silent=True)
+
+            if not payloads or not isinstance(payloads, list):
+                m = "Please, provide a list of payloads to this request."
+                r = jsonify({"message": m})
+                r.status_code = 400
+                raise abort(r)
+
+            max_size = current_app.config.get("API_BATCH_MAX_SIZE", 500)
+            if len(payloads) > max_size:
+                m = "Please, provide at most {} payloads per request.".format(
+                    max_size)
+                r = jsonify({"message": m})
+                r.status_code = 413
+                raise abort(r)
+
+            kwargs["payloads"] = payloads
+            return f(*args, **kwargs)
+        return wrapped
+    return inner
+
+
+def validate_execution(payload: Any) -> Optional[str]:
+    """
+    Return why the payload isn't a chaostoolkit journal, or `None` when its
+    fields have the expected types.
+    """
+    if not isinstance(payload, dict):
+        return "Execution must be a JSON object."
+
+    if "status" not in payload:
+        return "Execution must have a status."
+
+    for (field, expected) in JOURNAL_FIELDS.items():
+        if field in payload and not isinstance(payload[field], expected):
+            return "Execution field '{}' has the wrong type.".format(field)
+
+    for field in ("run", "rollbacks"):
+        if not all(isinstance(r, dict) for r in payload.get(field, [])):
+            return "Execution field '{}' must only hold objects.".format(
+                field)
+
+    return None
+
+
 def load_hub_extension(required: bool = False):
     """
     Lookup the Chaos Hub extension in the payload: experiment, gameday...
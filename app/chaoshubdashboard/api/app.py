@@ -3,11 +3,12 @@ import os
 from typing import Any, Dict
 
 from authlib.flask.oauth2 import ResourceProtector
-from authlib.flask.oauth2.sqla import create_bearer_token_validator
 from flask import current_app, Flask, jsonify
 from flask_caching import Cache
 
 from .model import db, APIAccessToken
+from .tracker import setup_token_usage_tracker
+from .validator import CachingBearerTokenValidator, setup_token_cache
 from .views import api
 
 __all__ = ["setup_service"]
@@ -17,6 +18,7 @@ def setup_service(main_app: Flask, cache: Cache, init_db: bool = True):
     main_app.register_blueprint(
         api, url_prefix='/api/<string:org>/<string:workspace>/experiment')
     setup_oauth2_resource_protector(main_app)
+    setup_token_usage_tracker(main_app)
 
 
 ###############################################################################
@@ -26,6 +28,5 @@ def setup_oauth2_resource_protector(main_app: Flask):
     """
     Configure OAuth2 endpoints protector
     """
-    BearerTokenValidator = create_bearer_token_validator(
-        db.session, APIAccessToken)
-    ResourceProtector.register_token_validator(BearerTokenValidator())
+    setup_token_cache(main_app)
+    ResourceProtector.register_token_validator(CachingBearerTokenValidator())
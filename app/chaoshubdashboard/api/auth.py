@@ -2,6 +2,7 @@
 from typing import Any, Dict
 
 from .model import db, APIAccessToken
+from .validator import evict_cached_token
 
 __all__ = ["revoke_access_token", "set_access_token"]
 
@@ -10,6 +11,7 @@ def set_access_token(access_token: Dict[str, Any]):
     token = APIAccessToken.from_dict(access_token)
     db.session.add(token)
     db.session.commit()
+    evict_cached_token(token.access_token)
 
 
 def revoke_access_token(access_token: str):
@@ -18,3 +20,4 @@ def revoke_access_token(access_token: str):
         token.revoke()
         db.session.add(token)
         db.session.commit()
+    evict_cached_token(access_token)
@@ -9,10 +9,8 @@ from flask_sqlalchemy import SQLAlchemy as SA
 import shortuuid
 from sqlalchemy.sql import func
 from sqlalchemy_json import NestedMutable
-from sqlalchemy_utils import UUIDType
-from sqlalchemy_utils import JSONType as JSONB
 
-from chaoshubdashboard.model import db, get_user_info_secret_key
+from chaoshubdashboard.model import db, get_user_info_secret_key, UUID
 
 __all__ = ["db", "APIAccessToken"]
 
@@ -27,9 +25,9 @@ class APIAccessToken(db.Model):  # type: ignore
     )
 
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
+        UUID(), primary_key=True, default=uuid.uuid4)
     name = db.Column(db.String, nullable=False)
-    account_id = db.Column(UUIDType(binary=False), nullable=False)
+    account_id = db.Column(UUID(), nullable=False)
     last_used_on = db.Column(db.DateTime())
     client_id = db.Column(db.String(48))
     token_type = db.Column(db.String(40))
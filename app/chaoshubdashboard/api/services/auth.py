@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
 from flask import Flask
 
-from chaoshubdashboard.auth import update_access_token
+from typing import List
+
+from chaoshubdashboard.auth import update_access_token, update_access_tokens
 from ..types import AccessToken, UserClaim
 
-__all__ = ["updated_user_access_token"]
+__all__ = ["updated_user_access_token", "updated_user_access_tokens"]
 
 
 def updated_user_access_token(token: AccessToken):
     update_access_token(token)
+
+
+def updated_user_access_tokens(tokens: List[AccessToken]):
+    update_access_tokens(tokens)
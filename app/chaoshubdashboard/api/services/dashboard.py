@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 from typing import List, Optional
 
-from chaoshubdashboard.dashboard import get_workspace, record_activity
+from chaoshubdashboard.dashboard import get_workspace, record_activity, \
+    record_activities
 
 from ..types import Activity, UserClaim, Workspace
 
@@ -19,3 +20,7 @@ def get_context(user_claim: UserClaim, org: str,
 
 def push_activity(activity: Activity):
     record_activity(activity)
+
+
+def push_activities(activities: List[Activity]):
+    record_activities(activities)
@@ -4,7 +4,8 @@ from typing import Any, Dict, List, Optional
 from ..types import UserClaim, Execution, Experiment, Workspace
 
 from chaoshubdashboard.experiment import \
-    get_experiment_in_workspace_for_user, store_experiment, store_execution
+    get_experiment_in_workspace_for_user, store_experiment, store_execution, \
+    store_executions
 
 __all__ = ["get_experiment"]
 
@@ -28,3 +29,10 @@ def create_execution(user_claim: UserClaim, org: str,
                      workspace: str, experiment: str,
                      payload: Dict[str, Any]) -> Execution:
     return store_execution(user_claim, org, workspace, experiment, payload)
+
+
+def create_executions(user_claim: UserClaim, org: str,
+                      workspace: str, experiment: str,
+                      payloads: List[Dict[str, Any]]) -> List[Execution]:
+    return store_executions(
+        user_claim, org, workspace, experiment, payloads)
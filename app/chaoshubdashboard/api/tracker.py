@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timezone
+import threading
+from typing import Dict, Optional, Tuple
+import uuid
+
+from flask import Flask
+
+from .model import db, APIAccessToken
+from .services import AuthService
+
+__all__ = ["TokenUsageTracker", "setup_token_usage_tracker",
+           "get_token_usage_tracker", "shutdown_token_usage_tracker"]
+
+# once this has been set, this shouldn't change so making it global is fair
+_tracker: Optional['TokenUsageTracker'] = None
+
+# token identifier -> (access token, account identifier, last used on)
+TokenUsages = Dict[uuid.UUID, Tuple[str, uuid.UUID, datetime]]
+
+
+class TokenUsageTracker(threading.Thread):
+    """
+    Keep the last time each access token was used in memory and write them
+    all to the database every `flush_interval` seconds.
+
+    Only the most recent usage of a token is kept between two flushes so
+    a token used many times costs a single update.
+    """
+    def __init__(self, app: Flask, flush_interval: float = 10.0) -> None:
+        threading.Thread.__init__(
+            self, name="token-usage-tracker", daemon=True)
+        self.app = app
+        self.flush_interval = flush_interval
+        self.usages: TokenUsages = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def track(self, token: APIAccessToken, used_on: datetime = None):
+        """
+        Remember the token was used, now unless `used_on` is given.
+        """
+        with self.lock:
+            self.usages[token.id] = (
+                token.access_token, token.account_id,
+                used_on or datetime.utcnow())
+
+    def shutdown(self, timeout: float = None):
+        """
+        Write all pending usages and terminate the tracker.
+        """
+        self.stopped.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self.stopped.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            usages, self.usages = self.usages, {}
+
+        if not usages:
+            return
+
+        with self.app.app_context():
+            try:
+                db.session.bulk_update_mappings(APIAccessToken, [
+                    {"id": token_id, "last_used_on": used_on}
+                    for (token_id, (_, _, used_on)) in usages.items()
+                ])
+                db.session.commit()
+
+                AuthService.updated_user_access_tokens([
+                    {
+                        "access_token": access_token,
+                        "account_id": str(account_id),
+                        "last_used": used_on.replace(
+                            tzinfo=timezone.utc).timestamp()
+                    }
+                    for (access_token, account_id, used_on) in
+                    usages.values()
+                ])
+            except Exception:
+                db.session.rollback()
+                self.app.logger.error(
+                    "Failed to update the usage of {} tokens".format(
+                        len(usages)), exc_info=True)
+            finally:
+                db.session.remove()
+
+
+def setup_token_usage_tracker(app: Flask) -> Optional[TokenUsageTracker]:
+    """
+    Start tracking token usages in the background, unless
+    `TOKEN_USAGE_FLUSH_INTERVAL` is zero in which case they are written
+    synchronously.
+    """
+    global _tracker
+
+    shutdown_token_usage_tracker()
+
+    interval = app.config.get("TOKEN_USAGE_FLUSH_INTERVAL", 10.0)
+    if not interval:
+        return None
+
+    _tracker = TokenUsageTracker(app, flush_interval=interval)
+    _tracker.start()
+    return _tracker
+
+
+def get_token_usage_tracker() -> Optional[TokenUsageTracker]:
+    """
+    Return the running token usage tracker, if any.
+    """
+    return _tracker
+
+
+def shutdown_token_usage_tracker():
+    """
+    Write the pending token usages and stop the tracker. This is
+    synchronous, thus blocking the main process.
+    """
+    global _tracker
+
+    tracker = _tracker
+    _tracker = None
+    if tracker:
+        tracker.shutdown()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from typing import Optional
+
+from authlib.specs.rfc6750 import BearerTokenValidator
+from flask import Flask
+from sqlalchemy.orm import make_transient_to_detached
+
+from chaoshubdashboard.lru import LRUCache, MISSING
+
+from .model import db, APIAccessToken
+
+__all__ = ["CachingBearerTokenValidator", "setup_token_cache",
+           "evict_cached_token"]
+
+# once this has been set, this shouldn't change so making it global is fair
+_token_cache = LRUCache(maxsize=0)
+
+
+class CachingBearerTokenValidator(BearerTokenValidator):
+    """
+    Validate bearer tokens against the `api_access_token` table, keeping
+    the tokens recently looked up, known or not, in memory so clients
+    calling the API often do not hit the database on every call.
+
+    Expiration and revocation are still checked on every call from the
+    cached values.
+    """
+    def authenticate_token(self, token_string: str) \
+            -> Optional[APIAccessToken]:
+        values = _token_cache.get(token_string)
+        if values is MISSING:
+            token = APIAccessToken.get_by_token(token_string)
+            values = None
+            if token:
+                values = {
+                    c.key: getattr(token, c.key)
+                    for c in APIAccessToken.__table__.columns
+                }
+            _token_cache.set(token_string, values)
+            return token
+
+        if values is None:
+            return None
+
+        # attach a copy of the token to the current session without querying
+        # the database for it
+        token = APIAccessToken(**values)
+        make_transient_to_detached(token)
+        return db.session.merge(token, load=False)
+
+    def request_invalid(self, request) -> bool:
+        return False
+
+    def token_revoked(self, token: APIAccessToken) -> bool:
+        return token.revoked
+
+
+def setup_token_cache(main_app: Flask):
+    """
+    Size the cache of validated bearer tokens from the `TOKEN_CACHE_SIZE`
+    and `TOKEN_CACHE_TTL` settings.
+    """
+    _token_cache.clear()
+    _token_cache.maxsize = main_app.config.get("TOKEN_CACHE_SIZE", 1024)
+    _token_cache.ttl = main_app.config.get("TOKEN_CACHE_TTL", 60)
+
+
+def evict_cached_token(access_token: str):
+    """
+    Forget what we know about this token so it is validated against the
+    database on its next use.
+    """
+    _token_cache.delete(access_token)
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
 import os.path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 import uuid
 
 from authlib.flask.oauth2 import ResourceProtector, current_token
@@ -12,9 +12,11 @@ import shortuuid
 
 from chaoshubdashboard.model import db
 
-from . import load_experiment, load_hub_extension, load_context, load_payload
+from . import load_experiment, load_hub_extension, load_context, \
+    load_payload, load_batch_payload, validate_execution
 from .model import APIAccessToken
 from .services import DashboardService, AuthService, ExperimentService
+from .tracker import get_token_usage_tracker
 from .types import Org, Workspace, Experiment, Extension
 
 __all__ = ["api"]
@@ -27,7 +29,15 @@ def user_authenticated_on_api(sender: ResourceProtector,
                               token: APIAccessToken):
     """
     Set the timestamp of the last successful call made from the given token
+
+    When the usage tracker runs, the timestamp is written later on, along
+    with the usage of other tokens.
     """
+    tracker = get_token_usage_tracker()
+    if tracker:
+        tracker.track(token)
+        return
+
     token.last_used_on = datetime.utcnow()
     db.session.commit()
 
@@ -113,3 +123,60 @@ def upload_run(org: Org, workspace: Workspace, experiment: Experiment,
         experiment_id=experiment["id"],
         timestamp=execution["timestamp"])
     return response
+
+
+@api.route('<string:experiment_id>/executions:batch', methods=['POST'])
+@accept('application/json')
+@require_oauth()
+@load_batch_payload()
+@load_context(permissions=('view', 'write'))
+@load_experiment()
+def upload_runs(org: Org, workspace: Workspace, experiment: Experiment,
+                payloads: List[Any]):
+    """
+    Store many executions of the experiment at once.
+
+    Respond with a result per execution, in the order they were sent.
+    """
+    user_claim = {"id": current_token.account_id}
+    errors = [validate_execution(p) for p in payloads]
+    valid = [p for (p, error) in zip(payloads, errors) if error is None]
+    executions = iter(ExperimentService.create_executions(
+        user_claim, org["id"], workspace["id"], experiment["id"], valid))
+
+    results = []
+    activities = []
+    for (index, (payload, error)) in enumerate(zip(payloads, errors)):
+        if error:
+            results.append({
+                "index": index,
+                "status": 400,
+                "message": error
+            })
+            continue
+
+        execution = next(executions)
+        results.append({
+            "index": index,
+            "status": 201,
+            "id": execution["id"],
+            "timestamp": execution["timestamp"]
+        })
+        activities.append({
+            "title": experiment["title"],
+            "account_id": shortuuid.encode(current_token.account_id),
+            "type": "execution",
+            "info": payload.get("status", "unknown"),
+            "org_id": org["id"],
+            "workspace_id": workspace["id"],
+            "experiment_id": experiment["id"],
+            "visibility": "collaborator",
+            "timestamp": execution["timestamp"]
+        })
+
+    if activities:
+        DashboardService.push_activities(activities)
+
+    response = jsonify({"results": results})
+    response.status_code = 207 if len(activities) < len(payloads) else 201
+    return response
@@ -19,22 +19,31 @@ from sqlalchemy_utils import force_auto_coercion
 from werkzeug.contrib.fixers import ProxyFix
 
 from chaoshubdashboard.api.app import setup_service as setup_api
+from chaoshubdashboard.api.tracker import shutdown_token_usage_tracker
 from chaoshubdashboard.auth.app import setup_service as setup_auth
+from chaoshubdashboard.dashboard import shutdown_activity_recorder
 from chaoshubdashboard.dashboard.app import setup_service as setup_dashboard
 from chaoshubdashboard.experiment.app import setup_service as setup_experiment
 from chaoshubdashboard.experiment.scheduler import register_schedulers, \
-    shutdown_schedulers
+    setup_schedule_progress_updater, shutdown_schedule_progress_updater, \
+    shutdown_schedulers, start_schedulers
 
-from .model import db, get_db_conn_uri_from_env
+from .model import clear_request_memo, db, get_db_conn_uri_from_env
 from .settings import configure_app
 from .utils import cache
 
 __all__ = ["create_app", "cleanup_app"]
 
 
-def create_app(create_tables: bool = False) -> Flask:
+def create_app(create_tables: bool = False,
+               start_schedulers: bool = False) -> Flask:
     """
     Create the application and its dependencies.
+
+    Schedulers running executions in the background, such as the local one,
+    are only started with `start_schedulers`, which only the server should
+    set. Applications created for command line or migration work stay
+    inert.
     """
     shortuuid.set_alphabet(string.ascii_lowercase + string.digits)
     app = Flask(__name__)
@@ -45,8 +54,9 @@ def create_app(create_tables: bool = False) -> Flask:
     serve_static(app)
     serve_services(app, cache)
     setup_db(app, create_all=create_tables)
+    setup_request_memo(app)
     setup_basic_security(app)
-    setup_experiment_execution_schedulers(app)
+    setup_experiment_execution_schedulers(app, start=start_schedulers)
 
     return app
 
@@ -56,6 +66,9 @@ def cleanup_app():
     Cleanup the application. Usually call this before terminating the process.
     """
     shutdown_schedulers()
+    shutdown_schedule_progress_updater()
+    shutdown_activity_recorder()
+    shutdown_token_usage_tracker()
 
 
 ###############################################################################
@@ -165,6 +178,13 @@ def setup_db(app: Flask, create_all: bool = False):
             db.create_all(app=app)
 
 
+def setup_request_memo(app: Flask):
+    """
+    Drop the model lookups memoized during a request once it is over.
+    """
+    app.teardown_request(clear_request_memo)
+
+
 def setup_basic_security(app: Flask):
     """
     Apply some basic security specifications over the HTTP exchanges.
@@ -192,10 +212,13 @@ def setup_basic_security(app: Flask):
     )
 
 
-def setup_experiment_execution_schedulers(app: Flask):
+def setup_experiment_execution_schedulers(app: Flask, start: bool = False):
     """
-    Register all installed schedulers
+    Register all installed schedulers and start them when `start` is set
     """
     schedulers = register_schedulers(app.config)
     for name in schedulers:
         app.logger.info("Registered '{}' scheduler".format(name))
+    setup_schedule_progress_updater(app)
+    if start:
+        start_schedulers(app)
@@ -5,7 +5,8 @@ from datetime import datetime, timedelta
 from functools import wraps
 import secrets
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
+import uuid
 
 from authlib.common.security import generate_token
 from authlib.flask.client import OAuth, RemoteApp
@@ -20,6 +21,8 @@ from itsdangerous import TimestampSigner
 from jose import jwt
 from loginpass import Bitbucket, Google, Gitlab, GitHub
 from loginpass._core import register_to
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
 
 from .model import Account, Client, ProviderToken, AccessToken, LocalAccount
 from .services import DashboardService, APIService
@@ -34,7 +37,9 @@ __all__ = ["fetch_token_info", "get_user_claim", "get_active_access_tokens",
            "get_oauth_remote_app", "generate_nonce_key", "log_user_in",
            "get_user_profile_info_from_oauth", "handle_signin",
            "handle_signup", "revoke_access_token", "register_local_account",
-           "get_current_user_claim_from_session", "update_access_token"]
+           "get_current_user_claim_from_session", "update_access_token",
+           "setup_claim_cache", "get_current_user_claim",
+           "invalidate_user_claim", "update_access_tokens"]
 
 
 OAUTH_BACKENDS = {
@@ -45,6 +50,15 @@ OAUTH_BACKENDS = {
 }
 OAUTH_REMOTE_APPS = dict()
 
+# set once when the service is setup, decoded user claims are stored there
+# so that we don't need to hit the database on every request
+_claim_cache: Dict[str, Cache] = {}
+
+# secrets never make it to the claim cache, which may be shared with other
+# processes, the views needing them load them from the database instead
+CLIENT_SECRET_FIELDS = ("client_secret",)
+TOKEN_SECRET_FIELDS = ("access_token", "refresh_token")
+
 
 def setup_oauth_backends(main_app: Flask, cache: Cache) -> OAuth:
     """
@@ -57,6 +71,14 @@ def setup_oauth_backends(main_app: Flask, cache: Cache) -> OAuth:
     return oauth
 
 
+def setup_claim_cache(main_app: Flask, cache: Cache):
+    """
+    Configure the cache storing the decoded user claims per session.
+    """
+    main_app.config.setdefault("CLAIM_CACHE_TIMEOUT", 60)
+    _claim_cache["cache"] = cache
+
+
 def get_oauth_remote_app(oauth_provider: str) -> RemoteApp:
     """
     Lookup the application for the given provider
@@ -111,6 +133,7 @@ def get_user_profile_info_from_oauth(oauth_provider: str, remote: RemoteApp,
 def handle_signin(account: Account, token: Dict[str, str],
                   oauth_provider: str):
     update_provider_token(oauth_provider, account, token)
+    invalidate_user_claim(account.id)
     session['sid'] = str(account.id)
     session.permanent = True
     current_app.logger.info("User logged in: {}".format(str(account.id)))
@@ -140,6 +163,94 @@ def get_current_user_claim_from_session() -> Optional[str]:
     return get_user_claim(account)
 
 
+def get_current_user_claim() -> Optional[UserClaim]:
+    """
+    Return the claim of the currently logged in user.
+
+    The claim is looked up in the claim cache first and only loaded from the
+    database when missing or expired. Use `invalidate_user_claim` whenever
+    the account or its tokens change.
+
+    The client secret and the access tokens strings are left out of the
+    claim, see `get_active_access_tokens` to read them.
+    """
+    sid = session.get('sid')
+    if not sid:
+        return None
+
+    cache = _claim_cache.get("cache")
+    key = get_user_claim_cache_key(sid)
+    if cache:
+        claim = cache.get(key)
+        if claim is not None:
+            return claim
+
+    account = Account.query.filter(Account.id==sid).first()
+    if not account:
+        session.pop('sid', None)
+        return None
+
+    claim = strip_claim_secrets(account.to_dict())
+    if cache:
+        cache.set(
+            key, claim, timeout=current_app.config.get("CLAIM_CACHE_TIMEOUT"))
+    return claim
+
+
+def invalidate_user_claim(account_id: Union[str, uuid.UUID]):
+    """
+    Drop the cached claim of the given account so that it gets reloaded on
+    the next request.
+    """
+    cache = _claim_cache.get("cache")
+    if cache:
+        cache.delete(get_user_claim_cache_key(account_id))
+
+
+def get_user_claim_cache_key(account_id: Union[str, uuid.UUID]) -> str:
+    return "user-claim:{}".format(str(account_id))
+
+
+def strip_claim_secrets(claim: UserClaim) -> UserClaim:
+    """
+    Return a copy of the claim without the client secret nor the access
+    tokens strings.
+    """
+    claim = dict(claim)
+    if claim.get("client"):
+        claim["client"] = {
+            k: v for (k, v) in claim["client"].items()
+            if k not in CLIENT_SECRET_FIELDS
+        }
+    claim["tokens"] = [
+        {k: v for (k, v) in t.items() if k not in TOKEN_SECRET_FIELDS}
+        for t in claim.get("tokens", [])
+    ]
+    return claim
+
+
+@event.listens_for(Account, "after_update")
+@event.listens_for(Account, "after_delete")
+def account_changed(mapper, connection, account: Account):
+    """
+    Any change to the account invalidates its cached claim, once committed
+    so that a concurrent request cannot cache the former claim again.
+    """
+    session = object_session(account)
+    session.info.setdefault("changed_accounts", set()).add(account.id)
+
+
+@event.listens_for(db.session, "after_commit")
+def invalidate_changed_accounts(session):
+    for account_id in session.info.pop("changed_accounts", ()):
+        invalidate_user_claim(account_id)
+
+
+@event.listens_for(db.session, "after_rollback")
+def forget_changed_accounts(session):
+    session.info.pop("changed_accounts", None)
+
+
 def get_user_claim(account: Account) -> Optional[str]:
     """
     Return a signed claim representing the given user.
@@ -281,6 +392,7 @@ def generate_access_token(user_claim: Dict[str, Any], name: str,
     )
     db.session.add(token)
     db.session.commit()
+    invalidate_user_claim(account_id)
 
     access_token = token.to_dict()
     APIService.set_access_token(access_token)
@@ -298,6 +410,7 @@ def revoke_access_token(account_id: str, token_id: str):
         token.expires_in = -3600
         token.revoked = True
         db.session.commit()
+        invalidate_user_claim(account_id)
 
         APIService.revoke_access_token(token)
 
@@ -313,6 +426,40 @@ def update_access_token(access_token: Dict[str, Any]):
         token.last_used_on = datetime.utcfromtimestamp(
             access_token["last_used"])
         db.session.commit()
+        invalidate_user_claim(token.account_id)
+
+
+def update_access_tokens(access_tokens: List[Dict[str, Any]]):
+    """
+    Update the last time each of these access tokens was used, all at once
+    """
+    if not access_tokens:
+        return
+
+    by_token = {t["access_token"]: t for t in access_tokens}
+    tokens = db.session.query(
+        AccessToken.id, AccessToken.access_token, AccessToken.account_id)\
+        .filter(AccessToken.access_token.in_(list(by_token.keys())))\
+        .all()
+
+    updates = []
+    account_ids = set()
+    for (token_id, token, account_id) in tokens:
+        access_token = by_token[token]
+        if str(account_id) != access_token["account_id"]:
+            continue
+        updates.append({
+            "id": token_id,
+            "last_used_on": datetime.utcfromtimestamp(
+                access_token["last_used"])
+        })
+        account_ids.add(account_id)
+
+    db.session.bulk_update_mappings(AccessToken, updates)
+    db.session.commit()
+
+    for account_id in account_ids:
+        invalidate_user_claim(account_id)
 
 
 def encode_as_jwt(payload: Dict[str, Any], secret_key: str,
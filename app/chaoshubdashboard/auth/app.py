@@ -5,7 +5,7 @@ from typing import Any, Dict
 from flask import Flask, jsonify
 from flask_caching import Cache
 
-from . import setup_oauth_backends
+from . import setup_claim_cache, setup_oauth_backends
 from .views import auth_service
 
 __all__ = ["setup_service"]
@@ -17,3 +17,4 @@ def setup_service(main_app: Flask, cache: Cache):
     """
     main_app.register_blueprint(auth_service, url_prefix="/auth")
     setup_oauth_backends(main_app, cache)
+    setup_claim_cache(main_app, cache)
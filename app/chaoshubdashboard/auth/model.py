@@ -7,10 +7,9 @@ from authlib.flask.oauth2.sqla import OAuth2ClientMixin, OAuth2TokenMixin
 from flask_sqlalchemy import SQLAlchemy as SA
 import shortuuid
 from sqlalchemy.sql import func
-from sqlalchemy_utils import PasswordType, UUIDType
-from sqlalchemy_utils import JSONType as JSONB
+from sqlalchemy_utils import PasswordType
 
-from chaoshubdashboard.model import db, get_user_info_secret_key
+from chaoshubdashboard.model import db, get_user_info_secret_key, UUID
 
 __all__ = ["Client", "AccessToken", "Account", "ProviderToken", "LocalAccount"]
 
@@ -25,7 +24,7 @@ class Account(db.Model):  # type: ignore
     )
 
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, unique=True,
+        UUID(), primary_key=True, unique=True,
         default=uuid.uuid4)
     joined_on = db.Column(
         db.DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -81,7 +80,7 @@ class Client(db.Model, OAuth2ClientMixin):  # type: ignore
     __bind_key__ = 'auth_service'
     id = db.Column(db.Integer, primary_key=True)
     account_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey(
+        UUID(), db.ForeignKey(
             'account.id', ondelete='CASCADE'), nullable=False)
 
     def to_dict(self):
@@ -95,11 +94,11 @@ class Client(db.Model, OAuth2ClientMixin):  # type: ignore
 class AccessToken(db.Model, OAuth2TokenMixin):  # type: ignore
     __bind_key__ = 'auth_service'
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, unique=True,
+        UUID(), primary_key=True, unique=True,
         default=uuid.uuid4)
     name = db.Column(db.String(), nullable=False)
     account_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey(
+        UUID(), db.ForeignKey(
             'account.id', ondelete='CASCADE'), nullable=False)
     last_used_on = db.Column(db.DateTime())
 
@@ -129,7 +128,7 @@ class ProviderToken(db.Model, OAuth2TokenMixin):  # type: ignore
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(20), nullable=False)
     account_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey(
+        UUID(), db.ForeignKey(
             'account.id', ondelete='CASCADE'))
     account = db.relationship('Account')
 
@@ -148,10 +147,10 @@ class LocalAccount(db.Model):  # type: ignore
     __bind_key__ = 'auth_service'
 
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, unique=True,
+        UUID(), primary_key=True, unique=True,
         default=uuid.uuid4)
     account_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey(
+        UUID(), db.ForeignKey(
             'account.id', ondelete='CASCADE'), nullable=False)
     username = db.Column(db.String, nullable=False, unique=True, index=True)
     password = db.Column(
@@ -1,10 +1,18 @@
 # -*- coding: utf-8 -*-
+import sys
+
 import cherrypy
 from cherrypy.process.plugins import Daemonizer, PIDFile
 import click
+from sqlalchemy import inspect
 
 from chaoshubdashboard import __version__
 from chaoshubdashboard.app import create_app, cleanup_app
+from chaoshubdashboard.dashboard.model import Org
+from chaoshubdashboard.experiment import migrate_execution_journals
+from chaoshubdashboard.experiment.export import export_workspace
+from chaoshubdashboard.experiment.model import Execution
+from chaoshubdashboard.model import db
 from chaoshubdashboard.settings import load_settings
 
 
@@ -27,8 +35,69 @@ def run(env_path: str, create_tables: bool = False):
 
     cherrypy.engine.subscribe(
         'start', lambda: create_app(
-            create_tables=create_tables), priority=90)
+            create_tables=create_tables, start_schedulers=True), priority=90)
     cherrypy.engine.subscribe('stop', cleanup_app, priority=30)
     cherrypy.engine.signals.subscribe()
     cherrypy.engine.start()
     cherrypy.engine.block()
+
+
+@cli.command()
+@click.option('--env-path', type=click.Path(),
+              help='Dot env file or directory path.')
+@click.option('--since', type=int,
+              help='Only export what changed from this timestamp, '
+                   'in milliseconds.')
+@click.option('--output', type=click.File('wb'), default='-',
+              help='Path of the gzip file to write to, stdout by default.')
+@click.argument('org')
+@click.argument('workspace')
+def export(org: str, workspace: str, output, env_path: str,
+           since: int = None):
+    """
+    Export the experiments and executions of a workspace as gzip-compressed
+    newline-delimited JSON.
+    """
+    load_settings(env_path)
+    app = create_app()
+
+    try:
+        with app.app_context():
+            o = Org.find_by_name(org)
+            w = o.find_workspace_by_name(workspace) if o else None
+            if not w:
+                click.echo("Unknown workspace {}/{}".format(
+                    org, workspace), err=True)
+                sys.exit(1)
+
+            for chunk in export_workspace(w.id, since=since):
+                output.write(chunk)
+    finally:
+        cleanup_app()
+
+
+@cli.command('migrate-journals')
+@click.option('--env-path', type=click.Path(),
+              help='Dot env file or directory path.')
+@click.option('--batch-size', type=int, default=500, show_default=True,
+              help='Number of executions migrated per transaction.')
+def migrate_journals(env_path: str, batch_size: int = 500):
+    """
+    Move the executions journals still stored alongside the executions to
+    the compressed journal store, created by the database migrations.
+    """
+    load_settings(env_path)
+    app = create_app()
+
+    try:
+        with app.app_context():
+            engine = db.get_engine(bind=Execution.__bind_key__)
+            if "execution_journal" not in inspect(engine).get_table_names():
+                raise click.ClickException(
+                    "The journal store does not exist yet, upgrade the "
+                    "database with `flask db upgrade` first.")
+
+            migrated = migrate_execution_journals(batch_size)
+            click.echo("Migrated {} executions".format(migrated))
+    finally:
+        cleanup_app()
@@ -1,21 +1,28 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
-from functools import wraps
+from functools import partial, wraps
 from operator import itemgetter
 import random
-from typing import Any, Dict, List, NoReturn, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, NoReturn, Optional, Tuple, \
+    Type, Union
+import uuid
 
 from flask import abort, current_app, redirect, url_for
 import shortuuid
-from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 from sqlalchemy.dialects.postgresql.json import JSON
 from sqlalchemy.sql.expression import cast
 
-from chaoshubdashboard.model import db
+from chaoshubdashboard.model import Cursor, db, format_cursor
 
 from .model import WorkpacesMembers, OrgsMembers, UserPrivacy, Org, \
     OrgType, UserPrivacy, UserAccount, UserInfo, WorkspaceType, \
-    ExecutionVisibility, Activity, ActivityVisibility, Workspace
+    ExecutionVisibility, Activity, ActivityVisibility, Workspace, \
+    evict_cached_profile
+from .recorder import get_activity_recorder, setup_activity_recorder, \
+    shutdown_activity_recorder
+from .resolver import get_name_resolver
+from .search import filter_users, find_users, get_user_search_index
 from .types import ProfileInfo, UserClaim, Workspace as _Workspace
 
 __all__ = ["fully_delete_user_info", "register_user", "create_user_account",
@@ -25,11 +32,17 @@ __all__ = ["fully_delete_user_info", "register_user", "create_user_account",
            "is_org_viewable", "get_org_from_url", "get_workspace_from_url",
            "can_org_be_deleted", "load_org", "load_org_and_workspace",
            "lookup_users", "lookup_collaborators", "lookup_members",
-           "lookup_workspaces", "get_account_activities", "get_caller_info"]
+           "lookup_workspaces", "get_account_activities",
+           "get_activities_cursor", "get_caller_info",
+           "compute_workspace_acls", "compute_workspaces_acls",
+           "record_activity", "record_activities", "setup_activity_recorder",
+           "shutdown_activity_recorder"]
 
 # we disallow some characters in organization names and we replace them
 # with a much safer dash character
 ORG_TRANSLATE = str.maketrans(" /\"'.%", "------")
+# number of activities in a page of a feed
+ACTIVITIES_PAGE_SIZE = 10
 GENERIC_NAMES = (
     'Urur',
     'Arin',
@@ -95,19 +108,18 @@ def get_caller_info(user_claim: UserClaim, org_id: str,
     Fetch the calling user's context
     """
     account_id = user_claim["id"]
-    account = UserAccount.query.filter(UserAccount.id==account_id).first()
+    account = UserAccount.get_by_id(account_id)
     if not account:
         return None
 
     caller = account.to_short_dict()
     if org_id:
-        org = Org.query.filter(Org.id==org_id).first()
+        org = Org.get_by_id(org_id)
         caller["org_member"] = org.is_member(account_id)
         caller["org_owner"] = org_owner = org.is_owner(account_id)
 
     if workspace_id:
-        workspace = Workspace.query.filter(
-            Workspace.id==workspace_id).first()
+        workspace = Workspace.get_by_id(workspace_id)
         caller["workspace_collaborator"] = workspace.is_collaborator(
             account_id)
         caller["workspace_owner"] = workspace.is_owner(account_id)
@@ -126,6 +138,8 @@ def set_user_profile(account: UserAccount, profile: ProfileInfo) -> UserInfo:
         fullname=profile.get("name"))
     account.info = user_info
     db.session.add(user_info)
+    if account.id:
+        evict_cached_profile(account.id)
     return user_info
 
 
@@ -213,24 +227,21 @@ def fully_delete_user_info(user_claim: UserClaim):
 
     db.session.commit()
 
+    index = get_user_search_index()
+    if index is not None:
+        index.remove(account.id)
 
-def lookup_users(q: str, count: int = 10) -> List[Dict[str, str]]:
+
+def lookup_users(q: str, count: int = 10) -> List[Dict[str, Any]]:
     q = (q or "").strip()
     if not q or len(q) > 24:
         return []
 
-    matches = UserInfo.query.filter(
-        or_(
-            UserInfo.username.ilike("%{}%".format(q)),
-            UserInfo.fullname.ilike("%{}%".format(q))
-        )
-    ).limit(count)
-
     return [{
-        "id": shortuuid.encode(m.account_id),
-        "name": m.fullname,
-        "username": m.username
-    } for m in matches]
+        "id": shortuuid.encode(account_id),
+        "name": fullname,
+        "username": username
+    } for (account_id, username, fullname) in find_users(q, count)]
 
 
 def lookup_members(o: Org, q: str, count: int = 10) -> List[Dict[str, str]]:
@@ -238,19 +249,8 @@ def lookup_members(o: Org, q: str, count: int = 10) -> List[Dict[str, str]]:
     if not q or len(q) > 24:
         return []
 
-    matches = UserAccount.query.filter(UserAccount.id.in_(
-        db.session.query(OrgsMembers.account_id)
-        .filter(OrgsMembers.org_id==o.id)
-        .filter(OrgsMembers.account_id.in_(
-            db.session.query(UserInfo.account_id).filter(
-                or_(
-                    UserInfo.username.ilike("%{}%".format(q)),
-                    UserInfo.fullname.ilike("%{}%".format(q))
-                )
-            )
-        )).limit(count)))
-
-    return [m.to_short_dict() for m in matches]
+    return lookup_accounts(
+        q, count, OrgsMembers, OrgsMembers.org_id==o.id)
 
 
 def lookup_collaborators(w: Workspace, q: str,
@@ -259,19 +259,56 @@ def lookup_collaborators(w: Workspace, q: str,
     if not q or len(q) > 24:
         return []
 
-    matches = UserAccount.query.filter(UserAccount.id.in_(
-        db.session.query(WorkpacesMembers.account_id)
-        .filter(WorkpacesMembers.workspace_id==w.id)
-        .filter(WorkpacesMembers.account_id.in_(
-            db.session.query(UserInfo.account_id).filter(
-                or_(
-                    UserInfo.username.ilike("%{}%".format(q)),
-                    UserInfo.fullname.ilike("%{}%".format(q))
-                )
-            )
-        )).limit(count)))
+    return lookup_accounts(
+        q, count, WorkpacesMembers, WorkpacesMembers.workspace_id==w.id)
+
+
+def lookup_accounts(q: str, count: int,
+                    membership: Type[Union[OrgsMembers, WorkpacesMembers]],
+                    criterion: Any) -> List[Dict[str, Any]]:
+    """
+    Lookup the accounts which are members, as per the `criterion` of the
+    `membership` association, and whose username or full name contains `q`,
+    best matches first.
 
-    return [m.to_short_dict() for m in matches]
+    Only the account's names are read, not its encrypted profile. Accounts
+    are returned in the shape of `UserAccount.to_short_dict()` but without
+    the profile's picture.
+    """
+    accounts = db.session.query(
+        UserAccount.id, UserAccount.joined_dt, Org.name, UserInfo.id,
+        UserInfo.username, UserInfo.fullname)\
+        .join(UserInfo, UserInfo.account_id==UserAccount.id)\
+        .join(Org, Org.account_id==UserAccount.id)
+
+    index = get_user_search_index()
+    if index is not None:
+        members = db.session.query(membership.account_id).filter(criterion)
+        ranked = [
+            m[0] for m in index.search(q, count, {a for (a,) in members})]
+        if not ranked:
+            return []
+        accounts = accounts.filter(UserAccount.id.in_(ranked)).all()
+        accounts.sort(key=lambda a: ranked.index(a[0]))
+    else:
+        accounts = filter_users(
+            accounts.join(
+                membership, membership.account_id==UserAccount.id)
+            .filter(criterion), q).limit(count).all()
+
+    return [{
+        "id": shortuuid.encode(account_id),
+        "joined": "{}Z".format(joined_dt.isoformat()),
+        "org": {
+            "name": org_name
+        },
+        "profile": {
+            "id": shortuuid.encode(info_id),
+            "username": username,
+            "name": fullname
+        }
+    } for (account_id, joined_dt, org_name, info_id, username, fullname)
+        in accounts]
 
 
 def lookup_workspaces(o: Org, q: str, account_id: str,
@@ -296,13 +333,17 @@ def lookup_workspaces(o: Org, q: str, account_id: str,
 
 def get_workspaces(user_claim: UserClaim) -> List[_Workspace]:
     account_id = user_claim["id"]
-    account = UserAccount.query.filter(UserAccount.id==account_id).first()
+    account_workspaces = Workspace.query.options(joinedload(Workspace.org))\
+        .join(WorkpacesMembers, WorkpacesMembers.workspace_id==Workspace.id)\
+        .filter(WorkpacesMembers.account_id==account_id).all()
+
+    acls = compute_workspaces_acls(account_id, account_workspaces)
     workspaces = []
-    for w in account.workspaces:
+    for w in account_workspaces:
         workspace = w.to_dict()
         workspace["context"] = {
             "account": account_id,
-            "acls": compute_workspace_acls(account_id, w.org, w)
+            "acls": acls[w.id]
         }
         workspaces.append(workspace)
     return workspaces
@@ -325,14 +366,11 @@ def get_workspace_by_id(user_claim: UserClaim,
 
 def get_workspace(user_claim: UserClaim, org_name: str,
                   workspace_name: str) -> Optional[_Workspace]:
-    o = Org.find_by_name(org_name)
-    if not o:
-        return None
-
-    w = o.find_workspace_by_name(workspace_name)
+    w = get_name_resolver().find_workspace(org_name, workspace_name)
     if not w:
         return None
 
+    o = w.org
     account_id = user_claim["id"] if user_claim else None
     workspace = w.to_dict()
     workspace["context"] = {
@@ -344,15 +382,73 @@ def get_workspace(user_claim: UserClaim, org_name: str,
 
 def compute_workspace_acls(account_id: str, org: Org,
                            workspace: Workspace) -> List[str]:
+    if not org or not workspace:
+        return []
+
+    return compute_workspaces_acls(account_id, [workspace])[workspace.id]
+
+
+def compute_workspaces_acls(account_id: Optional[str],
+                            workspaces: List[Workspace]) \
+                            -> Dict[uuid.UUID, List[str]]:
+    """
+    Compute the ACLs of an account for many workspaces at once and return
+    them indexed by workspace identifier.
+
+    The memberships of the account to the workspaces and to their
+    organizations are loaded with a single query each, whatever the number of
+    workspaces, then ACLs are resolved in memory.
+    """
+    w_memberships: Dict[uuid.UUID, WorkpacesMembers] = {}
+    o_memberships: Dict[uuid.UUID, OrgsMembers] = {}
+
+    if account_id and workspaces:
+        workspace_ids = list({w.id for w in workspaces})
+        org_ids = list({w.org_id for w in workspaces})
+
+        w_memberships = {
+            m.workspace_id: m for m in WorkpacesMembers.query.filter(
+                WorkpacesMembers.account_id==account_id,
+                WorkpacesMembers.workspace_id.in_(workspace_ids))
+        }
+
+        o_memberships = {
+            m.org_id: m for m in OrgsMembers.query.filter(
+                OrgsMembers.account_id==account_id,
+                OrgsMembers.org_id.in_(org_ids))
+        }
+
+    return {
+        w.id: resolve_workspace_acls(
+            w, w_memberships.get(w.id), o_memberships.get(w.org_id))
+        for w in workspaces
+    }
+
+
+def resolve_workspace_acls(w: Workspace,
+                           w_membership: Optional[WorkpacesMembers],
+                           o_membership: Optional[OrgsMembers]) -> List[str]:
+    """
+    Resolve the ACLs of a workspace from the memberships, if any, of an
+    account to that workspace and to its organization.
+
+    This follows the rules of `is_workspace_owner`, `is_workspace_viewable`
+    and `is_workspace_writable` without hitting the database.
+    """
     acls: List[str] = []
 
-    if is_workspace_owner(account_id, org, workspace):
+    w_owner = w_membership is not None and bool(w_membership.is_owner)
+    o_owner = o_membership is not None and bool(o_membership.is_owner)
+
+    if w_owner:
         acls.append("owner")
 
-    if is_workspace_viewable(account_id, org, workspace):
+    if w.kind == WorkspaceType.public:
+        acls.append("view")
+    elif w.kind == WorkspaceType.personal and w_owner and o_owner:
         acls.append("view")
 
-    if is_workspace_writable(account_id, org, workspace):
+    if w_membership is not None or o_membership is not None:
         acls.append("write")
 
     return acls
@@ -489,19 +585,21 @@ def can_org_be_deleted(account_id: str, o: Org) -> bool:
     return True
 
 
-def get_org_from_url(org: str, redirect_to: str) -> Org:
+def get_org_from_url(org: str,
+                     redirect_to: Union[str, Callable[[], str]]) -> Org:
     """
     Load the organization object from the request's URL path info. If it
     cannot be found returns a 404.
 
     If the path info has the wrong case, redirects to the appropriate one.
+    The `redirect_to` path may be a callable so that it is only built when
+    actually redirecting.
     """
     org_name = org.strip()
     if not org_name:
         raise abort(404)
 
-    org_name = org_name.lower()
-    organization = Org.query.filter(Org.name_lower==org_name).first()
+    organization = get_name_resolver().find_org(org_name)
 
     if not organization:
         raise abort(404)
@@ -509,6 +607,8 @@ def get_org_from_url(org: str, redirect_to: str) -> Org:
     if organization.name != org:
         # the user likely called with a different case in the url
         # we prefer to redirect to the correct url for better visibility
+        if callable(redirect_to):
+            redirect_to = redirect_to()
         url = "/{}/{}".format(organization.name, redirect_to)
         response = redirect(url.replace("//", "/").rstrip("/"), code=308)
         raise abort(response)
@@ -532,10 +632,8 @@ def load_org(redirect_to: str, allow_anonymous: bool = False):
             if not org:
                 return abort(404)
 
-            redirect_args_filler = {k: "" for k in kwargs}
-            redirect_args_filler.pop("user_claim", None)
-            redirect_to_url = url_for(redirect_to, **redirect_args_filler)
-            o = get_org_from_url(org, redirect_to=redirect_to_url)
+            o = get_org_from_url(
+                org, redirect_to=redirect_path(redirect_to, kwargs))
 
             if account_id and not is_org_viewable(account_id, o):
                 raise abort(404)
@@ -549,28 +647,30 @@ def load_org(redirect_to: str, allow_anonymous: bool = False):
 
 
 def get_workspace_from_url(org: Org, workspace: str,
-                           redirect_to: str) -> Workspace:
+                           redirect_to: Union[str, Callable[[], str]]) \
+                           -> Workspace:
     """
     Load the workspace object from the request's URL path info. If it
     cannot be found returns a 404.
 
     If the path info has the wrong case, redirects to the appropriate one.
+    The `redirect_to` path may be a callable so that it is only built when
+    actually redirecting.
     """
     workspace_name = workspace.strip()
     if not workspace_name:
         raise abort(404)
 
-    workspace_name = workspace_name.lower()
-    w = Workspace.query.filter(
-        Workspace.org_id==org.id,
-        Workspace.name_lower==workspace_name).first()
+    w = get_name_resolver().find_workspace(org.name, workspace_name)
 
-    if not w:
+    if not w or w.org_id != org.id:
         raise abort(404)
 
     if w.name != workspace:
         # the user likely called with a different case in the url
         # we prefer to redirect to the correct url for better visibility
+        if callable(redirect_to):
+            redirect_to = redirect_to()
         url = "/{}/{}/{}".format(org.name, w.name, redirect_to)
         raise abort(redirect(url.replace("//", "/")))
 
@@ -592,18 +692,13 @@ def load_org_and_workspace(redirect_to: str, allow_anonymous: bool = False):
             if user_claim is not None:
                 account_id = user_claim["id"]
 
-            redirect_args_filler = {k: "" for k in kwargs}
-            redirect_args_filler.pop("user_claim", None)
-            redirect_to_url = url_for(redirect_to, **redirect_args_filler)
+            redirect_to_url = redirect_path(redirect_to, kwargs)
             o = get_org_from_url(org, redirect_to=redirect_to_url)
 
             workspace = kwargs.get("workspace")
             if not workspace:
                 return abort(404)
 
-            redirect_args_filler = {k: "" for k in kwargs}
-            redirect_args_filler.pop("user_claim", None)
-            redirect_to_url = url_for(redirect_to, **redirect_args_filler)
             w = get_workspace_from_url(
                 org=o, workspace=workspace, redirect_to=redirect_to_url)
 
@@ -623,19 +718,67 @@ def load_org_and_workspace(redirect_to: str, allow_anonymous: bool = False):
     return wrapper
 
 
+def redirect_path(endpoint: str,
+                  view_args: Dict[str, Any]) -> Callable[[], str]:
+    """
+    Return a callable building the path of the endpoint, with the org and
+    workspace left out, for redirecting to the properly cased URL.
+    """
+    redirect_args_filler = {k: "" for k in view_args}
+    redirect_args_filler.pop("user_claim", None)
+    return partial(url_for, endpoint, **redirect_args_filler)
+
+
 def record_activity(activity: Dict[str, Any]) -> Activity:
     """
     Record an activity
+
+    The display names of the organization and workspace are stored
+    alongside the activity so that feeds can be read without looking them up.
     """
-    act = Activity.from_dict(activity)
-    db.session.add(act)
-    db.session.commit()
+    return record_activities([activity])[0]
 
-    return act
 
+def record_activities(activities: List[Dict[str, Any]]) -> List[Activity]:
+    """
+    Record all the given activities at once
+    """
+    acts = []
+    for activity in activities:
+        act = Activity.from_dict(activity)
+        if act.org_id and not act.org_name:
+            org = Org.get_by_id(act.org_id)
+            if org:
+                act.org_name = org.name
 
-def get_caller_org_activities(org: Org, caller: Dict[str, Any]) \
-                              -> List[Dict[str, Any]]:
+        if act.workspace_id and not act.workspace_name:
+            workspace = Workspace.get_by_id(act.workspace_id)
+            if workspace:
+                act.workspace_name = workspace.name
+        acts.append(act)
+
+    recorder = get_activity_recorder()
+    if not recorder:
+        db.session.add_all(acts)
+        db.session.commit()
+        return acts
+
+    for act in acts:
+        # the activity is inserted later on, set the values its column
+        # defaults would otherwise have provided
+        act.id = act.id or uuid.uuid4()
+        act.timestamp = act.timestamp or \
+            int(datetime.utcnow().timestamp() * 1000)
+        act.visibility = act.visibility or ActivityVisibility.authenticated
+        recorder.record({
+            c.key: getattr(act, c.key) for c in Activity.__table__.columns
+        })
+
+    return acts
+
+
+def get_caller_org_activities(org: Org, caller: Dict[str, Any],
+                              before: Cursor = None) -> List[Dict[str, Any]]:
     org_owner = caller.get("org_owner") if caller else False
     org_member = caller.get("org_member") if caller else False
 
@@ -648,28 +791,14 @@ def get_caller_org_activities(org: Org, caller: Dict[str, Any]) \
     else:
         visibility = ActivityVisibility.authenticated
 
-    activities = Activity.get_recents_for_org(org.id, visibility)
-    result = []
-    for activity in activities:
-        d = activity.to_dict()
-        if org:
-            d["org"] = {
-                "name": org.name
-            }
-
-        if activity.workspace_id:
-            w = Workspace.get_by_id(activity.workspace_id)
-            if w:
-                d["workspace"] = {
-                    "name": w.name
-                }
-        result.append(d)
-
-    return result
+    activities = Activity.get_recents_for_org(
+        org.id, visibility, last=ACTIVITIES_PAGE_SIZE, before=before)
+    return enrich_activities(activities, org=org)
 
 
 def get_caller_workspace_activities(workspace: Workspace,
-                                    caller: Dict[str, Any]) \
+                                    caller: Dict[str, Any],
+                                    before: Cursor = None) \
                                     -> List[Dict[str, Any]]:
     org_owner = caller.get("org_owner") if caller else False
     org_member = caller.get("org_member") if caller else False
@@ -686,7 +815,8 @@ def get_caller_workspace_activities(workspace: Workspace,
     else:
         visibility = ActivityVisibility.authenticated
 
-    activities = Activity.get_recents_for_workspace(workspace.id, visibility)
+    activities = Activity.get_recents_for_workspace(
+        workspace.id, visibility, last=ACTIVITIES_PAGE_SIZE, before=before)
     result = []
     for activity in activities:
         d = activity.to_dict()
@@ -703,31 +833,71 @@ def get_caller_workspace_activities(workspace: Workspace,
     return result
 
 
-def get_account_activities(account_id: str,
-                           caller: Dict[str, Any]) -> List[Dict[str, Any]]:
+def get_account_activities(account_id: str, caller: Dict[str, Any],
+                           before: Cursor = None) -> List[Dict[str, Any]]:
     if not caller:
         visibility = ActivityVisibility.anonymous
     else:
         visibility = ActivityVisibility.owner
 
-    activities = Activity.get_recents_for_account(account_id, visibility)
+    activities = Activity.get_recents_for_account(
+        account_id, visibility, last=ACTIVITIES_PAGE_SIZE, before=before)
+    return enrich_activities(activities)
+
+
+def get_activities_cursor(activities: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Return the cursor of the page following these activities, or `None`
+    when they were the last ones of the feed.
+    """
+    if len(activities) < ACTIVITIES_PAGE_SIZE:
+        return None
+    last = activities[-1]
+    return format_cursor(last["timestamp"], last["id"])
+
+
+def enrich_activities(activities: List[Activity], org: Org = None) \
+                      -> List[Dict[str, Any]]:
+    """
+    Serialize the given activities along with the name of the organization
+    and workspace they relate to.
+
+    Names are read from the activity itself when they were recorded with it.
+    Otherwise, rather than looking up each activity's organization and
+    workspace, the distinct identifiers are collected first and resolved
+    with a single query each. When `org` is given, all activities are
+    considered to belong to it.
+    """
+    activities = list(activities)
+
+    orgs = {}
+    if not org:
+        org_ids = {
+            a.org_id for a in activities if a.org_id and not a.org_name}
+        orgs = {o.id: o.name for o in Org.get_by_ids(org_ids)}
+
+    workspace_ids = {
+        a.workspace_id for a in activities
+        if a.workspace_id and not a.workspace_name}
+    workspaces = {w.id: w.name for w in Workspace.get_by_ids(workspace_ids)}
+
     result = []
     for activity in activities:
         d = activity.to_dict()
 
-        if activity.org_id:
-            org = Org.get_by_id(activity.org_id)
-            if org:
-                d["org"] = {
-                    "name": org.name if org else None
-                }
+        org_name = org.name if org else \
+            activity.org_name or orgs.get(activity.org_id)
+        if org_name:
+            d["org"] = {
+                "name": org_name
+            }
 
-        if activity.org_id:
-            workspace = Workspace.get_by_id(activity.workspace_id)
-            if workspace:
-                d["workspace"] = {
-                    "name": workspace.name if workspace else None
-                }
+        workspace_name = activity.workspace_name or \
+            workspaces.get(activity.workspace_id)
+        if workspace_name:
+            d["workspace"] = {
+                "name": workspace_name
+            }
 
         result.append(d)
 
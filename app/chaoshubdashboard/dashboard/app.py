@@ -5,6 +5,10 @@ from typing import Any, Dict
 from flask import Flask, jsonify, render_template
 from flask_caching import Cache
 
+from . import setup_activity_recorder
+from .model import setup_profile_cache
+from .resolver import setup_name_resolver
+from .search import setup_user_search_index
 from .views import dashboard_service
 from .views.account import account_service
 from .views.org import org_service
@@ -21,6 +25,10 @@ def setup_service(main_app: Flask, cache: Cache):
         workspace_service, url_prefix="/<string:org>/<string:workspace>")
 
     set_error_pages(main_app)
+    setup_activity_recorder(main_app)
+    setup_user_search_index(main_app)
+    setup_profile_cache(main_app)
+    setup_name_resolver(main_app, cache)
 
 
 ###############################################################################
@@ -3,38 +3,46 @@ from datetime import datetime
 from enum import Enum, IntEnum, auto
 import secrets
 import sys
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Collection, Dict, List, Optional, Union
 import uuid
 
 from authlib.flask.oauth2.sqla import OAuth2ClientMixin, OAuth2TokenMixin
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy as SA
 import shortuuid
 import simplejson as json
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import DDL, event, UniqueConstraint
+from sqlalchemy.orm import deferred, joinedload, selectinload
 from sqlalchemy.sql import func
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy_json import NestedMutable
-from sqlalchemy_utils import EmailType, EncryptedType, JSONType, UUIDType
+from sqlalchemy_utils import EmailType, EncryptedType
 from sqlalchemy_utils.types.encrypted.encrypted_type import AesEngine
-from sqlalchemy_utils import JSONType as JSONB
 
-from chaoshubdashboard.model import db, get_user_info_secret_key
+from chaoshubdashboard.lru import LRUCache, MISSING
+from chaoshubdashboard.model import before_cursor, Cursor, db, \
+    get_user_info_secret_key, JSONB, UUID, request_memoized
 
 
 __all__ = ["UserAccount", "AccountType", "OrgsMembers", "Activity",
            "WorkpacesMembers", "Company", "Privacy", "Org", "UserInfo",
            "WorkspaceType", "ExperimentVisibility", "OrgType",
-           "ExperimentVisibility", "ActivityVisibility"]
+           "ExperimentVisibility", "ActivityVisibility",
+           "setup_profile_cache", "evict_cached_profile"]
+
+# account identifier -> (profile last updated, decoded public profile)
+# once this has been set, this shouldn't change so making it global is fair
+_profile_cache = LRUCache(maxsize=0)
 
 
 class WorkpacesMembers(db.Model):  # type: ignore
     __bind_key__ = 'dashboard_service'
     __tablename__ = "workspaces_members"
     workspace_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey('workspace.id'),
+        UUID(), db.ForeignKey('workspace.id'),
         primary_key=True)
     account_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey('user_account.id'),
+        UUID(), db.ForeignKey('user_account.id'),
         primary_key=True)
     is_owner = db.Column(db.Boolean(), default=False)
     account = db.relationship('UserAccount')
@@ -45,9 +53,9 @@ class OrgsMembers(db.Model):  # type: ignore
     __bind_key__ = 'dashboard_service'
     __tablename__ = "orgs_members"
     org_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey('org.id'), primary_key=True)
+        UUID(), db.ForeignKey('org.id'), primary_key=True)
     account_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey('user_account.id'),
+        UUID(), db.ForeignKey('user_account.id'),
         primary_key=True)
     is_owner = db.Column(db.Boolean(), default=False)
     account = db.relationship('UserAccount')
@@ -58,7 +66,7 @@ class UserAccount(db.Model):  # type: ignore
     __bind_key__ = 'dashboard_service'
     __tablename__ = 'user_account'
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
+        UUID(), primary_key=True, default=uuid.uuid4)
     joined_dt = db.Column(db.DateTime(), server_default=func.now())
     closed_dt = db.Column(db.DateTime())
     inactive_dt = db.Column(db.DateTime())
@@ -70,11 +78,12 @@ class UserAccount(db.Model):  # type: ignore
     privacy = db.relationship(
         'UserPrivacy', backref='account', uselist=False,
         cascade="all, delete-orphan")
+    # loaded only when needed, see `UserAccount.get_by_id`
     workspaces = db.relationship(
         'Workspace', secondary="workspaces_members",
-        lazy='subquery', backref=db.backref('accounts', lazy=True))
+        backref=db.backref('accounts', lazy=True))
     orgs = db.relationship(
-        'Org', secondary="orgs_members", lazy='subquery',
+        'Org', secondary="orgs_members",
         backref=db.backref('accounts', lazy=True))
     # direct access to the unique personal org
     # but this org is also part of the many to many relationship
@@ -101,13 +110,50 @@ class UserAccount(db.Model):  # type: ignore
             "profile": self.info.to_public_dict()
         }
 
+    @staticmethod
+    def get_by_id(account_id: Union[str, uuid.UUID],
+                  with_memberships: bool = False) -> Optional['UserAccount']:
+        """
+        Lookup the account, along with what `to_short_dict` needs, in a
+        single query.
+
+        Its workspaces and organizations, needed by `to_public_dict`, are
+        loaded as well when `with_memberships` is set.
+        """
+        options = UserAccount.short_dict_options()
+        if with_memberships:
+            options.extend([
+                selectinload(UserAccount.workspaces),
+                selectinload(UserAccount.orgs)
+            ])
+        return UserAccount.query.options(*options).filter(
+            UserAccount.id==account_id).first()
+
+    @staticmethod
+    def short_dict_options(relationship: Any = None) -> List[Any]:
+        """
+        Loader options fetching what `to_short_dict` needs in the same query
+        as the accounts, or as the entities they are related to through
+        `relationship`.
+        """
+        if relationship is None:
+            return [
+                joinedload(UserAccount.personal_org),
+                joinedload(UserAccount.info)
+            ]
+
+        return [
+            joinedload(relationship).joinedload(UserAccount.personal_org),
+            joinedload(relationship).joinedload(UserAccount.info)
+        ]
+
 
 class UserInfo(db.Model):  # type: ignore
     __bind_key__ = 'dashboard_service'
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
+        UUID(), primary_key=True, default=uuid.uuid4)
     account_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey('user_account.id'),
+        UUID(), db.ForeignKey('user_account.id'),
         nullable=False)
     last_updated = db.Column(
         db.DateTime(), server_default=func.now(),
@@ -118,10 +164,11 @@ class UserInfo(db.Model):  # type: ignore
     username = db.Column(db.String, index=True, nullable=True)
     fullname = db.Column(db.String, index=True, nullable=True)
 
-    details = db.Column(
+    # only read, and decrypted, when the profile is actually needed
+    details = deferred(db.Column(
         EncryptedType(
             db.String, get_user_info_secret_key, AesEngine, 'pkcs5'),
-        nullable=False)
+        nullable=False))
 
     @staticmethod
     def get_for_account(account_id: Union[str, uuid.UUID]) -> 'UserInfo':
@@ -155,22 +202,45 @@ class UserInfo(db.Model):  # type: ignore
         }
 
     def to_public_dict(self):
-        p = self.profile
+        """
+        The user's public profile, decrypted once and then kept in memory
+        until the profile is updated.
+        """
+        cached = _profile_cache.get(self.account_id)
+        if cached is not MISSING and cached[0] == self.last_updated:
+            return dict(cached[1])
 
-        return {
+        p = self.profile
+        d = {
             "id": shortuuid.encode(self.id),
             "username": p.get("preferred_username"),
             "name": p.get("name"),
             "picture": p.get("picture")
         }
+        if self.account_id is not None:
+            _profile_cache.set(self.account_id, (self.last_updated, d))
+        return dict(d)
+
+
+# trigram indexes are provided by the pg_trgm extension
+event.listen(
+    UserInfo.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(
+        dialect="postgresql"))
+db.Index(
+    "user_info_username_trgm_idx", UserInfo.username,
+    postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"})
+db.Index(
+    "user_info_fullname_trgm_idx", UserInfo.fullname,
+    postgresql_using="gin", postgresql_ops={"fullname": "gin_trgm_ops"})
 
 
 class UserPrivacy(db.Model):  # type: ignore
     __bind_key__ = 'dashboard_service'
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
+        UUID(), primary_key=True, default=uuid.uuid4)
     account_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey('user_account.id'),
+        UUID(), db.ForeignKey('user_account.id'),
         nullable=False)
     last_changed = db.Column(db.DateTime(), server_default=func.now())
     details = db.Column(JSONB())
@@ -217,13 +287,13 @@ class Workspace(db.Model):  # type: ignore
     )
 
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
+        UUID(), primary_key=True, default=uuid.uuid4)
     name = db.Column(db.String(), nullable=False)
     name_lower = db.Column(db.String(), nullable=False)
     kind = db.Column(
         db.Enum(WorkspaceType), nullable=False, default=WorkspaceType.personal)
     org_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey('org.id'), nullable=False)
+        UUID(), db.ForeignKey('org.id'), nullable=False)
     settings = db.Column(
         JSONB(), nullable=False, default=DEFAULT_WORKSPACE_SETTINGS)
 
@@ -257,12 +327,25 @@ class Workspace(db.Model):  # type: ignore
             Workspace.name_lower==workspace_name.lower()).first()
 
     @staticmethod
+    @request_memoized
     def get_by_id(workspace_id: Union[str, uuid.UUID]) -> 'Workspace':
         """
         Get a workspace by its identifier
         """
         return Workspace.query.filter(Workspace.id==workspace_id).first()
 
+    @staticmethod
+    def get_by_ids(workspace_ids: Collection[Union[str, uuid.UUID]]) \
+            -> List['Workspace']:
+        """
+        Get all the workspaces matching the given identifiers at once
+        """
+        if not workspace_ids:
+            return []
+        return Workspace.query.filter(
+            Workspace.id.in_(list(workspace_ids))).all()
+
+    @request_memoized
     def is_collaborator(self, account_id: Union[str, uuid.UUID]) -> bool:
         """
         Return `True` when the given account is a collaborator to this
@@ -272,6 +355,7 @@ class Workspace(db.Model):  # type: ignore
             WorkpacesMembers.workspace_id==self.id,
             WorkpacesMembers.account_id==account_id).first() is not None
 
+    @request_memoized
     def is_owner(self, account_id: Union[str, uuid.UUID]) -> bool:
         """
         Return `True` when the given account is an owner of the workspace
@@ -328,6 +412,11 @@ class Workspace(db.Model):  # type: ignore
             WorkpacesMembers.account_id==account_id).delete()
 
 
+db.Index(
+    "workspace_org_name_lower_uniq", Workspace.org_id, Workspace.name_lower,
+    unique=True)
+
+
 class OrgType(Enum):
     personal = "personal"
     collaborative = "collaborative"
@@ -352,11 +441,11 @@ class Org(db.Model):  # type: ignore
     __bind_key__ = 'dashboard_service'
 
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
+        UUID(), primary_key=True, default=uuid.uuid4)
     # only set when this is a personal org linked to a single account,
     # otherwise it's not set
     account_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey('user_account.id'),
+        UUID(), db.ForeignKey('user_account.id'),
         nullable=True)
     name = db.Column(db.String(), nullable=False, unique=True)
     name_lower = db.Column(db.String(), nullable=False, unique=True)
@@ -413,6 +502,7 @@ class Org(db.Model):  # type: ignore
                 suggested_name, secrets.randbelow(1000))
 
     @staticmethod
+    @request_memoized
     def get_by_id(org_id: Union[str, uuid.UUID]) -> 'Org':
         """
         Lookup an organization by its identifier
@@ -420,6 +510,17 @@ class Org(db.Model):  # type: ignore
         return Org.query.filter(Org.id==org_id).first()
 
     @staticmethod
+    def get_by_ids(org_ids: Collection[Union[str, uuid.UUID]]) \
+            -> List['Org']:
+        """
+        Lookup all the organizations matching the given identifiers at once
+        """
+        if not org_ids:
+            return []
+        return Org.query.filter(Org.id.in_(list(org_ids))).all()
+
+    @staticmethod
+    @request_memoized
     def find_by_name(org_name: str) -> 'Org':
         """
         Lookup an organization by its name
@@ -431,13 +532,11 @@ class Org(db.Model):  # type: ignore
         """
         Lookup a workspace in the organization by its name
         """
-        w_name = workspace_name.lower()
-        for workspace in self.workspaces:
-            if workspace.name_lower == w_name:
-                return workspace
-
-        return None
+        return Workspace.query.filter(
+            Workspace.org_id==self.id,
+            Workspace.name_lower==workspace_name.lower()).first()
 
+    @request_memoized
     def is_member(self, account_id: Union[str, uuid.UUID]) -> bool:
         """
         Return `True` when the given account is a member of the organization
@@ -446,6 +545,7 @@ class Org(db.Model):  # type: ignore
             OrgsMembers.org_id==self.id,
             OrgsMembers.account_id==account_id).first() is not None
 
+    @request_memoized
     def is_owner(self, account_id: Union[str, uuid.UUID]) -> bool:
         """
         Return `True` when the given account is an owner of the organization
@@ -526,12 +626,16 @@ class Activity(db.Model):  # type: ignore
     __bind_key__ = 'dashboard_service'
 
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
-    account_id = db.Column(UUIDType(binary=False), nullable=True)
-    org_id = db.Column(UUIDType(binary=False), nullable=True)
-    workspace_id = db.Column(UUIDType(binary=False), nullable=True)
-    experiment_id = db.Column(UUIDType(binary=False), nullable=True)
-    execution_id = db.Column(UUIDType(binary=False), nullable=True)
+        UUID(), primary_key=True, default=uuid.uuid4)
+    account_id = db.Column(UUID(), nullable=True)
+    org_id = db.Column(UUID(), nullable=True)
+    workspace_id = db.Column(UUID(), nullable=True)
+    experiment_id = db.Column(UUID(), nullable=True)
+    execution_id = db.Column(UUID(), nullable=True)
+    # display names as they were when the activity was recorded so that
+    # reading a feed doesn't need to lookup orgs and workspaces
+    org_name = db.Column(db.String, nullable=True)
+    workspace_name = db.Column(db.String, nullable=True)
     timestamp = db.Column(
         db.BigInteger,
         default=lambda: int(datetime.utcnow().timestamp() * 1000))
@@ -615,29 +719,72 @@ class Activity(db.Model):  # type: ignore
     @staticmethod
     def get_recents_for_account(account_id: Union[str, uuid.UUID],
                                 visibility: ActivityVisibility,
-                                last: int = 10) -> List['Activity']:
-        return Activity.query.filter(
-            Activity.account_id==account_id,
-            Activity.visibility<=visibility)\
-            .order_by(Activity.timestamp.desc())\
-            .limit(last)
+                                last: int = 10,
+                                before: Cursor = None) -> List['Activity']:
+        return Activity.get_recents(
+            Activity.account_id==account_id, visibility, last, before)
 
     @staticmethod
     def get_recents_for_org(org_id: Union[str, uuid.UUID],
                             visibility: ActivityVisibility,
-                            last: int = 10) -> List['Activity']:
-        return Activity.query.filter(
-            Activity.org_id==org_id,
-            Activity.visibility<=visibility)\
-            .order_by(Activity.timestamp.desc())\
-            .limit(last)
+                            last: int = 10,
+                            before: Cursor = None) -> List['Activity']:
+        return Activity.get_recents(
+            Activity.org_id==org_id, visibility, last, before)
 
     @staticmethod
     def get_recents_for_workspace(workspace_id: Union[str, uuid.UUID],
                                   visibility: ActivityVisibility,
-                                  last: int = 10) -> List['Activity']:
-        return Activity.query.filter(
-            Activity.workspace_id==workspace_id,
-            Activity.visibility<=visibility)\
-            .order_by(Activity.timestamp.desc())\
-            .limit(last)
+                                  last: int = 10,
+                                  before: Cursor = None) -> List['Activity']:
+        return Activity.get_recents(
+            Activity.workspace_id==workspace_id, visibility, last, before)
+
+    @staticmethod
+    def get_recents(criterion: Any, visibility: ActivityVisibility,
+                    last: int = 10, before: Cursor = None) -> List['Activity']:
+        """
+        Return the `last` most recent activities matching the criterion.
+
+        When `before` is set, only activities following that cursor are
+        returned so that callers can page through the feed by passing the
+        timestamp and identifier of the last activity they received.
+        """
+        query = Activity.query.filter(
+            criterion, Activity.visibility<=visibility)
+        if before is not None:
+            query = query.filter(
+                before_cursor(Activity.timestamp, Activity.id, before))
+        return query.order_by(
+            Activity.timestamp.desc(), Activity.id.desc()).limit(last)
+
+
+db.Index(
+    "activity_account_visibility_timestamp_idx", Activity.account_id,
+    Activity.visibility, Activity.timestamp.desc())
+db.Index(
+    "activity_org_visibility_timestamp_idx", Activity.org_id,
+    Activity.visibility, Activity.timestamp.desc())
+db.Index(
+    "activity_workspace_visibility_timestamp_idx", Activity.workspace_id,
+    Activity.visibility, Activity.timestamp.desc())
+
+
+def setup_profile_cache(main_app: Flask):
+    """
+    Size the cache of decrypted public profiles from the
+    `PROFILE_CACHE_SIZE` and `PROFILE_CACHE_TTL` settings.
+    """
+    _profile_cache.clear()
+    _profile_cache.maxsize = main_app.config.get("PROFILE_CACHE_SIZE", 1024)
+    _profile_cache.ttl = main_app.config.get("PROFILE_CACHE_TTL", 300)
+
+
+def evict_cached_profile(account_id: Union[str, uuid.UUID]):
+    """
+    Forget the public profile of the account so it is decrypted again on
+    its next use.
+    """
+    if isinstance(account_id, str):
+        account_id = uuid.UUID(account_id)
+    _profile_cache.delete(account_id)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from queue import Empty, Queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from flask import Flask
+
+from chaoshubdashboard.model import db
+
+from .model import Activity
+
+__all__ = ["ActivityRecorder", "setup_activity_recorder",
+           "get_activity_recorder", "shutdown_activity_recorder"]
+
+# once this has been set, this shouldn't change so making it global is fair
+_recorder: Optional['ActivityRecorder'] = None
+
+# pushed onto the queue to let the writer know it must terminate
+_STOP = object()
+
+
+class ActivityRecorder(threading.Thread):
+    """
+    Write activities to the database from a background thread.
+
+    Activities are queued by the request handlers and inserted in bulk
+    once `batch_size` of them are pending or, at the latest, every
+    `flush_interval` seconds.
+    """
+    def __init__(self, app: Flask, batch_size: int = 100,
+                 flush_interval: float = 1.0) -> None:
+        threading.Thread.__init__(self, name="activity-recorder", daemon=True)
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: Queue = Queue()
+
+    def record(self, activity: Dict[str, Any]):
+        """
+        Queue the activity's column values to be written later on.
+        """
+        self.queue.put(activity)
+
+    def shutdown(self, timeout: float = None):
+        """
+        Write all pending activities and terminate the writer.
+        """
+        self.queue.put(_STOP)
+        self.join(timeout)
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+
+                try:
+                    activity = self.queue.get(timeout=timeout)
+                except Empty:
+                    break
+
+                if activity is _STOP:
+                    stopping = True
+                    break
+                batch.append(activity)
+
+            if batch:
+                self.flush(batch)
+
+    def flush(self, batch: List[Dict[str, Any]]):
+        with self.app.app_context():
+            try:
+                db.session.bulk_insert_mappings(Activity, batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.error(
+                    "Failed to record {} activities".format(len(batch)),
+                    exc_info=True)
+            finally:
+                db.session.remove()
+
+
+def setup_activity_recorder(app: Flask) -> Optional[ActivityRecorder]:
+    """
+    Start the background activity writer when `ACTIVITY_QUEUE_ENABLED` is
+    set. Otherwise, activities are written synchronously.
+    """
+    global _recorder
+
+    if not app.config.get("ACTIVITY_QUEUE_ENABLED"):
+        return None
+
+    shutdown_activity_recorder()
+    _recorder = ActivityRecorder(
+        app, batch_size=app.config.get("ACTIVITY_QUEUE_BATCH_SIZE", 100),
+        flush_interval=app.config.get("ACTIVITY_QUEUE_FLUSH_INTERVAL", 1.0))
+    _recorder.start()
+    return _recorder
+
+
+def get_activity_recorder() -> Optional[ActivityRecorder]:
+    """
+    Return the running activity writer, if any.
+    """
+    return _recorder
+
+
+def shutdown_activity_recorder():
+    """
+    Drain the pending activities and stop the background writer. This is
+    synchronous, thus blocking the main process.
+    """
+    global _recorder
+
+    recorder = _recorder
+    _recorder = None
+    if recorder:
+        recorder.shutdown()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Optional, Tuple
+import uuid
+
+from flask import Flask, g, has_request_context
+from flask_caching import Cache
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload
+
+from chaoshubdashboard.lru import LRUCache, MISSING
+
+from .model import Org, Workspace
+
+__all__ = ["NameResolver", "setup_name_resolver", "get_name_resolver"]
+
+# once this has been set, this shouldn't change so making it global is fair
+_resolver: Optional['NameResolver'] = None
+
+# caches that are no better than the process-local one
+LOCAL_CACHE_TYPES = ("null", "simple")
+
+
+class NameResolver:
+    """
+    Resolve the names of organizations and workspaces, as found in URLs,
+    to their rows.
+
+    The identifiers behind each name are kept in a process-local LRU cache
+    and, when `shared` is set, in the application cache so that all
+    processes benefit from them. A cached identifier is a single primary
+    key query away from its row.
+
+    Entries belong to a generation which is bumped whenever an organization
+    or a workspace is renamed or deleted, dropping them all at once. Rows
+    are still checked against the resolved names so that a stale entry is
+    never served, for instance when the rename happened in a process not
+    sharing the cache.
+    """
+    generation_key = "name-resolver:generation"
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300,
+                 shared: Cache = None) -> None:
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self.ttl = ttl
+        self.local_generation = 0
+
+    def generation(self) -> int:
+        """
+        Current generation of the cached names. When shared, it is read
+        from the application cache once per request.
+        """
+        if self.shared is None:
+            return self.local_generation
+
+        if has_request_context() and "name_generation" in g:
+            return g.name_generation
+
+        generation = self.shared.get(self.generation_key) or 0
+        if has_request_context():
+            g.name_generation = generation
+        return generation
+
+    def bump(self):
+        """
+        Move to a new generation, forgetting all the names resolved so far.
+        """
+        self.local_generation += 1
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.cache.inc(self.generation_key)
+            if has_request_context():
+                g.pop("name_generation", None)
+
+    def find_org(self, org_name: str) -> Optional[Org]:
+        """
+        Lookup an organization by its name, ignoring case.
+        """
+        name = org_name.lower()
+        key = ("org", name)
+        ids = self.get(key)
+        if ids is not MISSING:
+            o = Org.get_by_id(ids[0])
+            if o and o.name_lower == name:
+                return o
+            self.delete(key)
+
+        o = Org.find_by_name(name)
+        if o:
+            self.set(key, (o.id,))
+        return o
+
+    def find_workspace(self, org_name: str,
+                       workspace_name: str) -> Optional[Workspace]:
+        """
+        Lookup a workspace by its name and the name of its organization,
+        ignoring case. The organization is loaded along.
+        """
+        names = (org_name.lower(), workspace_name.lower())
+        key = ("workspace",) + names
+        ids = self.get(key)
+        if ids is not MISSING:
+            w = Workspace.query.options(joinedload(Workspace.org)).filter(
+                Workspace.id==ids[1]).first()
+            if w and w.org_id == ids[0] and \
+                    (w.org.name_lower, w.name_lower) == names:
+                return w
+            self.delete(key)
+
+        w = Workspace.query.join(Org, Workspace.org_id==Org.id).options(
+            joinedload(Workspace.org)).filter(
+                Org.name_lower==names[0],
+                Workspace.name_lower==names[1]).first()
+        if w:
+            self.set(key, (w.org_id, w.id))
+        return w
+
+    def get(self, key: Tuple[str, ...]) -> Any:
+        generation = self.generation()
+        ids = self.local.get((generation,) + key)
+        if ids is MISSING and self.shared is not None:
+            ids = self.shared.get(self.shared_key(generation, key))
+            if ids is None:
+                ids = MISSING
+            else:
+                self.local.set((generation,) + key, ids)
+        return ids
+
+    def set(self, key: Tuple[str, ...], ids: Tuple[uuid.UUID, ...]):
+        generation = self.generation()
+        self.local.set((generation,) + key, ids)
+        if self.shared is not None:
+            self.shared.set(
+                self.shared_key(generation, key), ids, timeout=self.ttl)
+
+    def delete(self, key: Tuple[str, ...]):
+        generation = self.generation()
+        self.local.delete((generation,) + key)
+        if self.shared is not None:
+            self.shared.delete(self.shared_key(generation, key))
+
+    def shared_key(self, generation: int, key: Tuple[str, ...]) -> str:
+        return "name-resolver:{}:{}".format(generation, ":".join(key))
+
+
+def setup_name_resolver(main_app: Flask,
+                        cache: Cache = None) -> NameResolver:
+    """
+    Create the resolver of organization and workspace names, sized from the
+    `NAME_CACHE_SIZE` and `NAME_CACHE_TTL` settings.
+
+    The application cache is shared with the resolver only when it lives
+    outside of the process, such as Redis, see `CACHE_TYPE`.
+    """
+    global _resolver
+
+    shared = None
+    if cache is not None and \
+            main_app.config.get("CACHE_TYPE") not in LOCAL_CACHE_TYPES:
+        shared = cache
+
+    _resolver = NameResolver(
+        maxsize=main_app.config.get("NAME_CACHE_SIZE", 1024),
+        ttl=main_app.config.get("NAME_CACHE_TTL", 300),
+        shared=shared)
+    return _resolver
+
+
+def get_name_resolver() -> NameResolver:
+    """
+    Return the resolver of organization and workspace names, a local one is
+    created when none was setup.
+    """
+    global _resolver
+
+    if _resolver is None:
+        _resolver = NameResolver()
+    return _resolver
+
+
+###############################################################################
+# Internals
+###############################################################################
+@event.listens_for(Org, "after_update")
+@event.listens_for(Workspace, "after_update")
+def _name_changed(mapper, connection, target: Any):
+    if _resolver is not None and \
+            inspect(target).attrs.name_lower.history.has_changes():
+        _resolver.bump()
+
+
+@event.listens_for(Org, "after_delete")
+@event.listens_for(Workspace, "after_delete")
+def _deleted(mapper, connection, target: Any):
+    if _resolver is not None:
+        _resolver.bump()
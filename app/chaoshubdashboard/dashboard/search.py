@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+import bisect
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+import uuid
+
+from flask import Flask
+from sqlalchemy import event, func, or_
+from sqlalchemy.orm import Query
+
+from chaoshubdashboard.model import db, get_db_conn_uri_from_env
+
+from .model import UserInfo
+
+__all__ = ["UserSearchIndex", "find_users", "filter_users",
+           "setup_user_search_index", "get_user_search_index"]
+
+# once this has been set, this shouldn't change so making it global is fair
+_index: Optional['UserSearchIndex'] = None
+
+# account identifier, username and full name of a matching user
+UserMatch = Tuple[uuid.UUID, Optional[str], Optional[str]]
+
+
+def trigrams(value: str) -> Set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def name_keys(value: Optional[str]) -> List[str]:
+    """
+    The lowered name and what follows each space in it, so that names can
+    be looked up by the start of any of their words.
+    """
+    value = (value or "").lower()
+    return [
+        value[i:] for i in range(len(value))
+        if value[i] != " " and (i == 0 or value[i - 1] == " ")
+    ]
+
+
+class UserSearchIndex:
+    """
+    In-process index of the usernames and full names of all users, for
+    databases which cannot index substring lookups.
+
+    Names, and each of their words, are kept sorted so that those starting
+    with the looked up text are found by bisection. Other matches are found
+    through the trigrams of the names.
+
+    The index is loaded from the database on first use and reloaded every
+    `refresh_interval` seconds, so that changes made by other processes
+    are eventually picked up. Changes made by this process are applied
+    as soon as they are flushed.
+    """
+    def __init__(self, refresh_interval: float = 300) -> None:
+        self.refresh_interval = refresh_interval
+        self.refreshed_at: Optional[float] = None
+        self.users: Dict[uuid.UUID, Tuple[Optional[str], Optional[str]]] = {}
+        self.keys: List[Tuple[str, uuid.UUID]] = []
+        self.grams: Dict[str, Set[uuid.UUID]] = {}
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def rebuild(self):
+        """
+        Load all the users from the database.
+        """
+        self.load(db.session.query(
+            UserInfo.account_id, UserInfo.username, UserInfo.fullname).all())
+
+    def load(self, users: List[UserMatch]):
+        """
+        Replace the indexed users with the given ones.
+        """
+        with self.lock:
+            self.users = {}
+            self.keys = []
+            self.grams = {}
+            for (account_id, username, fullname) in users:
+                self.keys.extend(self.index(account_id, username, fullname))
+            self.keys.sort()
+            self.refreshed_at = time.monotonic()
+
+    def add(self, account_id: uuid.UUID, username: Optional[str],
+            fullname: Optional[str]):
+        with self.lock:
+            self.remove(account_id)
+            for key in self.index(account_id, username, fullname):
+                bisect.insort(self.keys, key)
+
+    def remove(self, account_id: uuid.UUID):
+        with self.lock:
+            names = self.users.pop(account_id, None)
+            if not names:
+                return
+
+            for value in names:
+                for key in name_keys(value):
+                    i = bisect.bisect_left(self.keys, (key, account_id))
+                    if i < len(self.keys) and \
+                            self.keys[i] == (key, account_id):
+                        del self.keys[i]
+
+                for gram in trigrams((value or "").lower()):
+                    accounts = self.grams.get(gram)
+                    if accounts is not None:
+                        accounts.discard(account_id)
+                        if not accounts:
+                            del self.grams[gram]
+
+    def search(self, q: str, count: int = 10,
+               within: Set[uuid.UUID] = None) -> List[UserMatch]:
+        """
+        Return at most `count` users whose username or full name contains
+        `q`, ignoring case. Users with a name, or a word of it, starting
+        with `q` come first, in alphabetical order, followed by the other
+        matches, in alphabetical order too.
+
+        When `within` is set, only these accounts are considered.
+        """
+        q = q.lower()
+        found: List[uuid.UUID] = []
+
+        with self.lock:
+            if self.refreshed_at is None or \
+                    time.monotonic() - self.refreshed_at > \
+                    self.refresh_interval:
+                self.rebuild()
+
+            i = bisect.bisect_left(self.keys, (q,))
+            while i < len(self.keys) and len(found) < count:
+                (key, account_id) = self.keys[i]
+                if not key.startswith(q):
+                    break
+                if account_id not in found and \
+                        (within is None or account_id in within):
+                    found.append(account_id)
+                i += 1
+
+            if len(found) < count:
+                if len(q) >= 3:
+                    postings = [self.grams.get(g, set()) for g in trigrams(q)]
+                    candidates = set.intersection(*postings)
+                    if within is not None:
+                        candidates = candidates.intersection(within)
+                elif within is not None:
+                    candidates = within.intersection(self.users)
+                else:
+                    candidates = set(self.users)
+
+                others = []
+                for account_id in candidates:
+                    if account_id in found:
+                        continue
+                    matching = [
+                        value for value in map(
+                            str.lower, filter(None, self.users[account_id]))
+                        if q in value
+                    ]
+                    if matching:
+                        others.append((min(matching), account_id))
+                others = heapq.nsmallest(count - len(found), others)
+                found.extend(account_id for (_, account_id) in others)
+
+            return [(a, *self.users[a]) for a in found]
+
+    def index(self, account_id: uuid.UUID, username: Optional[str],
+              fullname: Optional[str]) -> List[Tuple[str, uuid.UUID]]:
+        """
+        Index the user's names and return the keys to keep sorted.
+        """
+        self.users[account_id] = (username, fullname)
+        keys: List[Tuple[str, uuid.UUID]] = []
+        for value in (username, fullname):
+            keys.extend((key, account_id) for key in name_keys(value))
+            for gram in trigrams((value or "").lower()):
+                self.grams.setdefault(gram, set()).add(account_id)
+        return keys
+
+
+def find_users(q: str, count: int = 10) -> List[UserMatch]:
+    """
+    Find at most `count` users whose username or full name contains `q`,
+    best matches first.
+
+    On PostgreSQL, names are looked up through their trigram indexes and
+    ranked by similarity. Elsewhere, the in-process user search index
+    is used.
+    """
+    index = _index
+    if index is not None:
+        return index.search(q, count)
+
+    matches = filter_users(db.session.query(
+        UserInfo.account_id, UserInfo.username, UserInfo.fullname), q)
+    return [
+        (account_id, username, fullname)
+        for (account_id, username, fullname) in matches.limit(count)
+    ]
+
+
+def filter_users(query: Query, q: str) -> Query:
+    """
+    Filter the query, which must select from `UserInfo`, to the users whose
+    username or full name contains `q`. On PostgreSQL, the best matches
+    come first.
+    """
+    pattern = "%{}%".format(
+        q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_"))
+    query = query.filter(
+        or_(
+            UserInfo.username.ilike(pattern, escape="\\"),
+            UserInfo.fullname.ilike(pattern, escape="\\")
+        )
+    )
+
+    dialect = db.get_engine(bind=UserInfo.__bind_key__).dialect.name
+    if dialect == "postgresql":
+        query = query.order_by(func.greatest(
+            func.similarity(UserInfo.username, q),
+            func.similarity(UserInfo.fullname, q)).desc())
+    return query
+
+
+def setup_user_search_index(app: Flask) -> Optional[UserSearchIndex]:
+    """
+    Create the in-process user search index when the database cannot
+    index substring lookups, that is anything but PostgreSQL.
+    """
+    global _index
+
+    if get_db_conn_uri_from_env().startswith("postgresql"):
+        _index = None
+    else:
+        _index = UserSearchIndex(
+            refresh_interval=app.config.get(
+                "USER_SEARCH_INDEX_REFRESH_INTERVAL", 300))
+    return _index
+
+
+def get_user_search_index() -> Optional[UserSearchIndex]:
+    """
+    Return the in-process user search index, if any.
+    """
+    return _index
+
+
+###############################################################################
+# Internals
+###############################################################################
+@event.listens_for(UserInfo, "after_insert")
+@event.listens_for(UserInfo, "after_update")
+def _index_user(mapper, connection, target: UserInfo):
+    index = _index
+    if index is not None and index.refreshed_at is not None:
+        index.add(target.account_id, target.username, target.fullname)
+
+
+@event.listens_for(UserInfo, "after_delete")
+def _unindex_user(mapper, connection, target: UserInfo):
+    index = _index
+    if index is not None and index.refreshed_at is not None:
+        index.remove(target.account_id)
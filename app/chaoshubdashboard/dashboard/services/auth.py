@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
+from typing import List
+
 from flask import Flask
 
-from chaoshubdashboard.auth import generate_access_token, revoke_access_token
+from chaoshubdashboard.auth import generate_access_token, \
+    get_active_access_tokens, revoke_access_token
 from ..types import AccessToken, UserClaim
 
-__all__ = ["new_access_token", "revoke_user_access_token"]
+__all__ = ["new_access_token", "revoke_user_access_token",
+           "get_user_access_tokens"]
 
 
 def new_access_token(user_claim: UserClaim, token_name: str) -> AccessToken:
@@ -20,3 +24,10 @@ def revoke_user_access_token(user_claim: UserClaim, token_id: str):
     Revoke the given access token of that user.
     """
     revoke_access_token(user_claim["id"], token_id)
+
+
+def get_user_access_tokens(user_claim: UserClaim) -> List[AccessToken]:
+    """
+    Return the active access tokens of that user.
+    """
+    return get_active_access_tokens(user_claim)
@@ -8,9 +8,10 @@ from flask import abort, Blueprint, current_app, jsonify, redirect, \
 import shortuuid
 from sqlalchemy import or_
 
+from chaoshubdashboard.model import parse_cursor
 from chaoshubdashboard.utils import get_user_claim, load_user
 
-from .. import get_account_activities, lookup_users
+from .. import get_account_activities, get_activities_cursor, lookup_users
 from ..services import ExperimentService
 from ..model import Org, UserAccount, UserInfo, Workspace
 from ..types import UserClaim
@@ -37,17 +38,19 @@ def dashboard(user_claim: Dict[str, Any]) -> str:
         return abort(405)
 
     account_id = user_claim["id"]
-    account = UserAccount.query.filter(UserAccount.id==account_id).first()
+    account = UserAccount.get_by_id(account_id, with_memberships=True)
     if not account:
         return abort(404)
 
     caller = account.to_short_dict()
     org = account.personal_org
-    activities = get_account_activities(account.id, caller)
+    activities = get_account_activities(
+        account.id, caller, before=parse_cursor(request.args.get("before")))
     exps = ExperimentService.get_user_last_experiments(user_claim)
     info = {
         "requested_by": caller,
         "activities": activities,
+        "activities_cursor": get_activities_cursor(activities),
         "experiments": exps
     }
     info.update(account.to_public_dict())
@@ -6,15 +6,16 @@ from flask import abort, Blueprint, current_app, jsonify, redirect, \
     render_template, Response, request, session, url_for
 import shortuuid
 from sqlalchemy import distinct, or_
+from sqlalchemy.orm import joinedload
 
 from chaoshubdashboard.model import db
 from chaoshubdashboard.utils import load_user
 
-from .. import record_activity
+from .. import compute_workspaces_acls, record_activity
 from ..model import OrgsMembers, WorkpacesMembers, Org, OrgType, \
     UserAccount, UserInfo, Workspace, WorkspaceType, ExperimentVisibility, \
     ExecutionVisibility, DEFAULT_ORG_SETTINGS, DEFAULT_WORKSPACE_SETTINGS, \
-    ActivityVisibility, Activity
+    ActivityVisibility, Activity, evict_cached_profile
 from ..services import AuthService
 from ..types import UserClaim
 from ..validators import validate_org_name
@@ -68,6 +69,7 @@ def update_profile(user_claim: UserClaim):
     info.company = profile.get("company")
 
     db.session.commit()
+    evict_cached_profile(account_id)
 
     record_activity({
         "title": "Profile",
@@ -84,8 +86,7 @@ def update_profile(user_claim: UserClaim):
 @load_user(allow_anonymous=False)
 def tokens(user_claim: UserClaim):
     if request.headers.get('Accept') == 'application/json':
-        tokens = user_claim.get("tokens", [])
-        return jsonify([token for token in tokens if not token["revoked"]])
+        return jsonify(AuthService.get_user_access_tokens(user_claim))
     return render_template('index.html')
 
 
@@ -234,7 +235,8 @@ def workspaces(user_claim: UserClaim):
             Workspace.id.in_(
                 db.session.query(WorkpacesMembers.workspace_id).filter(
                     WorkpacesMembers.account_id==account_id)))
-    ).paginate(max_per_page=5, error_out=False)
+    ).options(joinedload(Workspace.org)).paginate(
+        max_per_page=5, error_out=False)
 
     orgs = []
     for membership in orgs_memberships:
@@ -242,10 +244,11 @@ def workspaces(user_claim: UserClaim):
         o["owner"] = membership.is_owner
         orgs.append(o)
 
+    acls = compute_workspaces_acls(account_id, workspaces.items)
     ws = []
     for workspace in workspaces.items:
         w = workspace.to_dict()
-        w["owner"] = workspace.is_owner(account_id)
+        w["owner"] = "owner" in acls[workspace.id]
         ws.append(w)
 
     result = {
@@ -7,12 +7,12 @@ from flask import abort, Blueprint, current_app, jsonify, redirect, \
     render_template, request, session, url_for
 import shortuuid
 
-from chaoshubdashboard.model import db
+from chaoshubdashboard.model import db, parse_cursor
 from chaoshubdashboard.utils import load_user
 
-from .. import can_org_be_deleted, get_org_from_url, \
-    is_org_viewable, load_org, lookup_members, lookup_workspaces, \
-    record_activity, get_caller_org_activities
+from .. import can_org_be_deleted, get_activities_cursor, \
+    get_org_from_url, is_org_viewable, load_org, lookup_members, \
+    lookup_workspaces, record_activity, get_caller_org_activities
 from ..model import Activity, ActivityVisibility, Org, OrgsMembers, OrgType, \
     UserAccount
 from ..services import ExperimentService
@@ -68,16 +68,21 @@ def dashboard(user_claim: Dict[str, Any], org: Org) -> str:
     info = {}
 
     caller = None
-    if user_claim:
+    account = UserAccount.get_by_id(user_claim["id"]) if user_claim else None
+    if account:
         account_id = user_claim["id"]
-        account = UserAccount.query.filter(UserAccount.id==account_id).first()
         caller = account.to_short_dict()
         caller["org_member"] = org.is_member(account_id)
         caller["org_owner"] = org_owner = org.is_owner(account_id)
         info["requested_by"] = caller
 
-    info["activities"] = get_caller_org_activities(org, caller)  # type: ignore
-    o_members = OrgsMembers.query.filter(
+    info["activities"] = get_caller_org_activities(
+        org, caller,  # type: ignore
+        before=parse_cursor(request.args.get("before")))
+    info["activities_cursor"] = get_activities_cursor(  # type: ignore
+        info["activities"])
+    o_members = OrgsMembers.query.options(
+        *UserAccount.short_dict_options(OrgsMembers.account)).filter(
         OrgsMembers.org_id==org.id).limit(5)
     info["members"] = [m.account.to_short_dict() for m in o_members]
 
@@ -126,9 +131,9 @@ def general(user_claim: UserClaim, org: Org):
         return render_template('index.html')
 
     account_id = user_claim["id"]
-    account = UserAccount.query.filter(UserAccount.id==account_id).first()
+    account = UserAccount.get_by_id(account_id)
 
-    if not org.is_member(account_id):
+    if not account or not org.is_member(account_id):
         return abort(404)
 
     caller = account.to_short_dict()
@@ -210,12 +215,13 @@ def members(user_claim: Dict[str, Any], org: Org) -> str:
         return render_template('index.html')
 
     account_id = user_claim["id"]
-    account = UserAccount.query.filter(UserAccount.id==account_id).first()
+    account = UserAccount.get_by_id(account_id)
 
-    if not org.is_member(account_id):
+    if not account or not org.is_member(account_id):
         return abort(404)
 
-    o_members = OrgsMembers.query.filter(
+    o_members = OrgsMembers.query.options(
+        *UserAccount.short_dict_options(OrgsMembers.account)).filter(
         OrgsMembers.org_id==org.id).paginate(
             max_per_page=10, error_out=False)
 
@@ -270,8 +276,7 @@ def add_user_as_org_member(user_claim: Dict[str, Any], org: Org):
         return abort(400)
 
     # the user to add
-    account = UserAccount.query.filter(
-        UserAccount.id==shortuuid.decode(user_id)).first()
+    account = UserAccount.get_by_id(shortuuid.decode(user_id))
     if not account:
         return abort(400)
 
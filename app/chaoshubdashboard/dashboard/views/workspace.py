@@ -6,9 +6,10 @@ from flask import abort, Blueprint, current_app, jsonify, redirect, \
     render_template, request, session, url_for
 import shortuuid
 
+from chaoshubdashboard.model import parse_cursor
 from chaoshubdashboard.utils import load_user
 
-from .. import get_workspace_from_url, \
+from .. import get_activities_cursor, get_workspace_from_url, \
     is_org_viewable, is_workspace_viewable, load_org_and_workspace, \
     lookup_collaborators, record_activity, get_caller_workspace_activities
 
@@ -47,9 +48,9 @@ def dashboard(user_claim: Dict[str, Any], org: Org,
     info = {}
 
     caller = None
-    if user_claim:
+    account = UserAccount.get_by_id(user_claim["id"]) if user_claim else None
+    if account:
         account_id = user_claim["id"]
-        account = UserAccount.query.filter(UserAccount.id==account_id).first()
         caller = account.to_short_dict()
         caller["org_member"] = org.is_member(account_id)
         caller["org_owner"] = org_owner = org.is_owner(account_id)
@@ -60,11 +61,14 @@ def dashboard(user_claim: Dict[str, Any], org: Org,
 
     exps = ExperimentService.get_workspace_last_experiments(workspace.id)
     info["activities"] = get_caller_workspace_activities(  # type: ignore
-        workspace, caller)
+        workspace, caller, before=parse_cursor(request.args.get("before")))
+    info["activities_cursor"] = get_activities_cursor(  # type: ignore
+        info["activities"])
     info["experiments"] = exps
     info["org"] = org.to_short_dict()
     info["workspace"] = workspace.to_dict()
-    w_members = WorkpacesMembers.query.filter(
+    w_members = WorkpacesMembers.query.options(
+        *UserAccount.short_dict_options(WorkpacesMembers.account)).filter(
         WorkpacesMembers.workspace_id==workspace.id).limit(5)
     info["collaborators"] = [m.account.to_short_dict() for m in w_members]
 
@@ -99,9 +103,9 @@ def general(user_claim: UserClaim, org: Org, workspace: Workspace):
         return render_template('index.html')
 
     account_id = user_claim["id"]
-    account = UserAccount.query.filter(UserAccount.id==account_id).first()
+    account = UserAccount.get_by_id(account_id)
 
-    if not org.is_member(account_id):
+    if not account or not org.is_member(account_id):
         return abort(404)
 
     caller = account.to_short_dict()
@@ -127,13 +131,14 @@ def collaborators(user_claim: Dict[str, Any], org: Org,
         return render_template('index.html')
 
     account_id = user_claim["id"]
-    account = UserAccount.query.filter(UserAccount.id==account_id).first()
+    account = UserAccount.get_by_id(account_id)
 
-    if not workspace.is_collaborator(account_id) or \
+    if not account or not workspace.is_collaborator(account_id) or \
        not org.is_member(account_id):
         return abort(404)
 
-    w_collaborators = WorkpacesMembers.query.filter(
+    w_collaborators = WorkpacesMembers.query.options(
+        *UserAccount.short_dict_options(WorkpacesMembers.account)).filter(
         WorkpacesMembers.workspace_id==workspace.id).paginate(
             max_per_page=10, error_out=False)
 
@@ -225,8 +230,7 @@ def add_user_as_collaborator(user_claim: Dict[str, Any], org: Org,
         return abort(400)
 
     # the user to add
-    account = UserAccount.query.filter(
-        UserAccount.id==shortuuid.decode(user_id)).first()
+    account = UserAccount.get_by_id(shortuuid.decode(user_id))
     if not account:
         return abort(400)
 
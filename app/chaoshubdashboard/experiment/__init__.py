@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from datetime import datetime
 from functools import wraps
 from typing import List, Optional, Tuple, Union
 import uuid
@@ -6,6 +7,10 @@ import uuid
 from flask import abort, jsonify, request, current_app
 from chaoshubdashboard.model import db
 import shortuuid
+from sqlalchemy import cast, func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
 from .model import Execution as Exec, Experiment as Exp
 from .services import DashboardService
@@ -18,7 +23,12 @@ __all__ = ["get_last_updated_experiments", "get_recent_experiments_in_org",
            "get_recent_public_experiments_in_workspace", "store_execution",
            "get_recent_executions_in_org", "store_experiment",
            "get_experiment_in_workspace_for_user", "can_write_to_workspace",
-           "load_execution"]
+           "load_execution", "store_executions", "get_experiment_executions",
+           "migrate_execution_journals", "search_experiments"]
+
+# how many times storing executions is tried when their timestamps were
+# taken by executions stored at the same time
+STORE_EXECUTIONS_ATTEMPTS = 5
 
 
 def get_experiment(experiment_id: str) -> Optional[Experiment]:
@@ -50,6 +60,7 @@ def store_experiment(user_claim: UserClaim, org: str, workspace: str,
         workspace_id=shortuuid.decode(workspace),
         payload=payload
     )
+    experiment.extract_search_fields()
     db.session.add(experiment)
     db.session.commit()
 
@@ -58,18 +69,66 @@ def store_experiment(user_claim: UserClaim, org: str, workspace: str,
 
 def store_execution(user_claim: UserClaim, org: str, workspace: str,
                     experiment: str, payload: Experiment) -> Experiment:
-    execution = Exec(
-        experiment_id=shortuuid.decode(experiment),
-        account_id=user_claim["id"],
-        org_id=shortuuid.decode(org),
-        workspace_id=shortuuid.decode(workspace),
-        payload=payload,
-        status=payload.get('status', 'unknown')
-    )
-    db.session.add(execution)
-    db.session.commit()
+    return store_executions(
+        user_claim, org, workspace, experiment, [payload])[0]
 
-    return execution.to_dict()
+
+def store_executions(user_claim: UserClaim, org: str, workspace: str,
+                     experiment: str, payloads: List[Run]) -> List[Execution]:
+    """
+    Store all the given executions of the experiment at once, in a single
+    transaction.
+
+    Executions are given consecutive timestamps, in the order they were
+    provided, following the most recent execution of the experiment so that
+    they remain unique per experiment. When executions of the experiment
+    were stored meanwhile with the same timestamps, the following ones are
+    tried, up to `STORE_EXECUTIONS_ATTEMPTS` times.
+    """
+    if not payloads:
+        return []
+
+    experiment_id = shortuuid.decode(experiment)
+    attempt = 1
+    while True:
+        start = next_execution_timestamp(experiment_id)
+        executions = []
+        for (index, payload) in enumerate(payloads):
+            executions.append(Exec(
+                id=uuid.uuid4(),
+                timestamp=start + index,
+                experiment_id=experiment_id,
+                account_id=user_claim["id"],
+                org_id=shortuuid.decode(org),
+                workspace_id=shortuuid.decode(workspace),
+                payload=payload,
+                status=payload.get('status', 'unknown')
+            ))
+
+        try:
+            db.session.bulk_save_objects(executions)
+            db.session.commit()
+            break
+        except IntegrityError:
+            db.session.rollback()
+            if attempt >= STORE_EXECUTIONS_ATTEMPTS:
+                raise
+            attempt += 1
+
+    return [execution.to_dict() for execution in executions]
+
+
+def next_execution_timestamp(experiment_id: uuid.UUID) -> int:
+    """
+    Return the timestamp of an execution of the experiment stored now, past
+    the timestamp of its most recent execution.
+    """
+    now = int(datetime.utcnow().timestamp() * 1000)
+    last = db.session.query(func.max(Exec.timestamp)).filter(
+        Exec.experiment_id==experiment_id).scalar()
+    if last is None:
+        return now
+    return max(now, last + 1)
 
 
 def get_last_updated_experiments(user_claim: UserClaim) -> List[Experiment]:
@@ -150,6 +209,105 @@ def get_recent_executions_in_workspace(workspace_id: str,
     return runs
 
 
+def get_experiment_executions(experiment_id: Union[str, uuid.UUID],
+                              visibility: str = "status",
+                              before: int = None, limit: int = 100,
+                              fields: List[str] = None) -> List[Run]:
+    """
+    List a page of the experiment's executions, most recent first.
+
+    Pass the timestamp of the last execution of a page as `before` to get
+    the next one. Timestamps are unique per experiment, the
+    `index_per_experiment_uniq` constraint enforces it and `store_executions`
+    stamps executions accordingly, so they are enough to page through them.
+
+    When `fields` is set, only those fields are returned. The
+    execution's journal is only read from the database when the `result`
+    field is visible and requested.
+    """
+    with_payload = visibility == "full" and (not fields or "result" in fields)
+
+    executions = Exec.query.filter(Exec.experiment_id==experiment_id)
+    if with_payload:
+        executions = executions.options(joinedload(Exec.journal))
+    if before is not None:
+        executions = executions.filter(Exec.timestamp<before)
+    executions = executions.order_by(Exec.timestamp.desc()).limit(limit)
+
+    runs = []
+    for e in executions:
+        run = e.to_dict(visibility=visibility, with_payload=with_payload)
+        if fields:
+            run = {k: v for (k, v) in run.items() if k in fields}
+        runs.append(run)
+    return runs
+
+
+def migrate_execution_journals(batch_size: int = 500) -> int:
+    """
+    Move the journals still stored inline in the execution rows to the
+    journal store, `batch_size` executions per transaction.
+
+    Return how many executions were migrated.
+    """
+    migrated = 0
+    while True:
+        executions = Exec.query.filter(
+            Exec.journal_id.is_(None),
+            Exec.legacy_payload.isnot(None)).limit(batch_size).all()
+        if not executions:
+            return migrated
+
+        for execution in executions:
+            execution.payload = execution.legacy_payload
+        db.session.commit()
+        migrated += len(executions)
+
+
+def search_experiments(user_claim: UserClaim, terms: str = None,
+                       tags: List[str] = None, limit: int = 50) \
+                       -> List[Experiment]:
+    """
+    Search the user's experiments whose title contains `terms`, ignoring
+    case, and which are tagged with all the given `tags`. Most recently
+    updated experiments come first.
+
+    On PostgreSQL, the search relies on the trigram index of the titles and
+    the GIN index of the tags. Other databases have no such indexes, the
+    titles and tags of the user's experiments are matched in-process
+    instead.
+    """
+    terms = (terms or "").strip().lower()
+    tags = tags or []
+
+    experiments = Exp.query.filter(Exp.account_id==user_claim["id"])
+
+    dialect = db.get_engine(bind=Exp.__bind_key__).dialect.name
+    if dialect == "postgresql":
+        if terms:
+            pattern = terms.replace("\\", "\\\\").replace(
+                "%", "\\%").replace("_", "\\_")
+            experiments = experiments.filter(
+                Exp.title.ilike("%{}%".format(pattern), escape="\\"))
+        if tags:
+            experiments = experiments.filter(
+                Exp.tags.op("@>")(cast(tags, postgresql.JSONB)))
+    elif terms or tags:
+        candidates = db.session.query(Exp.id, Exp.title, Exp.tags).filter(
+            Exp.account_id==user_claim["id"])
+        matches = [
+            c.id for c in candidates
+            if terms in (c.title or "").lower()
+            if set(tags).issubset(c.tags or [])
+        ]
+        if not matches:
+            return []
+        experiments = experiments.filter(Exp.id.in_(matches))
+
+    experiments = experiments.order_by(Exp.updated_date.desc()).limit(limit)
+    return [e.to_public_dict(with_payload=False) for e in experiments]
+
+
 def can_write_to_workspace(workspace: Workspace) -> bool:
     acls = workspace.get("context", {}).get("acls", [])
     return "view" in acls and "write" in acls
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from typing import Any, Dict, Iterator, Union
+import uuid
+import zlib
+
+import simplejson as json
+from sqlalchemy.orm import joinedload
+
+from .model import Execution, Experiment
+
+__all__ = ["export_workspace", "iter_workspace_records"]
+
+# how many rows are fetched from the database cursor at once
+EXPORT_BATCH_SIZE = 500
+
+
+def export_workspace(workspace_id: Union[str, uuid.UUID],
+                     since: int = None) -> Iterator[bytes]:
+    """
+    Export all the experiments and executions of the workspace as
+    gzip-compressed newline-delimited JSON.
+
+    Chunks are generated as rows are read from the database so that the
+    whole workspace is never held in memory.
+
+    When `since` is set, a timestamp in milliseconds, only experiments
+    updated and executions run from that moment are exported.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for record in iter_workspace_records(workspace_id, since):
+        line = json.dumps(record) + "\n"
+        chunk = compressor.compress(line.encode('utf-8'))
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def iter_workspace_records(workspace_id: Union[str, uuid.UUID],
+                           since: int = None) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over the experiments of the workspace and then over its
+    executions, one record at a time.
+    """
+    experiments = Experiment.query.filter(
+        Experiment.workspace_id==workspace_id)
+    if since is not None:
+        experiments = experiments.filter(
+            Experiment.updated_date>=datetime.utcfromtimestamp(since / 1000))
+    experiments = experiments.order_by(Experiment.created_date)
+
+    for experiment in experiments.yield_per(EXPORT_BATCH_SIZE):
+        record = experiment.to_dict(with_payload=True)
+        record["type"] = "experiment"
+        yield record
+
+    executions = Execution.query.options(joinedload(Execution.journal))\
+        .filter(Execution.workspace_id==workspace_id)
+    if since is not None:
+        executions = executions.filter(Execution.timestamp>=since)
+    executions = executions.order_by(Execution.timestamp)
+
+    for execution in executions.yield_per(EXPORT_BATCH_SIZE):
+        record = execution.to_dict(visibility="full")
+        record["type"] = "execution"
+        yield record
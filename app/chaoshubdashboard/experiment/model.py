@@ -1,52 +1,73 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime, timezone
 from enum import Enum, IntEnum
+import gzip
+import hashlib
 import sys
 from typing import Any, Dict, List, Optional, Union
 import uuid
 
 import shortuuid
+import simplejson as json
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from sqlalchemy_json import NestedMutable
-from sqlalchemy_utils import UUIDType
-from sqlalchemy_utils import JSONType as JSONB
 
-from chaoshubdashboard.model import db, get_user_info_secret_key
+from chaoshubdashboard.model import db, get_user_info_secret_key, JSONB, \
+    UUID
 
 from .types import ScheduleContext
 
 __all__ = ["db", "Discovery", "Event", "Experiment",
-           "ExperimentSuggestion", "Init", "Execution", "Schedule"]
+           "ExperimentSuggestion", "Init", "Execution", "ExecutionJournal",
+           "Schedule", "ScheduleStatus", "SCHEDULE_TRANSITIONS",
+           "LocalScheduleJob"]
 
 
 class Discovery(db.Model):  # type: ignore
     __bind_key__ = 'experiment_service'
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
-    account_id = db.Column(UUIDType(binary=False), nullable=False, index=True)
+        UUID(), primary_key=True, default=uuid.uuid4)
+    account_id = db.Column(UUID(), nullable=False, index=True)
     received_date = db.Column(db.DateTime(), server_default=func.now())
     workspace_id = db.Column(
-        UUIDType(binary=False), nullable=False, index=True)
+        UUID(), nullable=False, index=True)
     payload = db.Column(JSONB())
 
 
 class Experiment(db.Model):  # type: ignore
     __bind_key__ = 'experiment_service'
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
-    shared_ref = db.Column(UUIDType(binary=False), nullable=False, index=True)
-    account_id = db.Column(UUIDType(binary=False), nullable=False, index=True)
+        UUID(), primary_key=True, default=uuid.uuid4)
+    shared_ref = db.Column(UUID(), nullable=False, index=True)
+    account_id = db.Column(UUID(), nullable=False, index=True)
     created_date = db.Column(db.DateTime(), server_default=func.now())
     updated_date = db.Column(
         db.DateTime(), server_default=func.now(), server_onupdate=func.now())
-    suggested_experiment_id = db.Column(UUIDType(binary=False), index=True)
+    suggested_experiment_id = db.Column(UUID(), index=True)
     org_id = db.Column(
-        UUIDType(binary=False), nullable=False, index=True)
+        UUID(), nullable=False, index=True)
     workspace_id = db.Column(
-        UUIDType(binary=False), nullable=False, index=True)
+        UUID(), nullable=False, index=True)
     executions = db.relationship(
         'Execution', backref='experiment', cascade="all, delete-orphan")
     payload = db.Column(NestedMutable.as_mutable(JSONB), nullable=False)
+    # copied from the payload whenever it is written so they can be indexed
+    title = db.Column(db.String(), nullable=True)
+    tags = db.Column(JSONB(), nullable=True)
+
+    def extract_search_fields(self):
+        """
+        Copy the title and tags of the experiment's payload to their own
+        columns.
+        """
+        self.title = self.payload.get("title")
+        self.tags = [
+            tag for tag in self.payload.get("tags") or []
+            if isinstance(tag, str)
+        ]
 
     def to_dict(self, with_payload: bool = True):
         updated_date = None
@@ -116,19 +137,32 @@ class Experiment(db.Model):  # type: ignore
             Execution.timestamp==timestamp).first()
 
 
+# trigram indexes are provided by the pg_trgm extension
+event.listen(
+    Experiment.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(
+        dialect="postgresql"))
+db.Index("experiment_tags_idx", Experiment.tags, postgresql_using="gin")
+db.Index(
+    "experiment_title_trgm_idx", Experiment.title, postgresql_using="gin",
+    postgresql_ops={"title": "gin_trgm_ops"})
+
+
 class Init(db.Model):  # type: ignore
     __bind_key__ = 'experiment_service'
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
-    account_id = db.Column(UUIDType(binary=False), nullable=False, index=True)
+        UUID(), primary_key=True, default=uuid.uuid4)
+    account_id = db.Column(UUID(), nullable=False, index=True)
     received_date = db.Column(db.DateTime(), server_default=func.now())
     workspace_id = db.Column(
-        UUIDType(binary=False), nullable=False, index=True)
+        UUID(), nullable=False, index=True)
     payload = db.Column(JSONB())
 
 
 class Execution(db.Model):  # type: ignore
     __bind_key__ = 'experiment_service'
+    # executions are addressed, and paged through, by their timestamp within
+    # their experiment
     __table_args__ = (
         db.UniqueConstraint(
             'timestamp', 'experiment_id', name='index_per_experiment_uniq'
@@ -136,21 +170,42 @@ class Execution(db.Model):  # type: ignore
     )
 
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
-    account_id = db.Column(UUIDType(binary=False), nullable=False, index=True)
+        UUID(), primary_key=True, default=uuid.uuid4)
+    account_id = db.Column(UUID(), nullable=False, index=True)
     timestamp = db.Column(
         db.BigInteger,
         default=lambda: int(datetime.utcnow().timestamp() * 1000))
-    org_id = db.Column(UUIDType(binary=False), nullable=False, index=True)
+    org_id = db.Column(UUID(), nullable=False, index=True)
     workspace_id = db.Column(
-        UUIDType(binary=False), nullable=False, index=True)
+        UUID(), nullable=False, index=True)
     experiment_id = db.Column(
-        UUIDType(binary=False), db.ForeignKey(
+        UUID(), db.ForeignKey(
             'experiment.id', ondelete='CASCADE'), nullable=False)
     status = db.Column(db.String)
-    payload = db.Column(JSONB())
-
-    def to_dict(self, visibility: str = "status") -> Dict[str, Any]:
+    journal_id = db.Column(
+        db.String(64), db.ForeignKey('execution_journal.id'), nullable=True)
+    journal = db.relationship('ExecutionJournal', lazy='select')
+    # journals used to be stored inline, this is kept until all of them have
+    # been moved to the journal store, see `migrate_execution_journals`
+    legacy_payload = deferred(db.Column("payload", JSONB()))
+
+    @property
+    def payload(self) -> Optional[Dict[str, Any]]:
+        """
+        The execution's journal, read from the journal store on first access
+        """
+        if self.journal_id:
+            return self.journal.load()
+        return self.legacy_payload
+
+    @payload.setter
+    def payload(self, payload: Dict[str, Any]):
+        self.journal = ExecutionJournal.store(payload)
+        self.journal_id = self.journal.id
+        self.legacy_payload = None
+
+    def to_dict(self, visibility: str = "status",
+                with_payload: bool = True) -> Dict[str, Any]:
         result = {
             "id": shortuuid.encode(self.id),
             "timestamp": self.timestamp,
@@ -161,17 +216,77 @@ class Execution(db.Model):  # type: ignore
 
         if visibility == "full":
             result["status"] = self.status
-            result["result"] = self.payload
+            if with_payload:
+                result["result"] = self.payload
         elif visibility == "full":
             result["status"] = self.status
         return result
 
 
+class ExecutionJournal(db.Model):  # type: ignore
+    """
+    Compressed chaostoolkit journal of executions, addressed by the digest
+    of its content so identical journals are stored once.
+    """
+    __bind_key__ = 'experiment_service'
+    __tablename__ = 'execution_journal'
+
+    id = db.Column(db.String(64), primary_key=True)
+    compression = db.Column(db.String(10), nullable=False, default="gzip")
+    size = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Decompress and decode the journal
+        """
+        return json.loads(gzip.decompress(self.data).decode('utf-8'))
+
+    @staticmethod
+    def store(payload: Dict[str, Any]) -> 'ExecutionJournal':
+        """
+        Return the stored journal with that content, or insert it when none
+        exists yet.
+
+        The same journal may be uploaded twice at once, so the insert leaves
+        the journal which may have been stored meanwhile untouched rather
+        than failing on its identifier.
+        """
+        content = json.dumps(payload, sort_keys=True).encode('utf-8')
+        digest = hashlib.sha256(content).hexdigest()
+
+        journal = ExecutionJournal.query.get(digest)
+        if journal:
+            return journal
+
+        table = ExecutionJournal.__table__
+        values = {
+            "id": digest, "compression": "gzip", "size": len(content),
+            "data": gzip.compress(content)
+        }
+        dialect = db.get_engine(bind=ExecutionJournal.__bind_key__).\
+            dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(table).values(**values).\
+                on_conflict_do_nothing(index_elements=[table.c.id])
+        else:
+            # SQLite, the only other database we run on
+            stmt = table.insert().prefix_with("OR IGNORE").values(**values)
+        db.session.execute(stmt, mapper=ExecutionJournal.__mapper__)
+        return ExecutionJournal.query.get(digest)
+
+
+# listing the executions of an experiment, most recent first
+db.Index(
+    "execution_experiment_timestamp_idx", Execution.experiment_id,
+    Execution.timestamp.desc())
+
+
 class RecommendationTagsAssoc(db.Model):  # type: ignore
     __bind_key__ = 'experiment_service'
     __tablename__ = "recommendation_tags_assoc"
     recommendation_id = db.Column(
-        UUIDType, db.ForeignKey('recommendation.id'), primary_key=True)
+        UUID(), db.ForeignKey('recommendation.id'), primary_key=True)
     tag_id = db.Column(
         db.Integer, db.ForeignKey('recommendation_tag.id'), primary_key=True)
 
@@ -179,7 +294,7 @@ class RecommendationTagsAssoc(db.Model):  # type: ignore
 class Recommendation(db.Model):  # type: ignore
     __bind_key__ = 'experiment_service'
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
+        UUID(), primary_key=True, default=uuid.uuid4)
     recommendation_type = db.Column(db.String(), index=True)
     tags = db.relationship(
         'RecommendationTag', secondary="recommendation_tags_assoc",
@@ -219,24 +334,84 @@ class ScheduleStatus(Enum):
     cancelled = "cancelled"
 
 
+# the statuses a schedule may move to from its current one, an execution
+# interrupted by a restart is pending again until it is run once more
+SCHEDULE_TRANSITIONS = {
+    ScheduleStatus.pending: (ScheduleStatus.active, ScheduleStatus.cancelled),
+    ScheduleStatus.active: (
+        ScheduleStatus.pending, ScheduleStatus.completed,
+        ScheduleStatus.cancelled),
+    ScheduleStatus.completed: (),
+    ScheduleStatus.cancelled: ()
+}
+
+
 class Schedule(db.Model):  # type: ignore
     __bind_key__ = 'experiment_service'
     id = db.Column(
-        UUIDType(binary=False), primary_key=True, default=uuid.uuid4)
-    account_id = db.Column(UUIDType(binary=False), nullable=False, index=True)
+        UUID(), primary_key=True, default=uuid.uuid4)
+    account_id = db.Column(UUID(), nullable=False, index=True)
     scheduled = db.Column(db.DateTime(), nullable=False)
     status = db.Column(
         db.Enum(ScheduleStatus), nullable=False,
         default=ScheduleStatus.pending)
     org_id = db.Column(
-        UUIDType(binary=False), nullable=False, index=True)
+        UUID(), nullable=False, index=True)
     workspace_id = db.Column(
-        UUIDType(binary=False), nullable=False, index=True)
+        UUID(), nullable=False, index=True)
     experiment_id = db.Column(
-        UUIDType(binary=False), nullable=False, index=True)
-    token_id = db.Column(UUIDType(binary=False), nullable=False)
+        UUID(), nullable=False, index=True)
+    token_id = db.Column(UUID(), nullable=False)
     definition = db.Column(JSONB())
     info = db.Column(JSONB())
+    started = db.Column(db.DateTime())
+    ended = db.Column(db.DateTime())
+    exit_code = db.Column(db.Integer)
+    # timestamp of the execution the run published, if any
+    execution_timestamp = db.Column(db.BigInteger)
+
+    @staticmethod
+    def get_due(now: datetime = None, limit: int = 100) -> List['Schedule']:
+        """
+        Return the pending schedules which should have started by now,
+        oldest first.
+        """
+        return Schedule.query.filter(
+            Schedule.status==ScheduleStatus.pending,
+            Schedule.scheduled<=(now or datetime.utcnow())).\
+            order_by(Schedule.scheduled).limit(limit).all()
+
+    @staticmethod
+    def get_stuck(started_before: datetime,
+                  limit: int = 100) -> List['Schedule']:
+        """
+        Return the active schedules which started before the given date and
+        have not ended since.
+        """
+        return Schedule.query.filter(
+            Schedule.status==ScheduleStatus.active,
+            Schedule.scheduled<=started_before,
+            Schedule.started<=started_before).\
+            order_by(Schedule.scheduled).limit(limit).all()
+
+    def transition(self, status: ScheduleStatus, at: datetime,
+                   exit_code: int = None) -> bool:
+        """
+        Move the schedule to the given status, as of `at`, when its current
+        status allows for it. Return whether it did.
+        """
+        if status not in SCHEDULE_TRANSITIONS[self.status]:
+            return False
+
+        self.status = status
+        if status is ScheduleStatus.active:
+            self.started = at
+        elif status is ScheduleStatus.pending:
+            self.started = None
+        else:
+            self.ended = at
+            self.exit_code = exit_code
+        return True
 
     def to_dict(self):
         return {
@@ -247,6 +422,45 @@ class Schedule(db.Model):  # type: ignore
             "experiment_id": shortuuid.encode(self.experiment_id),
             "token_id": shortuuid.encode(self.token_id),
             "scheduled": "{}Z".format(self.scheduled.isoformat()),
+            "status": self.status.value if self.status else None,
+            "started": "{}Z".format(self.started.isoformat())
+            if self.started else None,
+            "ended": "{}Z".format(self.ended.isoformat())
+            if self.ended else None,
+            "exit_code": self.exit_code,
+            "execution_timestamp": self.execution_timestamp,
             "definition": self.definition,
             "info": self.info
         }
+
+
+# polling for due or stuck schedules
+db.Index(
+    "schedule_status_scheduled_idx", Schedule.status, Schedule.scheduled)
+
+
+class LocalScheduleJob(db.Model):  # type: ignore
+    """
+    Execution queued by the local scheduler, kept so that pending and
+    running executions survive a restart of the process.
+    """
+    __bind_key__ = 'experiment_service'
+    __tablename__ = 'local_schedule_job'
+    id = db.Column(
+        UUID(), primary_key=True, default=uuid.uuid4)
+    schedule_id = db.Column(UUID(), nullable=True, index=True)
+    created = db.Column(
+        db.DateTime(), nullable=False, default=datetime.utcnow)
+    scheduled = db.Column(db.DateTime(), nullable=False)
+    status = db.Column(
+        db.Enum(ScheduleStatus), nullable=False,
+        default=ScheduleStatus.pending)
+    context = db.Column(JSONB(), nullable=False)
+    # process running the job, until its lease expires unless renewed
+    owner = db.Column(db.String(), nullable=True)
+    lease_expires = db.Column(db.DateTime(), nullable=True)
+
+
+db.Index(
+    "local_schedule_job_status_scheduled_idx", LocalScheduleJob.status,
+    LocalScheduleJob.scheduled)
@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
 from typing import Any, Dict, List
 
+from flask import Flask
 import pkg_resources
 
 from ..types import Scheduler, ScheduleContext
+from .progress import report_schedule_status, \
+    setup_schedule_progress_updater, shutdown_schedule_progress_updater
 
 __all__ = ["register_schedulers", "schedule", "schedulers",
-           "shutdown_schedulers", "is_scheduler_registered"]
+           "start_schedulers", "shutdown_schedulers",
+           "is_scheduler_registered", "report_schedule_status",
+           "setup_schedule_progress_updater",
+           "shutdown_schedule_progress_updater"]
 
 # once this has been set, this shouldn't change so making it global is fair
 _schedulers: Dict[str, Scheduler] = {}
@@ -49,6 +55,17 @@ def schedulers() -> Dict[str, Scheduler]:
     return _schedulers
 
 
+def start_schedulers(app: Flask):
+    """
+    Let the registered schedulers which need to, such as those running
+    executions from a background pool, start against the application.
+    """
+    for name, scheduler in _schedulers.items():
+        start = getattr(scheduler, "start", None)
+        if start:
+            start(app)
+
+
 def shutdown_schedulers():
     """
     Terminate all registered schedulers and ask each one to cleanup their
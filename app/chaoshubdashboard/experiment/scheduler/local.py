@@ -1,95 +1,609 @@
 # -*- coding: utf-8 -*-
+from datetime import datetime, timedelta, timezone
+import heapq
+import itertools
 import json
 import os
+import socket
 import subprocess
-from tempfile import TemporaryDirectory
+from tempfile import gettempdir, TemporaryDirectory
 import threading
-from typing import Dict
+from typing import Any, Dict, List, Optional, Tuple, Union
 import uuid
 
+import dateparser
 from chaoshub.settings import set_chaos_hub_settings
-from chaoslib.settings import load_settings, save_settings
+from chaoslib.settings import save_settings
+from flask import Flask
+import shortuuid
+from sqlalchemy import and_, or_
 
+from chaoshubdashboard.model import db
+
+from ..model import LocalScheduleJob, ScheduleStatus
+from ..services import AuthService
 from ..types import ScheduleContext, ScheduleInfo
+from .output import ExecutionOutput, pump_output, RotatingLog, tail_file
+from .progress import report_schedule_status
+from .warm import WarmPool, WarmWorker
+
+__all__ = ["LocalScheduler", "parse_scheduled", "prepare_run",
+           "read_journal", "resolve_token", "write_run_files"]
 
-__all__ = ["LocalScheduler"]
+# scheduled time, insertion order and identifier of a queued job
+QueuedJob = Tuple[datetime, int, uuid.UUID]
 
-Tasks = Dict[str, 'LocalExecution']
+# what runs a job, depending on the runner
+Runner = Union[subprocess.Popen, WarmWorker]
+
+# exit code and journal of a run, when they are known
+RunResult = Tuple[Optional[int], Optional[Dict[str, Any]]]
 
 
 class LocalScheduler:
+    """
+    Run scheduled executions with the chaostoolkit CLI on this host.
+
+    Executions are persisted in the `local_schedule_job` table and queued by
+    their scheduled time. A fixed pool of `workers` threads runs them once
+    due, so that no more than `workers` chaostoolkit processes ever run at
+    the same time.
+
+    Once started, pending executions are read back from the database and
+    queued again. Running executions are leased to the process running
+    them for `lease_duration` seconds, renewed while they run. Those whose
+    lease expired, their process having died, are queued again by any
+    running scheduler. On shutdown, the executions a process was running
+    are released at once.
+
+    Only the identifier of the access token an execution runs with is
+    stored, the token itself is looked up when the execution starts and the
+    execution is cancelled when the token has been revoked.
+
+    The schedule behind each execution is told when it starts, completes,
+    with the exit code of the run, or is cancelled.
+
+    The output of each execution is written to a rotating log file in
+    `output_dir` and its last `output_lines` lines are kept in memory while
+    it runs, see `tail`.
+
+    With the `cli` runner, each execution starts the chaostoolkit CLI. With
+    the `warm` runner, executions are run in-process by a pool of worker
+    processes which have already imported chaoslib, each being replaced
+    after `warm_max_runs` executions.
+    """
     name = "local"
     description = "Local scheduler for one-shot executions"
-    version = "0.1.0"
+    version = "0.3.0"
     settings_key_prefix = "SCHED_LOCAL_"
 
-    def __init__(self, chaostoolkit_cli_path: str = "chaos") -> None:
+    def __init__(self, chaostoolkit_cli_path: str = "chaos",
+                 workers: int = 4, output_dir: str = None,
+                 output_lines: int = 1000,
+                 output_max_bytes: int = 10485760,
+                 output_backup_count: int = 3, runner: str = "cli",
+                 warm_max_runs: int = 50,
+                 lease_duration: float = 60) -> None:
+        if runner not in ("cli", "warm"):
+            raise ValueError("Invalid local runner '{}'".format(runner))
         self.chaostoolkit_cli_path = os.path.expanduser(
             chaostoolkit_cli_path)
-        self.tasks: Tasks = {}
+        self.workers_count = max(1, int(workers))
+        self.output_dir = os.path.expanduser(
+            output_dir or os.path.join(gettempdir(), "chaoshub-executions"))
+        self.output_lines = int(output_lines)
+        self.output_max_bytes = int(output_max_bytes)
+        self.output_backup_count = int(output_backup_count)
+        self.pool = WarmPool(self.workers_count, warm_max_runs) \
+            if runner == "warm" else None
+        self.lease_duration = float(lease_duration)
+        self.owner = "{}:{}:{}".format(
+            socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self.outputs: Dict[uuid.UUID, ExecutionOutput] = {}
+        self._app: Optional[Flask] = None
+        self.queue: List[QueuedJob] = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.running: Dict[uuid.UUID, Runner] = {}
+        self.workers: List[threading.Thread] = []
+        self.stopping = False
+
+    @property
+    def app(self) -> Flask:
+        if self._app is None:
+            raise RuntimeError("The local scheduler has not been started")
+        return self._app
+
+    def start(self, app: Flask):
+        """
+        Queue the executions left over by a previous process and start the
+        workers, along with the thread renewing their leases.
+        """
+        self._app = app
+        self.stopping = False
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.pool is not None:
+            self.pool.start()
+        self.recover()
+
+        for i in range(self.workers_count):
+            worker = threading.Thread(
+                target=self.work, name="local-scheduler-{}".format(i),
+                daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+        heartbeat = threading.Thread(
+            target=self.heartbeat, name="local-scheduler-heartbeat",
+            daemon=True)
+        heartbeat.start()
+        self.workers.append(heartbeat)
+
+    def shutdown(self, timeout: float = None):
+        """
+        Stop the workers, terminating the executions they are running.
+        These are released, pending again, so that they are queued again
+        on start.
+        """
+        if self._app is None:
+            return
+
+        with self.condition:
+            self.stopping = True
+            for proc in self.running.values():
+                terminate(proc)
+            self.condition.notify_all()
+
+        for worker in self.workers:
+            worker.join(timeout)
+        self.workers.clear()
+        if self.pool is not None:
+            self.pool.shutdown()
 
-    def shutdown(self):
-        for pid, task in self.tasks.items():
-            task.terminate()
-        self.tasks.clear()
+        with self.condition:
+            self.queue.clear()
+        self.release()
 
     def cancel(self, id: str):
-        task = self.tasks.pop(id, None)
-        if task:
-            task.terminate()
+        job_id = uuid.UUID(id)
+        with self.app.app_context():
+            try:
+                schedule_id = db.session.query(
+                    LocalScheduleJob.schedule_id).filter(
+                        LocalScheduleJob.id==job_id).scalar()
+            finally:
+                db.session.remove()
+        # reported before the run is terminated so that it does not look
+        # completed
+        report_schedule_status(schedule_id, ScheduleStatus.cancelled)
+
+        with self.condition:
+            self.queue = [job for job in self.queue if job[2] != job_id]
+            heapq.heapify(self.queue)
+            proc = self.running.get(job_id)
+            if proc:
+                terminate(proc)
+
+        with self.app.app_context():
+            try:
+                LocalScheduleJob.query.filter(
+                    LocalScheduleJob.id==job_id,
+                    LocalScheduleJob.status.in_((
+                        ScheduleStatus.pending, ScheduleStatus.active))).\
+                    update(
+                        {"status": ScheduleStatus.cancelled},
+                        synchronize_session=False)
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def tail(self, id: str, lines: int = 100,
+             since: int = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the last `lines` lines output by the execution or, when
+        `since` is set, the lines following that line number, as long as
+        the execution runs. `None` when the execution has no output.
+        """
+        job_id = uuid.UUID(id)
+        output = self.outputs.get(job_id)
+        if output is not None:
+            return output.tail(lines, since)
+
+        path = self.output_path(job_id)
+        if not os.path.exists(path):
+            return None
+        return {
+            "lines": tail_file(path, lines) if since is None else [],
+            "next": None,
+            "running": False
+        }
+
+    def output_path(self, job_id: uuid.UUID) -> str:
+        return os.path.join(self.output_dir, "{}.log".format(job_id))
 
     def schedule(self, context: ScheduleContext) -> ScheduleInfo:
-        execution = LocalExecution(self.chaostoolkit_cli_path, context)
-        self.tasks[execution.id] = execution
-        execution.start()
+        schedule_id = context.get("id")
+        # the access token is looked up from its `token_id` when the job runs
+        stored = {k: v for (k, v) in context.items() if k != "token"}
+        job = LocalScheduleJob(
+            schedule_id=shortuuid.decode(schedule_id) if schedule_id else None,
+            scheduled=parse_scheduled(context.get("scheduled")),
+            status=ScheduleStatus.pending, context=stored)
+        db.session.add(job)
+        db.session.commit()
+        self.enqueue(job.scheduled, job.id)
 
         return {
             "scheduler": LocalScheduler.name,
-            "id": execution.id
+            "id": str(job.id)
         }
 
+    def enqueue(self, scheduled: datetime, job_id: uuid.UUID):
+        with self.condition:
+            heapq.heappush(self.queue, (scheduled, next(self.counter), job_id))
+            self.condition.notify()
+
+    def recover(self):
+        """
+        Queue all the executions which have not completed yet. Those whose
+        lease expired were interrupted and are run again, those still
+        leased are left to the process running them.
+        """
+        try:
+            self.release_expired()
+        except Exception:
+            self.app.logger.error(
+                "Failed to release the interrupted local executions",
+                exc_info=True)
+            return
+
+        with self.app.app_context():
+            try:
+                jobs = LocalScheduleJob.query.with_entities(
+                    LocalScheduleJob.id, LocalScheduleJob.scheduled).filter(
+                        LocalScheduleJob.status==ScheduleStatus.pending).\
+                    order_by(LocalScheduleJob.scheduled).all()
+            except Exception:
+                self.app.logger.error(
+                    "Failed to load the pending local executions",
+                    exc_info=True)
+                return
+            finally:
+                db.session.remove()
+
+        for (job_id, scheduled) in jobs:
+            self.enqueue(scheduled, job_id)
+        if jobs:
+            self.app.logger.info(
+                "Queued {} pending local executions".format(len(jobs)))
+
+    def heartbeat(self):
+        """
+        Renew the leases of the executions run by this process and queue
+        again those whose lease expired, until the scheduler stops.
+        """
+        interval = self.lease_duration / 3
+        while True:
+            with self.condition:
+                if not self.stopping:
+                    self.condition.wait(interval)
+                if self.stopping:
+                    return
+
+            try:
+                self.renew_leases()
+                for (job_id, scheduled) in self.release_expired():
+                    self.enqueue(scheduled, job_id)
+            except Exception:
+                self.app.logger.error(
+                    "Failed to renew the local executions leases",
+                    exc_info=True)
+
+    def lease_expiry(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.lease_duration)
+
+    def renew_leases(self):
+        with self.app.app_context():
+            try:
+                LocalScheduleJob.query.filter(
+                    LocalScheduleJob.owner==self.owner,
+                    LocalScheduleJob.status==ScheduleStatus.active).update(
+                        {"lease_expires": self.lease_expiry()},
+                        synchronize_session=False)
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def release_expired(self) -> List[Tuple[uuid.UUID, datetime]]:
+        """
+        Make the active executions whose lease expired pending again and
+        return them.
+        """
+        expired = and_(
+            LocalScheduleJob.status==ScheduleStatus.active,
+            or_(
+                LocalScheduleJob.lease_expires.is_(None),
+                LocalScheduleJob.lease_expires<datetime.utcnow()))
+        return self.release_jobs(expired)
+
+    def release(self):
+        """
+        Make the executions this process was running pending again.
+        """
+        try:
+            self.release_jobs(and_(
+                LocalScheduleJob.owner==self.owner,
+                LocalScheduleJob.status==ScheduleStatus.active))
+        except Exception:
+            self.app.logger.error(
+                "Failed to release the interrupted local executions",
+                exc_info=True)
 
-class LocalExecution(threading.Thread):
-    def __init__(self, chaostoolkit_cli_path: str,
-                 context: ScheduleContext) -> None:
-        threading.Thread.__init__(self)
-        self.chaostoolkit_cli_path = chaostoolkit_cli_path
-        self.id = str(uuid.uuid4())
-        self.context = context
-        self.proc = None
+    def release_jobs(self, criterion: Any) \
+            -> List[Tuple[uuid.UUID, datetime]]:
+        with self.app.app_context():
+            try:
+                jobs = LocalScheduleJob.query.with_entities(
+                    LocalScheduleJob.id, LocalScheduleJob.scheduled,
+                    LocalScheduleJob.schedule_id).filter(criterion).all()
+                if not jobs:
+                    return []
 
-    def terminate(self):
-        if self.proc and self.proc.poll() is not None:
-            self.proc.terminate()
+                # rows another process released meanwhile are left alone
+                LocalScheduleJob.query.filter(
+                    LocalScheduleJob.id.in_([j.id for j in jobs]),
+                    criterion).update({
+                        "status": ScheduleStatus.pending,
+                        "owner": None,
+                        "lease_expires": None
+                    }, synchronize_session=False)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
 
-    def run(self):
-        hub_url = self.context.get("hub_url")
-        token = self.context.get("token")
-        org_name = self.context.get("org", {}).get("name")
-        workspace_name = self.context.get("workspace", {}).get("name")
-        experiment = self.context.get("experiment")
+        for job in jobs:
+            report_schedule_status(job.schedule_id, ScheduleStatus.pending)
+        return [(job.id, job.scheduled) for job in jobs]
 
+    def next_job(self) -> Optional[uuid.UUID]:
+        """
+        Block until a queued job is due and return it, or `None` once the
+        scheduler is stopping.
+        """
+        with self.condition:
+            while not self.stopping:
+                if not self.queue:
+                    self.condition.wait()
+                    continue
+
+                delay = (self.queue[0][0] - datetime.utcnow()).total_seconds()
+                if delay > 0:
+                    self.condition.wait(delay)
+                    continue
+
+                return heapq.heappop(self.queue)[2]
+        return None
+
+    def work(self):
+        while True:
+            job_id = self.next_job()
+            if job_id is None:
+                return
+
+            try:
+                self.run_job(job_id)
+            except Exception:
+                self.app.logger.error(
+                    "Local execution {} failed".format(job_id), exc_info=True)
+
+    def run_job(self, job_id: uuid.UUID):
+        with self.app.app_context():
+            try:
+                # the job may have been cancelled or picked by another
+                # process meanwhile
+                claimed = LocalScheduleJob.query.filter(
+                    LocalScheduleJob.id==job_id,
+                    LocalScheduleJob.status==ScheduleStatus.pending).update({
+                        "status": ScheduleStatus.active,
+                        "owner": self.owner,
+                        "lease_expires": self.lease_expiry()
+                    }, synchronize_session=False)
+                db.session.commit()
+                if not claimed:
+                    return
+
+                (schedule_id, context) = db.session.query(
+                    LocalScheduleJob.schedule_id,
+                    LocalScheduleJob.context).filter(
+                        LocalScheduleJob.id==job_id).one()
+                token = resolve_token(context)
+            finally:
+                db.session.remove()
+
+        if token is None:
+            self.app.logger.warning(
+                "Local execution {} cancelled, its access token was "
+                "revoked".format(job_id))
+            report_schedule_status(schedule_id, ScheduleStatus.cancelled)
+            self.end_job(job_id, ScheduleStatus.cancelled)
+            return
+
+        report_schedule_status(schedule_id, ScheduleStatus.active)
+        (exit_code, journal) = self.execute(
+            job_id, dict(context, token=token))
+        if self.stopping:
+            # released on shutdown to be run again once restarted
+            return
+
+        report_schedule_status(
+            schedule_id, ScheduleStatus.completed, exit_code, journal)
+        self.end_job(job_id, ScheduleStatus.completed)
+
+    def end_job(self, job_id: uuid.UUID, status: ScheduleStatus):
+        with self.app.app_context():
+            try:
+                LocalScheduleJob.query.filter(
+                    LocalScheduleJob.id==job_id,
+                    LocalScheduleJob.status==ScheduleStatus.active).update(
+                        {"status": status, "lease_expires": None},
+                        synchronize_session=False)
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def execute(self, job_id: uuid.UUID,
+                context: ScheduleContext) -> RunResult:
+        """
+        Run the execution and return the exit code and journal of its run.
+        """
         with TemporaryDirectory() as dname:
-            settings_path = os.path.join(dname, "settings.yaml")
-            settings = {}
-            set_chaos_hub_settings(hub_url, token, settings)
-            save_settings(settings, settings_path)
-
-            experiment_path = os.path.join(dname, "experiment.json")
-            with open(experiment_path, "w") as f:
-                f.write(json.dumps(experiment["payload"]))
-
-            cmd = [
-                self.chaostoolkit_cli_path,
-                '--settings',
-                settings_path,
-                'run',
-                '--org', org_name,
-                '--workspace', workspace_name,
-                experiment_path
-            ]
-
-            self.proc = subprocess.Popen(
+            output = ExecutionOutput(
+                RotatingLog(
+                    self.output_path(job_id), self.output_max_bytes,
+                    self.output_backup_count),
+                max_lines=self.output_lines)
+            try:
+                pool = self.pool
+                if pool is not None:
+                    return self.execute_warm(
+                        pool, job_id, context, dname, output)
+                return self.execute_cli(job_id, context, dname, output)
+            finally:
+                output.close()
+                with self.condition:
+                    self.running.pop(job_id, None)
+                    self.outputs.pop(job_id, None)
+
+    def execute_cli(self, job_id: uuid.UUID, context: ScheduleContext,
+                    dname: str, output: ExecutionOutput) -> RunResult:
+        cmd = prepare_run(self.chaostoolkit_cli_path, context, dname)
+        with self.condition:
+            if self.stopping:
+                return (None, None)
+            proc = subprocess.Popen(
                 cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
                 env=os.environ, cwd=dname)
-            self.proc.wait()
+            self.running[job_id] = proc
+            self.outputs[job_id] = output
+
+        pump_output(proc, output)
+        return (proc.wait(), read_journal(dname))
+
+    def execute_warm(self, pool: WarmPool, job_id: uuid.UUID,
+                     context: ScheduleContext, dname: str,
+                     output: ExecutionOutput) -> RunResult:
+        """
+        Run the execution with a warm worker. As with the CLI, the exit code
+        is 0 once the run went through, whatever the experiment's status.
+        """
+        (settings_path, experiment_path) = write_run_files(context, dname)
+        worker = pool.acquire()
+        try:
+            with self.condition:
+                if self.stopping:
+                    return (None, None)
+                self.running[job_id] = worker
+                self.outputs[job_id] = output
+
+            journal = worker.run({
+                "dname": dname,
+                "settings_path": settings_path,
+                "experiment_path": experiment_path,
+                "org": context.get("org", {}).get("name"),
+                "workspace": context.get("workspace", {}).get("name")
+            }, output)
+            return (0 if journal is not None else 1, journal)
+        finally:
+            pool.release(worker)
+
+
+def write_run_files(context: ScheduleContext,
+                    dname: str) -> Tuple[str, str]:
+    """
+    Write the settings and experiment of the execution into the `dname`
+    directory and return their paths.
+    """
+    settings_path = os.path.join(dname, "settings.yaml")
+    settings: Dict[str, Any] = {}
+    set_chaos_hub_settings(
+        context.get("hub_url"), context.get("token"), settings)
+    save_settings(settings, settings_path)
+
+    experiment_path = os.path.join(dname, "experiment.json")
+    with open(experiment_path, "w") as f:
+        f.write(json.dumps(context["experiment"]["payload"]))
+
+    return (settings_path, experiment_path)
+
+
+def prepare_run(chaostoolkit_cli_path: str, context: ScheduleContext,
+                dname: str) -> List[str]:
+    """
+    Write the settings and experiment of the execution into the `dname`
+    directory and return the chaostoolkit command running it. The journal
+    of the run is written there as well, see `read_journal`.
+    """
+    org_name = context.get("org", {}).get("name")
+    workspace_name = context.get("workspace", {}).get("name")
+    (settings_path, experiment_path) = write_run_files(context, dname)
+
+    return [
+        chaostoolkit_cli_path,
+        '--settings',
+        settings_path,
+        'run',
+        '--org', org_name,
+        '--workspace', workspace_name,
+        '--journal-path', os.path.join(dname, "journal.json"),
+        experiment_path
+    ]
+
+
+def read_journal(dname: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the journal the chaostoolkit CLI wrote into the `dname` directory,
+    `None` when the run did not get to write one.
+    """
+    try:
+        with open(os.path.join(dname, "journal.json")) as f:
+            journal = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return journal if isinstance(journal, dict) else None
+
+
+def resolve_token(context: ScheduleContext) -> Optional[str]:
+    """
+    Lookup the access token the execution runs with from the `token_id` of
+    its context, `None` when it does not exist or has been revoked.
+    """
+    token_id = context.get("token_id")
+    if not token_id:
+        return None
+
+    token = AuthService.get_user_access_token(
+        {"id": context.get("account_id")}, shortuuid.decode(token_id))
+    if not token or token.get("revoked"):
+        return None
+    return token["access_token"]
+
+
+def terminate(proc: Runner):
+    if proc.poll() is None:
+        proc.terminate()
+
+
+def parse_scheduled(scheduled: Optional[str]) -> datetime:
+    """
+    Parse the scheduled date of the context as a naive UTC datetime, now
+    when none is set.
+    """
+    when = dateparser.parse(scheduled) if scheduled else None
+    if when is None:
+        return datetime.utcnow()
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
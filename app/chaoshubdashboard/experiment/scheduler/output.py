@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from collections import deque
+import os
+import selectors
+import subprocess
+import threading
+from typing import Any, Deque, Dict, IO, List, Optional, Tuple
+
+__all__ = ["ExecutionOutput", "LineSplitter", "RotatingLog", "pump_output",
+           "pump_stream", "tail_file"]
+
+# lines longer than this are cut so a single line cannot exhaust memory
+MAX_LINE_LENGTH = 8192
+
+
+class RotatingLog:
+    """
+    Append-only log file rotated once it grows over `max_bytes`, keeping
+    `backup_count` previous files suffixed `.1`, `.2`...
+    """
+    def __init__(self, path: str, max_bytes: int = 10485760,
+                 backup_count: int = 3) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.stream: Optional[IO[bytes]] = None
+
+    def write(self, data: bytes):
+        if self.stream is None:
+            self.stream = open(self.path, "ab")
+        if self.max_bytes and \
+                self.stream.tell() + len(data) > self.max_bytes and \
+                self.stream.tell() > 0:
+            self.rotate()
+        self.stream.write(data)
+
+    def rotate(self):
+        self.stream.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            source = "{}.{}".format(self.path, i)
+            if os.path.exists(source):
+                os.replace(source, "{}.{}".format(self.path, i + 1))
+        if self.backup_count > 0:
+            os.replace(self.path, "{}.1".format(self.path))
+        else:
+            os.remove(self.path)
+        self.stream = open(self.path, "ab")
+
+    def flush(self):
+        if self.stream is not None:
+            self.stream.flush()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+
+class LineSplitter:
+    """
+    Split the chunks read from a stream into lines, cutting those longer
+    than `MAX_LINE_LENGTH`.
+    """
+    def __init__(self) -> None:
+        self.pending = b""
+
+    def feed(self, data: bytes) -> List[bytes]:
+        *lines, self.pending = (self.pending + data).split(b"\n")
+        lines = [line + b"\n" for line in lines]
+        if len(self.pending) > MAX_LINE_LENGTH:
+            lines.append(self.pending + b"\n")
+            self.pending = b""
+        return lines
+
+    def flush(self) -> List[bytes]:
+        lines = [self.pending + b"\n"] if self.pending else []
+        self.pending = b""
+        return lines
+
+
+class ExecutionOutput:
+    """
+    Output of a running execution: its last `max_lines` lines are kept in
+    memory for tailing while all of them are written to a rotating log.
+
+    Each line is numbered so that followers can ask for the lines which
+    came after the last one they received.
+    """
+    def __init__(self, log: RotatingLog, max_lines: int = 1000) -> None:
+        self.log = log
+        self.lines: Deque[Tuple[int, str]] = deque(maxlen=max_lines)
+        self.count = 0
+        self.running = True
+        self.lock = threading.Lock()
+
+    def append(self, line: bytes):
+        self.log.write(line)
+        text = line[:MAX_LINE_LENGTH].decode("utf-8", errors="replace")
+        with self.lock:
+            self.count += 1
+            self.lines.append((self.count, text.rstrip("\r\n")))
+
+    def close(self):
+        with self.lock:
+            self.running = False
+        self.log.close()
+
+    def tail(self, lines: int = 100, since: int = None) -> Dict[str, Any]:
+        """
+        Return at most the last `lines` lines or, when `since` is set, the
+        first `lines` lines following that line number.
+
+        Lines are served from memory; the log is left to the thread writing
+        the output and is never touched from here.
+        """
+        with self.lock:
+            if since is None:
+                selected = list(self.lines)[-lines:] if lines > 0 else []
+            else:
+                selected = [
+                    (n, text) for (n, text) in self.lines if n > since
+                ][:lines]
+            return {
+                "lines": [text for (_, text) in selected],
+                "next": selected[-1][0] if selected else (
+                    since if since is not None else self.count),
+                "running": self.running
+            }
+
+
+def pump_output(proc: subprocess.Popen, output: ExecutionOutput,
+                chunk_size: int = 65536):
+    """
+    Read the stdout and stderr pipes of the process as data comes, until
+    both are closed, and append their lines to the output. Neither pipe can
+    fill up and block the process while the other one is waited for.
+    """
+    pipes: Dict[int, IO[bytes]] = {}
+    splitters: Dict[int, LineSplitter] = {}
+    with selectors.DefaultSelector() as selector:
+        for pipe in (proc.stdout, proc.stderr):
+            if pipe is not None:
+                selector.register(pipe, selectors.EVENT_READ)
+                pipes[pipe.fileno()] = pipe
+                splitters[pipe.fileno()] = LineSplitter()
+
+        while selector.get_map():
+            for (key, _) in selector.select():
+                fd = key.fd
+                data = os.read(fd, chunk_size)
+                if data:
+                    lines = splitters[fd].feed(data)
+                else:
+                    selector.unregister(key.fileobj)
+                    pipes[fd].close()
+                    lines = splitters[fd].flush()
+
+                for line in lines:
+                    output.append(line)
+
+
+async def pump_stream(stream: asyncio.StreamReader, output: ExecutionOutput,
+                      chunk_size: int = 65536):
+    """
+    Append the lines read from the stream of a subprocess, run by asyncio,
+    to the output until the stream is closed.
+    """
+    splitter = LineSplitter()
+    while True:
+        data = await stream.read(chunk_size)
+        if not data:
+            break
+        for line in splitter.feed(data):
+            output.append(line)
+
+    for line in splitter.flush():
+        output.append(line)
+
+
+def tail_file(path: str, lines: int = 100,
+              block_size: int = 8192) -> List[str]:
+    """
+    Return the last `lines` lines of the file, reading it from its end.
+    """
+    if lines <= 0:
+        return []
+
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= lines:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            data = f.read(size) + data
+
+    return [
+        line[:MAX_LINE_LENGTH].decode("utf-8", errors="replace").rstrip("\r")
+        for line in data.splitlines()[-lines:]
+    ]
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+import uuid
+
+from flask import Flask
+import shortuuid
+from sqlalchemy.orm import joinedload, load_only
+
+from chaoshubdashboard.model import db
+
+from ..model import Execution, Schedule, ScheduleStatus
+
+__all__ = ["ScheduleProgressUpdater", "report_schedule_status",
+           "setup_schedule_progress_updater",
+           "get_schedule_progress_updater",
+           "shutdown_schedule_progress_updater"]
+
+# once this has been set, this shouldn't change so making it global is fair
+_updater: Optional['ScheduleProgressUpdater'] = None
+
+# schedule identifier, new status, when it changed, exit code of the run and
+# when its journal says it started
+ScheduleTransition = Tuple[
+    uuid.UUID, ScheduleStatus, datetime, Optional[int], Optional[str]]
+
+
+class ScheduleProgressUpdater(threading.Thread):
+    """
+    Write the status transitions of schedules, as reported by the
+    schedulers running them, to the database every `flush_interval`
+    seconds.
+
+    Transitions are applied in the order they were reported, those the
+    current status of a schedule does not allow for are ignored. All the
+    schedules involved are loaded in a single query and updated at once.
+
+    When a run completes, the timestamp of the execution it published is
+    looked up, from the start of its journal, and kept along with the
+    schedule.
+    """
+    def __init__(self, app: Flask, flush_interval: float = 1.0) -> None:
+        threading.Thread.__init__(
+            self, name="schedule-progress-updater", daemon=True)
+        self.app = app
+        self.flush_interval = flush_interval
+        self.transitions: List[ScheduleTransition] = []
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def report(self, schedule_id: uuid.UUID, status: ScheduleStatus,
+               exit_code: int = None, at: datetime = None,
+               journal_start: str = None):
+        """
+        Queue the transition of the schedule to `status`, now unless `at`
+        is given.
+        """
+        with self.lock:
+            self.transitions.append(
+                (schedule_id, status, at or datetime.utcnow(), exit_code,
+                 journal_start))
+
+    def shutdown(self, timeout: float = None):
+        """
+        Write all pending transitions and terminate the updater.
+        """
+        self.stopped.set()
+        if self.is_alive():
+            self.join(timeout)
+        else:
+            self.flush()
+
+    def run(self):
+        while not self.stopped.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            transitions, self.transitions = self.transitions, []
+
+        if not transitions:
+            return
+
+        with self.app.app_context():
+            try:
+                ids = {
+                    schedule_id for (schedule_id, _, _, _, _) in transitions}
+                schedules = {
+                    s.id: s for s in Schedule.query.options(load_only(
+                        "id", "experiment_id", "status", "started", "ended",
+                        "exit_code", "execution_timestamp")).filter(
+                            Schedule.id.in_(ids))
+                }
+
+                completed: Dict[Schedule, Optional[str]] = {}
+                for (schedule_id, status, at, exit_code, journal_start) in \
+                        transitions:
+                    s = schedules.get(schedule_id)
+                    if s is None or not s.transition(status, at, exit_code):
+                        self.app.logger.debug(
+                            "Ignored moving schedule {} to {}".format(
+                                schedule_id, status.value))
+                        continue
+                    if status is ScheduleStatus.completed:
+                        completed[s] = journal_start
+
+                # the updates are all sent on commit
+                with db.session.no_autoflush:
+                    for (s, journal_start) in completed.items():
+                        s.execution_timestamp = find_execution_timestamp(
+                            s, journal_start)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.error(
+                    "Failed to update the status of {} schedules".format(
+                        len(transitions)), exc_info=True)
+            finally:
+                db.session.remove()
+
+
+def find_execution_timestamp(schedule: Schedule,
+                             journal_start: str = None) -> Optional[int]:
+    """
+    Return the timestamp of the execution of the experiment the schedule's
+    run published while it ran, the one whose journal started at
+    `journal_start`.
+
+    Without the journal of the run, other executions of the experiment
+    could have been published meanwhile so the timestamp is only known when
+    there is a single one. `None` when it cannot be told.
+    """
+    if not schedule.started or not schedule.ended:
+        return None
+
+    # executions are stamped by the process they are published to, leave
+    # some room for the clocks of both hosts to differ
+    margin = timedelta(seconds=1)
+    start = to_timestamp(schedule.started - margin)
+    end = to_timestamp(schedule.ended + margin)
+    query = Execution.query.filter(
+        Execution.experiment_id==schedule.experiment_id,
+        Execution.timestamp>=start,
+        Execution.timestamp<=end)
+    if journal_start is None:
+        executions = query.options(load_only("timestamp")).all()
+    else:
+        # their journals are loaded along to find the one of the run
+        executions = [
+            execution for execution in query.options(
+                load_only("timestamp", "journal_id", "legacy_payload"),
+                joinedload(Execution.journal))
+            if (execution.payload or {}).get("start") == journal_start
+        ]
+    return executions[0].timestamp if len(executions) == 1 else None
+
+
+def to_timestamp(when: datetime) -> int:
+    """
+    Turn the naive UTC date into milliseconds, like execution timestamps.
+    """
+    return int(when.timestamp() * 1000)
+
+
+def report_schedule_status(schedule_id: Union[str, uuid.UUID, None],
+                           status: ScheduleStatus, exit_code: int = None,
+                           journal: Dict[str, Any] = None):
+    """
+    Report the schedule moved to `status`. This is written to the database
+    by the progress updater, or right away when it runs synchronously.
+
+    The journal of a completed run tells which execution it published.
+
+    Executions which were not scheduled from a schedule have no identifier
+    and nothing is reported for them.
+    """
+    if not schedule_id or _updater is None:
+        return
+
+    if isinstance(schedule_id, str):
+        decoded: uuid.UUID = shortuuid.decode(schedule_id)
+    else:
+        decoded = schedule_id
+
+    _updater.report(
+        decoded, status, exit_code,
+        journal_start=journal.get("start") if journal else None)
+    if not _updater.is_alive():
+        _updater.flush()
+
+
+def setup_schedule_progress_updater(app: Flask) -> ScheduleProgressUpdater:
+    """
+    Start writing the progress of schedules in the background, unless
+    `SCHEDULE_PROGRESS_FLUSH_INTERVAL` is zero in which case it is written
+    as soon as it is reported.
+    """
+    global _updater
+
+    shutdown_schedule_progress_updater()
+
+    interval = app.config.get("SCHEDULE_PROGRESS_FLUSH_INTERVAL", 1.0)
+    _updater = ScheduleProgressUpdater(app, flush_interval=interval)
+    if interval:
+        _updater.start()
+    return _updater
+
+
+def get_schedule_progress_updater() -> Optional[ScheduleProgressUpdater]:
+    """
+    Return the schedule progress updater, if any.
+    """
+    return _updater
+
+
+def shutdown_schedule_progress_updater():
+    """
+    Write the pending transitions and stop the updater. This is
+    synchronous, thus blocking the main process.
+    """
+    global _updater
+
+    updater = _updater
+    _updater = None
+    if updater:
+        updater.shutdown()
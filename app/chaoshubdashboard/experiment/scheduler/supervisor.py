@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+import os
+from tempfile import gettempdir, TemporaryDirectory
+import threading
+from typing import Any, Dict, Optional
+import uuid
+
+from flask import Flask
+
+from chaoshubdashboard.lru import LRUCache, MISSING
+
+from ..model import ScheduleStatus
+from ..types import ScheduleContext, ScheduleInfo
+from .local import parse_scheduled, prepare_run, read_journal
+from .output import ExecutionOutput, pump_stream, RotatingLog, tail_file
+from .progress import report_schedule_status
+
+__all__ = ["SupervisorScheduler"]
+
+
+class SupervisorScheduler:
+    """
+    Run scheduled executions with the chaostoolkit CLI on this host, all of
+    them supervised from a single asyncio event loop thread rather than a
+    thread per execution.
+
+    No more than `concurrency` chaostoolkit processes run at the same time,
+    and no more than `org_concurrency` of them for any given organization.
+    Executions waiting for their turn are started in the order they are
+    due.
+
+    An execution running for longer than `timeout` seconds is terminated,
+    and killed if it is still around `kill_timeout` seconds later.
+
+    Executions are only kept in memory. On shutdown, those which have not
+    started are dropped, their schedules staying pending so they are
+    dispatched again, while running ones are given `drain_timeout` seconds
+    to complete before being terminated.
+
+    The output of each execution is written to a rotating log file in
+    `output_dir` and its last `output_lines` lines are kept in memory while
+    it runs, see `tail`.
+
+    The schedule behind each execution is told when it starts, ends, with
+    the exit code of the run, or is cancelled. Runs which failed or timed
+    out are completed with their exit code. Progress is reported from a
+    thread of its own since it may be written to the database right away.
+    """
+    name = "supervisor"
+    description = "Local scheduler supervising executions from an event loop"
+    version = "0.1.0"
+    settings_key_prefix = "SCHED_SUPERVISOR_"
+
+    def __init__(self, chaostoolkit_cli_path: str = "chaos",
+                 concurrency: int = 64, org_concurrency: int = 8,
+                 timeout: float = 3600, kill_timeout: float = 10,
+                 drain_timeout: float = 60, output_dir: str = None,
+                 output_lines: int = 1000,
+                 output_max_bytes: int = 10485760,
+                 output_backup_count: int = 3,
+                 history_size: int = 1024) -> None:
+        self.chaostoolkit_cli_path = os.path.expanduser(
+            chaostoolkit_cli_path)
+        self.concurrency = max(1, int(concurrency))
+        self.org_concurrency = max(1, int(org_concurrency))
+        self.timeout = float(timeout)
+        self.kill_timeout = float(kill_timeout)
+        self.drain_timeout = float(drain_timeout)
+        self.output_dir = os.path.expanduser(
+            output_dir or os.path.join(gettempdir(), "chaoshub-executions"))
+        self.output_lines = int(output_lines)
+        self.output_max_bytes = int(output_max_bytes)
+        self.output_backup_count = int(output_backup_count)
+        self.outputs: Dict[str, ExecutionOutput] = {}
+        self._app: Optional[Flask] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.reporter: Optional[ThreadPoolExecutor] = None
+        self.watcher = None
+        self.accepting = False
+
+        # only ever touched from the event loop thread, the semaphore is
+        # created from there, see `run_loop`
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.slots: asyncio.Semaphore
+        self.org_slots: Dict[str, asyncio.Semaphore] = {}
+        self.org_usage: Dict[str, int] = {}
+
+        # status and exit code of the executions, the finished ones being
+        # remembered for a while
+        self.statuses: Dict[str, Dict[str, Any]] = {}
+        self.schedule_ids: Dict[str, Optional[str]] = {}
+        self.journals: Dict[str, Dict[str, Any]] = {}
+        self.history = LRUCache(maxsize=history_size, ttl=86400)
+
+    @property
+    def app(self) -> Flask:
+        if self._app is None:
+            raise RuntimeError("The supervisor scheduler has not been started")
+        return self._app
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            raise RuntimeError("The supervisor scheduler has not been started")
+        return self._loop
+
+    def start(self, app: Flask):
+        """
+        Start the event loop thread supervising the executions.
+        """
+        self._app = app
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        self.reporter = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="supervisor-progress")
+        self._loop = asyncio.new_event_loop()
+        self.attach_child_watcher()
+        ready = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run_loop, args=(ready,), name="supervisor-scheduler",
+            daemon=True)
+        self.thread.start()
+        ready.wait()
+        self.accepting = True
+
+    def attach_child_watcher(self):
+        """
+        Before Python 3.8, the default child watcher must be attached to the
+        loop from the main thread to be notified of terminated processes.
+        Later versions watch them from a thread of their own.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        get_child_watcher = getattr(asyncio, "get_child_watcher", None)
+        if get_child_watcher is None:
+            return
+
+        self.watcher = get_child_watcher()
+        self.watcher.attach_loop(self.loop)
+
+    def run_loop(self, ready: threading.Event):
+        loop = self.loop
+        asyncio.set_event_loop(loop)
+        self.slots = asyncio.Semaphore(self.concurrency)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def shutdown(self, timeout: float = None):
+        """
+        Stop accepting executions, drop those which have not started yet
+        and let the running ones complete, for at most `drain_timeout`
+        seconds, before terminating them.
+        """
+        self.accepting = False
+        if self._loop is None or self._loop.is_closed():
+            return
+
+        drained = asyncio.run_coroutine_threadsafe(self.drain(), self.loop)
+        try:
+            drained.result(self.drain_timeout + self.kill_timeout + 5)
+        except Exception:
+            self.app.logger.error(
+                "Failed to drain the supervised executions", exc_info=True)
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None:
+            self.thread.join(timeout)
+        if self.reporter is not None:
+            self.reporter.shutdown()
+
+        # the child watcher handles SIGCHLD through the loop, so both are
+        # released from this thread rather than the loop's
+        if self.watcher is not None:
+            self.watcher.attach_loop(None)
+            self.watcher = None
+        if not self.loop.is_running():
+            self.loop.close()
+
+    async def drain(self):
+        # executions which have not started are not reported as cancelled,
+        # that would be final: their schedules stay pending and are
+        # dispatched again, see `Schedule.get_due`
+        waiting = [
+            job_id for (job_id, status) in self.statuses.items()
+            if status["status"] == "pending"
+        ]
+        for job_id in waiting:
+            self.schedule_ids[job_id] = None
+            self.cancel_task(job_id)
+
+        running = list(self.tasks.values())
+        if not running:
+            return
+
+        self.app.logger.info(
+            "Waiting for {} supervised executions to complete".format(
+                len(running) - len(waiting)))
+        (_, not_done) = await asyncio.wait(running, timeout=self.drain_timeout)
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            await asyncio.wait(not_done)
+
+    def cancel(self, id: str):
+        """
+        Cancel the execution, terminating its process if it has started.
+        """
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.cancel_task, id)
+
+    def cancel_task(self, job_id: str):
+        task = self.tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    def status(self, id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the status, and exit code once it has run, of the execution.
+        `None` when the execution is unknown.
+        """
+        status = self.statuses.get(id)
+        if status is None:
+            status = self.history.get(id)
+        if status is MISSING or status is None:
+            return None
+        return dict(status)
+
+    def tail(self, id: str, lines: int = 100,
+             since: int = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the last `lines` lines output by the execution or, when
+        `since` is set, the lines following that line number, as long as
+        the execution runs. `None` when the execution has no output.
+        """
+        output = self.outputs.get(id)
+        if output is not None:
+            return output.tail(lines, since)
+
+        path = self.output_path(id)
+        if not os.path.exists(path):
+            return None
+        return {
+            "lines": tail_file(path, lines) if since is None else [],
+            "next": None,
+            "running": False
+        }
+
+    def output_path(self, job_id: str) -> str:
+        return os.path.join(self.output_dir, "{}.log".format(job_id))
+
+    def schedule(self, context: ScheduleContext) -> ScheduleInfo:
+        if not self.accepting:
+            raise RuntimeError("The supervisor scheduler is not running")
+
+        job_id = str(uuid.uuid4())
+        self.statuses[job_id] = {"status": "pending", "exit_code": None}
+        self.schedule_ids[job_id] = context.get("id")
+        self.loop.call_soon_threadsafe(self.spawn, job_id, context)
+
+        return {
+            "scheduler": SupervisorScheduler.name,
+            "id": job_id
+        }
+
+    def spawn(self, job_id: str, context: ScheduleContext):
+        task = self.loop.create_task(self.supervise(job_id, context))
+        task.add_done_callback(partial(self.finish, job_id))
+        self.tasks[job_id] = task
+
+    def finish(self, job_id: str, task: asyncio.Task):
+        """
+        Move the final status of the execution to the history. A task
+        cancelled before it even started never got to set it.
+        """
+        self.tasks.pop(job_id, None)
+        status = self.statuses[job_id]
+        if status["status"] in ("pending", "active"):
+            status = {"status": "cancelled", "exit_code": None}
+        self.history.set(job_id, status)
+        del self.statuses[job_id]
+
+        self.report(
+            self.schedule_ids.pop(job_id),
+            ScheduleStatus.cancelled if status["status"] == "cancelled"
+            else ScheduleStatus.completed, status["exit_code"],
+            self.journals.pop(job_id, None))
+
+    def report(self, schedule_id: Optional[str], status: ScheduleStatus,
+               exit_code: int = None, journal: Dict[str, Any] = None):
+        """
+        Report the progress of the schedule from the reporter thread. It is
+        written to the database right away when the progress updater runs
+        synchronously, which must not block the event loop. A single thread
+        keeps the transitions in order.
+        """
+        if schedule_id:
+            self.loop.run_in_executor(
+                self.reporter, report_schedule_status, schedule_id, status,
+                exit_code, journal)
+
+    async def supervise(self, job_id: str, context: ScheduleContext):
+        org_name = context.get("org", {}).get("name")
+        try:
+            when = parse_scheduled(context.get("scheduled"))
+            delay = (when - datetime.utcnow()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            # the organization's slot comes first so that an organization
+            # at its limit does not hold slots others could use
+            async with self.org_slot(org_name):
+                async with self.slots:
+                    self.set_status(job_id, "active")
+                    self.report(
+                        self.schedule_ids[job_id], ScheduleStatus.active)
+                    (status, exit_code) = await self.execute(job_id, context)
+            self.set_status(job_id, status, exit_code)
+        except asyncio.CancelledError:
+            self.set_status(job_id, "cancelled")
+        except Exception:
+            self.set_status(job_id, "failed")
+            self.app.logger.error(
+                "Supervised execution {} failed".format(job_id),
+                exc_info=True)
+
+    def org_slot(self, org_name: str) -> "OrgSlot":
+        return OrgSlot(self, org_name)
+
+    def set_status(self, job_id: str, status: str, exit_code: int = None):
+        self.statuses[job_id] = {"status": status, "exit_code": exit_code}
+
+    async def execute(self, job_id: str, context: ScheduleContext):
+        """
+        Run the chaostoolkit CLI for the execution and return its final
+        status along with the exit code of the process. The journal of the
+        run is kept until its schedule is told about it.
+        """
+        with TemporaryDirectory() as dname:
+            cmd = prepare_run(self.chaostoolkit_cli_path, context, dname)
+            output = ExecutionOutput(
+                RotatingLog(
+                    self.output_path(job_id), self.output_max_bytes,
+                    self.output_backup_count),
+                max_lines=self.output_lines)
+            self.outputs[job_id] = output
+
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd, stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE, env=os.environ,
+                    cwd=dname)
+                try:
+                    exit_code = await asyncio.wait_for(
+                        self.wait(proc, output), self.timeout)
+                except asyncio.TimeoutError:
+                    self.app.logger.warning(
+                        "Supervised execution {} timed out after {}s".format(
+                            job_id, self.timeout))
+                    return ("timedout", await self.stop(proc))
+                except asyncio.CancelledError:
+                    await self.stop(proc)
+                    raise
+            finally:
+                output.close()
+                self.outputs.pop(job_id, None)
+
+            journal = await self.loop.run_in_executor(
+                None, read_journal, dname)
+            if journal is not None:
+                self.journals[job_id] = journal
+
+        return ("completed" if exit_code == 0 else "failed", exit_code)
+
+    async def wait(self, proc: asyncio.subprocess.Process,
+                   output: ExecutionOutput) -> int:
+        await asyncio.gather(*(
+            pump_stream(stream, output)
+            for stream in (proc.stdout, proc.stderr) if stream is not None))
+        return await proc.wait()
+
+    async def stop(self, proc: asyncio.subprocess.Process) -> int:
+        """
+        Terminate the process, killing it when it does not exit within
+        `kill_timeout` seconds.
+        """
+        try:
+            proc.terminate()
+            return await asyncio.wait_for(proc.wait(), self.kill_timeout)
+        except ProcessLookupError:
+            return await proc.wait()
+        except asyncio.TimeoutError:
+            proc.kill()
+            return await proc.wait()
+
+
+class OrgSlot:
+    """
+    Hold one of the slots of an organization while an execution runs. The
+    semaphore of an organization is dropped once it has no execution left
+    so they do not pile up.
+    """
+    def __init__(self, scheduler: SupervisorScheduler, org_name: str) -> None:
+        self.scheduler = scheduler
+        self.org_name = org_name
+        self.semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        scheduler = self.scheduler
+        self.semaphore = scheduler.org_slots.get(self.org_name)
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(scheduler.org_concurrency)
+            scheduler.org_slots[self.org_name] = self.semaphore
+        scheduler.org_usage[self.org_name] = \
+            scheduler.org_usage.get(self.org_name, 0) + 1
+        try:
+            await self.semaphore.acquire()
+        except BaseException:
+            self.release_usage()
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+        self.release_usage()
+
+    def release_usage(self):
+        scheduler = self.scheduler
+        scheduler.org_usage[self.org_name] -= 1
+        if not scheduler.org_usage[self.org_name]:
+            del scheduler.org_usage[self.org_name]
+            del scheduler.org_slots[self.org_name]
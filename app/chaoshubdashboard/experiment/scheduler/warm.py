@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+import chaoshubdashboard
+from chaoshubdashboard.runner import RunRequest
+
+from .output import ExecutionOutput
+
+__all__ = ["WarmPool", "WarmWorker"]
+
+# the directory the application is imported from, so that workers import it
+# from there as well
+IMPORT_ROOT = os.path.dirname(os.path.dirname(
+    os.path.abspath(chaoshubdashboard.__file__)))
+
+
+class WarmWorker:
+    """
+    Worker process running experiments with chaoslib in-process, one at a
+    time, and exiting once it has run `max_runs` of them.
+
+    It is a Python interpreter of its own, running `chaoshubdashboard.runner`
+    rather than being forked from the application, and it imports chaoslib
+    as soon as it starts, before it is handed any experiment.
+
+    Its `poll` and `terminate` methods mirror those of a chaostoolkit CLI
+    process so that both are stopped the same way.
+    """
+    def __init__(self, max_runs: int) -> None:
+        (self.conn, child_conn) = multiprocessing.Pipe()
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [IMPORT_ROOT, env.get("PYTHONPATH")]))
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, "-m", "chaoshubdashboard.runner",
+                 str(child_conn.fileno()), str(max_runs)],
+                pass_fds=(child_conn.fileno(),), stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL, env=env)
+        finally:
+            child_conn.close()
+        self.max_runs = max_runs
+        self.runs = 0
+        self.broken = False
+
+    @property
+    def exhausted(self) -> bool:
+        return self.broken or self.runs >= self.max_runs or \
+            self.poll() is not None
+
+    def poll(self) -> Optional[int]:
+        return self.process.poll()
+
+    def terminate(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+
+    def close(self):
+        """
+        Let the worker go. It exits on its own once its end of the pipe is
+        closed.
+        """
+        self.conn.close()
+        try:
+            self.process.wait(1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def run(self, request: RunRequest,
+            output: ExecutionOutput) -> Optional[Dict[str, Any]]:
+        """
+        Run the experiment and return its journal, appending the log lines
+        of the run to the output as they come. `None` when the run failed
+        or the worker was terminated meanwhile.
+        """
+        self.runs += 1
+        try:
+            self.conn.send(request)
+            while True:
+                (kind, payload) = self.conn.recv()
+                if kind == "log":
+                    output.append(payload.encode("utf-8") + b"\n")
+                elif kind == "journal":
+                    return payload
+                else:
+                    output.append(payload.encode("utf-8"))
+                    return None
+        except (EOFError, OSError):
+            self.broken = True
+            return None
+
+
+class WarmPool:
+    """
+    Pool of up to `size` idle worker processes which have already imported
+    chaoslib, so that runs do not pay for starting a Python interpreter and
+    importing the chaostoolkit.
+
+    Workers are replaced after `max_runs` runs so that whatever leaks from
+    the extensions they load does not accumulate. Their replacement is
+    started right away and warms up while idle.
+    """
+    def __init__(self, size: int = 4, max_runs: int = 50) -> None:
+        self.size = max(1, int(size))
+        self.max_runs = max(1, int(max_runs))
+        self.idle: List[WarmWorker] = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            while len(self.idle) < self.size:
+                self.idle.append(WarmWorker(self.max_runs))
+
+    def shutdown(self):
+        with self.lock:
+            (workers, self.idle) = (self.idle, [])
+        for worker in workers:
+            worker.close()
+
+    def acquire(self) -> WarmWorker:
+        with self.lock:
+            while self.idle:
+                worker = self.idle.pop()
+                if not worker.exhausted:
+                    return worker
+                worker.close()
+        return WarmWorker(self.max_runs)
+
+    def release(self, worker: WarmWorker):
+        """
+        Give the worker back to the pool, replacing it when it has run its
+        share of experiments or is gone.
+        """
+        if worker.exhausted:
+            worker.close()
+            worker = WarmWorker(self.max_runs)
+
+        with self.lock:
+            if len(self.idle) < self.size:
+                self.idle.append(worker)
+                return
+        worker.close()
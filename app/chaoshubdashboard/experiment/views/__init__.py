@@ -11,7 +11,7 @@ import simplejson as json
 from chaoshubdashboard.model import db
 from chaoshubdashboard.utils import load_user
 
-from .. import can_write_to_workspace
+from .. import can_write_to_workspace, search_experiments
 from ..model import Experiment
 from ..services import DashboardService
 from ..types import UserClaim
@@ -39,6 +39,27 @@ def index(user_claim: Dict[str, Any]) -> str:
     return jsonify(result)
 
 
+@experiment_service.route('search', methods=["GET"])
+@load_user(allow_anonymous=False)
+def search(user_claim: UserClaim):
+    """
+    Search the user's experiments by title, with `q`, and by tags, with one
+    `tag` parameter per tag.
+    """
+    if request.headers.get('Accept') != 'application/json':
+        return abort(406)
+
+    max_limit = current_app.config.get("SEARCH_RESULTS_SIZE", 50)
+    limit = request.args.get("limit", max_limit, type=int)
+    limit = max(1, min(limit, max_limit))
+
+    result = search_experiments(
+        user_claim, terms=request.args.get("q"),
+        tags=request.args.getlist("tag"), limit=limit)
+
+    return jsonify(result)
+
+
 @experiment_service.route('new', methods=['GET', 'HEAD'])
 @load_user(allow_anonymous=False)
 def new(user_claim: UserClaim):
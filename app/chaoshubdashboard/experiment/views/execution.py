@@ -4,6 +4,7 @@ import copy
 import io
 import os.path
 from typing import Any, Dict
+from urllib.parse import urlencode
 import uuid
 
 import dateparser
@@ -18,7 +19,8 @@ import yamlloader
 from chaoshubdashboard.model import db
 from chaoshubdashboard.utils import cache, load_user
 
-from .. import load_execution, load_experiment, load_org_and_workspace
+from .. import get_experiment_executions, load_execution, load_experiment, \
+    load_org_and_workspace
 from ..model import Execution, Experiment, Schedule
 from ..scheduler import is_scheduler_registered, schedule, schedulers
 from ..services import AuthService, DashboardService
@@ -49,21 +51,40 @@ def executions(user_claim: UserClaim, org: Org, workspace: Workspace,
     if request.headers.get('Accept') != 'application/json':
         return render_template('index.html')
 
-    executions = Execution.query.filter(
-        Execution.experiment_id==experiment.id).order_by(
-            Execution.timestamp.desc()).all()
-
     visibilities = workspace["settings"]["visibility"]["execution"]
     if not user_claim:
         visibility = visibilities["anonymous"]
     else:
         visibility = visibilities["members"]
 
-    result = []
-    for execution in executions:
-        result.append(execution.to_dict(visibility))
-
-    return jsonify(result)
+    max_limit = current_app.config.get("EXECUTIONS_PAGE_SIZE", 100)
+    limit = request.args.get("limit", max_limit, type=int)
+    limit = max(1, min(limit, max_limit))
+    before = request.args.get("before", type=int)
+    fields = request.args.get("fields")
+    if fields:
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+
+    # the timestamp is the cursor of the next page, it is always selected
+    # but only returned when requested
+    with_timestamp = not fields or "timestamp" in fields
+    if not with_timestamp:
+        fields.append("timestamp")
+
+    result = get_experiment_executions(
+        experiment.id, visibility, before=before, limit=limit, fields=fields)
+    cursor = result[-1]["timestamp"] if len(result) == limit else None
+    if not with_timestamp:
+        for run in result:
+            run.pop("timestamp", None)
+
+    response = jsonify(result)
+    if cursor is not None:
+        args = request.args.to_dict()
+        args["before"] = cursor
+        response.headers["Link"] = '<{}?{}>; rel="next"'.format(
+            request.base_url, urlencode(args))
+    return response
 
 
 @execution_service.route('<int:timestamp>/context', methods=['GET'])
@@ -81,3 +102,42 @@ def context(user_claim: UserClaim, org: Org, workspace: Workspace,
         visibility = visibilities["members"]
 
     return jsonify(execution.to_dict(visibility))
+
+
+@execution_service.route(
+    'scheduled/<string:schedule_id>/output', methods=['GET'])
+@accept("application/json")
+@load_user(allow_anonymous=False)
+@load_org_and_workspace(permissions=('read', 'write'))
+@load_experiment()
+def output(user_claim: UserClaim, org: Org, workspace: Workspace,
+           experiment: Experiment, schedule_id: str):
+    """
+    Tail the output of a scheduled execution. Pass the `next` value of the
+    response as the `since` query parameter to follow the execution.
+    """
+    try:
+        schedule_id = shortuuid.decode(schedule_id)
+    except ValueError:
+        return abort(404)
+
+    s = Schedule.query.filter(
+        Schedule.id==schedule_id,
+        Schedule.experiment_id==experiment.id).first()
+    if not s or not s.info:
+        return abort(404)
+
+    scheduler = schedulers().get(s.info.get("scheduler"))
+    tail = getattr(scheduler, "tail", None)
+    if not tail:
+        return abort(404)
+
+    max_lines = current_app.config.get("EXECUTION_OUTPUT_TAIL_SIZE", 500)
+    lines = request.args.get("lines", max_lines, type=int)
+    lines = max(1, min(lines, max_lines))
+    since = request.args.get("since", type=int)
+
+    result = tail(s.info["id"], lines=lines, since=since)
+    if result is None:
+        return abort(404)
+    return jsonify(result)
@@ -8,7 +8,8 @@ import uuid
 
 from chaoslib.extension import merge_extension
 from flask import abort, Blueprint, current_app, redirect, render_template, \
-    jsonify, request, send_file, session, url_for, Response
+    jsonify, request, send_file, session, stream_with_context, url_for, \
+    Response
 from flask_accept import accept, accept_fallback
 import shortuuid
 import simplejson as json
@@ -18,6 +19,7 @@ import yamlloader
 from chaoshubdashboard.model import db
 from chaoshubdashboard.utils import cache, load_user
 
+from ..export import export_workspace
 from ..model import Experiment
 from ..services import DashboardService
 from ..types import UserClaim
@@ -139,6 +141,7 @@ def new(user_claim: UserClaim, org: str, workspace: str):
         workspace_id=shortuuid.decode(w["id"]),
         payload=declaration
     )
+    experiment.extract_search_fields()
     db.session.add(experiment)
     db.session.commit()
 
@@ -161,6 +164,33 @@ def new(user_claim: UserClaim, org: str, workspace: str):
     }), 201
 
 
+@workspace_experiment_service.route('export', methods=['GET'])
+@load_user(allow_anonymous=False)
+def export(user_claim: UserClaim, org: str, workspace: str):
+    """
+    Stream all the experiments and executions of the workspace as
+    gzip-compressed newline-delimited JSON.
+    """
+    w = DashboardService.get_workspace(user_claim, org, workspace)
+    if not w:
+        return abort(404)
+
+    acls = w["context"]["acls"]
+    if "view" not in acls or "write" not in acls:
+        return abort(404)
+
+    since = request.args.get("since", type=int)
+    chunks = export_workspace(shortuuid.decode(w["id"]), since=since)
+    filename = "{}-{}.ndjson.gz".format(w["org"]["name"], w["name"])
+    return Response(
+        stream_with_context(chunks), status=200,
+        mimetype="application/gzip",
+        headers={
+            "Content-Disposition": "attachment; filename={}".format(
+                filename)
+        })
+
+
 @workspace_experiment_service.route('<string:experiment_id>/download/json',
                                     methods=['GET'])
 @load_user(allow_anonymous=True)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Hashable
+
+__all__ = ["LRUCache", "MISSING"]
+
+# returned by `LRUCache.get` when the key isn't cached, as `None` is a value
+# we may want to cache too
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe in-process cache holding at most `maxsize` entries, each for
+    at most `ttl` seconds. The least recently used entry is dropped first
+    when the cache is full.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 60) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        Return the cached value or `default` when missing or expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return default
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """
+        Cache the value for `ttl` seconds, or the cache's default ttl.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
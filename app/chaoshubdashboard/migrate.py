@@ -19,5 +19,7 @@ def migrate_db(env_file: str = '.env') -> Flask:
         os.path.join(os.path.dirname(__file__), env_file))
     load_settings(env_file)
     app = create_app()
-    migrate = Migrate(app, db, compare_type=True)
+    migrate = Migrate(
+        app, db, compare_type=True,
+        directory=os.path.join(os.path.dirname(__file__), "migrations"))
     return app
@@ -0,0 +1,44 @@
+"""Store execution journals compressed in their own table
+
+Revision ID: 0ac3d73af87c
+Revises: 9ee82c03e94e
+Create Date: 2026-10-18 19:47:26.918305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0ac3d73af87c'
+down_revision = '9ee82c03e94e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'execution_journal',
+        sa.Column('id', sa.String(length=64), nullable=False),
+        sa.Column('compression', sa.String(length=10), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # existing journals stay in the execution's payload column until they
+    # are moved with `chaoshub-dashboard migrate-journals`
+    with op.batch_alter_table('execution') as batch_op:
+        batch_op.add_column(
+            sa.Column('journal_id', sa.String(length=64), nullable=True))
+        batch_op.create_foreign_key(
+            'execution_journal_id_fkey', 'execution_journal',
+            ['journal_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('execution') as batch_op:
+        batch_op.drop_constraint(
+            'execution_journal_id_fkey', type_='foreignkey')
+        batch_op.drop_column('journal_id')
+    op.drop_table('execution_journal')
@@ -0,0 +1,56 @@
+"""Store JSON documents as native jsonb values on PostgreSQL
+
+Revision ID: 1a2f3c4d5e6f
+Revises: 0ac3d73af87c
+Create Date: 2026-10-18 09:12:41.503217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '1a2f3c4d5e6f'
+down_revision = '0ac3d73af87c'
+branch_labels = None
+depends_on = None
+
+# (table, column) pairs of every JSON document column
+JSON_COLUMNS = [
+    ("user_privacy", "details"),
+    ("workspace", "settings"),
+    ("org", "settings"),
+    ("activity", "extra"),
+    ("discovery", "payload"),
+    ("experiment", "payload"),
+    ("init", "payload"),
+    ("execution", "payload"),
+    ("recommendation", "meta"),
+    ("recommendation", "data"),
+    ("schedule", "definition"),
+    ("schedule", "info"),
+]
+
+
+def upgrade():
+    # other backends store these documents as text, there is nothing to do
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for (table, column) in JSON_COLUMNS:
+        op.alter_column(
+            table, column, type_=postgresql.JSONB(),
+            existing_type=postgresql.JSON(),
+            postgresql_using='{}::jsonb'.format(column))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for (table, column) in JSON_COLUMNS:
+        op.alter_column(
+            table, column, type_=postgresql.JSON(),
+            existing_type=postgresql.JSONB(),
+            postgresql_using='{}::json'.format(column))
@@ -0,0 +1,70 @@
+"""Index the title and tags of experiments
+
+Revision ID: 2b3e4f5a6c7d
+Revises: 1a2f3c4d5e6f
+Create Date: 2026-10-18 10:04:17.218649
+
+"""
+from alembic import op
+import simplejson as json
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '2b3e4f5a6c7d'
+down_revision = '1a2f3c4d5e6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    is_pg = conn.dialect.name == 'postgresql'
+    json_type = postgresql.JSONB() if is_pg else sa.UnicodeText()
+
+    op.add_column('experiment', sa.Column('title', sa.String(), nullable=True))
+    op.add_column('experiment', sa.Column('tags', json_type, nullable=True))
+
+    if is_pg:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # only string tags are kept, as `Experiment.extract_search_fields`
+        # does
+        op.execute(
+            "UPDATE experiment SET title = payload->>'title', "
+            "tags = CASE WHEN jsonb_typeof(payload->'tags') = 'array' "
+            "THEN COALESCE(("
+            "SELECT jsonb_agg(tag) "
+            "FROM jsonb_array_elements(payload->'tags') AS tag "
+            "WHERE jsonb_typeof(tag) = 'string'), '[]'::jsonb) "
+            "ELSE '[]'::jsonb END")
+    else:
+        experiment = sa.table(
+            'experiment', sa.column('id'), sa.column('payload'),
+            sa.column('title'), sa.column('tags'))
+        rows = conn.execute(
+            sa.select([experiment.c.id, experiment.c.payload])).fetchall()
+        for (experiment_id, payload) in rows:
+            payload = json.loads(payload) if payload else {}
+            tags = payload.get("tags")
+            if not isinstance(tags, list):
+                tags = []
+            tags = [tag for tag in tags if isinstance(tag, str)]
+            conn.execute(
+                experiment.update().where(experiment.c.id==experiment_id)
+                .values(title=payload.get("title"), tags=json.dumps(tags)))
+
+    op.create_index(
+        'experiment_tags_idx', 'experiment', ['tags'],
+        postgresql_using='gin')
+    op.create_index(
+        'experiment_title_trgm_idx', 'experiment', ['title'],
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('experiment_title_trgm_idx', table_name='experiment')
+    op.drop_index('experiment_tags_idx', table_name='experiment')
+    with op.batch_alter_table('experiment') as batch_op:
+        batch_op.drop_column('tags')
+        batch_op.drop_column('title')
@@ -0,0 +1,38 @@
+"""Index usernames and full names by trigrams on PostgreSQL
+
+Revision ID: 3c4d5e6f7a8b
+Revises: 2b3e4f5a6c7d
+Create Date: 2026-10-18 11:26:53.904112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c4d5e6f7a8b'
+down_revision = '2b3e4f5a6c7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # other backends rely on the in-process user search index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'user_info_username_trgm_idx', 'user_info', ['username'],
+        postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'})
+    op.create_index(
+        'user_info_fullname_trgm_idx', 'user_info', ['fullname'],
+        postgresql_using='gin', postgresql_ops={'fullname': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('user_info_fullname_trgm_idx', table_name='user_info')
+    op.drop_index('user_info_username_trgm_idx', table_name='user_info')
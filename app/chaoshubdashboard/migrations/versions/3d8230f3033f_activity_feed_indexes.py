@@ -0,0 +1,58 @@
+"""Index activity feeds and store the names of their org and workspace
+
+Revision ID: 3d8230f3033f
+Revises:
+Create Date: 2026-10-18 19:12:08.640127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d8230f3033f'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (index, column the feed is read by)
+FEED_INDEXES = [
+    ('activity_account_visibility_timestamp_idx', 'account_id'),
+    ('activity_org_visibility_timestamp_idx', 'org_id'),
+    ('activity_workspace_visibility_timestamp_idx', 'workspace_id'),
+]
+
+
+def upgrade():
+    op.add_column(
+        'activity', sa.Column('org_name', sa.String(), nullable=True))
+    op.add_column(
+        'activity', sa.Column('workspace_name', sa.String(), nullable=True))
+
+    for (name, column) in FEED_INDEXES:
+        op.create_index(
+            name, 'activity',
+            [column, 'visibility', sa.text('timestamp DESC')])
+
+    # activities recorded so far get the names their org and workspace
+    # have now
+    activity = sa.table(
+        'activity', sa.column('org_id'), sa.column('workspace_id'),
+        sa.column('org_name'), sa.column('workspace_name'))
+    org = sa.table('org', sa.column('id'), sa.column('name'))
+    workspace = sa.table('workspace', sa.column('id'), sa.column('name'))
+    op.execute(
+        activity.update().where(activity.c.org_id.isnot(None)).values(
+            org_name=sa.select([org.c.name]).where(
+                org.c.id==activity.c.org_id).as_scalar()))
+    op.execute(
+        activity.update().where(activity.c.workspace_id.isnot(None)).values(
+            workspace_name=sa.select([workspace.c.name]).where(
+                workspace.c.id==activity.c.workspace_id).as_scalar()))
+
+
+def downgrade():
+    for (name, _) in reversed(FEED_INDEXES):
+        op.drop_index(name, table_name='activity')
+    op.drop_column('activity', 'workspace_name')
+    op.drop_column('activity', 'org_name')
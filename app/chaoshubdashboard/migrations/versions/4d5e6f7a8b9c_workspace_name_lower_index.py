@@ -0,0 +1,26 @@
+"""Index workspaces by organization and lowered name
+
+Revision ID: 4d5e6f7a8b9c
+Revises: 3c4d5e6f7a8b
+Create Date: 2026-10-18 14:02:31.517204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d5e6f7a8b9c'
+down_revision = '3c4d5e6f7a8b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'workspace_org_name_lower_uniq', 'workspace', ['org_id', 'name_lower'],
+        unique=True)
+
+
+def downgrade():
+    op.drop_index('workspace_org_name_lower_uniq', table_name='workspace')
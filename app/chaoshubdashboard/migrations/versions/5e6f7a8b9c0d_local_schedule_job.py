@@ -0,0 +1,62 @@
+"""Persist the executions queued by the local scheduler
+
+Revision ID: 5e6f7a8b9c0d
+Revises: 4d5e6f7a8b9c
+Create Date: 2026-10-18 15:40:12.362871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = '5e6f7a8b9c0d'
+down_revision = '4d5e6f7a8b9c'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('pending', 'active', 'completed', 'cancelled')
+
+
+def upgrade():
+    is_pg = op.get_bind().dialect.name == 'postgresql'
+    if is_pg:
+        # the type already exists for the schedule table
+        status_type = postgresql.ENUM(
+            *STATUSES, name='schedulestatus', create_type=False)
+        json_type = postgresql.JSONB()
+    else:
+        status_type = sa.Enum(*STATUSES, name='schedulestatus')
+        json_type = sa.UnicodeText()
+
+    op.create_table(
+        'local_schedule_job',
+        sa.Column(
+            'id', sqlalchemy_utils.types.uuid.UUIDType(binary=False),
+            nullable=False),
+        sa.Column(
+            'schedule_id', sqlalchemy_utils.types.uuid.UUIDType(binary=False),
+            nullable=True),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.Column('scheduled', sa.DateTime(), nullable=False),
+        sa.Column('status', status_type, nullable=False),
+        sa.Column('context', json_type, nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_local_schedule_job_schedule_id', 'local_schedule_job',
+        ['schedule_id'])
+    op.create_index(
+        'local_schedule_job_status_scheduled_idx', 'local_schedule_job',
+        ['status', 'scheduled'])
+
+
+def downgrade():
+    op.drop_index(
+        'local_schedule_job_status_scheduled_idx',
+        table_name='local_schedule_job')
+    op.drop_index(
+        'ix_local_schedule_job_schedule_id', table_name='local_schedule_job')
+    op.drop_table('local_schedule_job')
@@ -0,0 +1,38 @@
+"""Track the progress of scheduled executions
+
+Revision ID: 6f7a8b9c0d1e
+Revises: 5e6f7a8b9c0d
+Create Date: 2026-10-18 18:05:47.513204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f7a8b9c0d1e'
+down_revision = '5e6f7a8b9c0d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'schedule', sa.Column('started', sa.DateTime(), nullable=True))
+    op.add_column(
+        'schedule', sa.Column('ended', sa.DateTime(), nullable=True))
+    op.add_column(
+        'schedule', sa.Column('exit_code', sa.Integer(), nullable=True))
+    op.add_column(
+        'schedule',
+        sa.Column('execution_timestamp', sa.BigInteger(), nullable=True))
+    op.create_index(
+        'schedule_status_scheduled_idx', 'schedule', ['status', 'scheduled'])
+
+
+def downgrade():
+    op.drop_index('schedule_status_scheduled_idx', table_name='schedule')
+    op.drop_column('schedule', 'execution_timestamp')
+    op.drop_column('schedule', 'exit_code')
+    op.drop_column('schedule', 'ended')
+    op.drop_column('schedule', 'started')
@@ -0,0 +1,50 @@
+"""Lease local executions to the process running them
+
+Revision ID: 7a8b9c0d1e2f
+Revises: 6f7a8b9c0d1e
+Create Date: 2026-10-18 21:12:40.385174
+
+"""
+from alembic import op
+import simplejson as json
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a8b9c0d1e2f'
+down_revision = '6f7a8b9c0d1e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'local_schedule_job', sa.Column('owner', sa.String(), nullable=True))
+    op.add_column(
+        'local_schedule_job',
+        sa.Column('lease_expires', sa.DateTime(), nullable=True))
+
+    # access tokens are now looked up when the job runs, from the
+    # `token_id` of the context, rather than stored in it
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        op.execute(
+            "UPDATE local_schedule_job SET context = context - 'token'")
+    else:
+        job = sa.table('local_schedule_job', sa.column('id'),
+                       sa.column('context'))
+        rows = conn.execute(sa.select([job.c.id, job.c.context])).fetchall()
+        for (job_id, context) in rows:
+            context = json.loads(context) if context else {}
+            if "token" not in context:
+                continue
+            context.pop("token")
+            conn.execute(
+                job.update().where(job.c.id==job_id)
+                .values(context=json.dumps(context)))
+
+
+def downgrade():
+    with op.batch_alter_table('local_schedule_job') as batch_op:
+        batch_op.drop_column('lease_expires')
+        batch_op.drop_column('owner')
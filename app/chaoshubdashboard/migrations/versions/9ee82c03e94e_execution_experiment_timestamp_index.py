@@ -0,0 +1,26 @@
+"""Index the executions of experiments, most recent first
+
+Revision ID: 9ee82c03e94e
+Revises: 3d8230f3033f
+Create Date: 2026-10-18 19:31:52.204718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9ee82c03e94e'
+down_revision = '3d8230f3033f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'execution_experiment_timestamp_idx', 'execution',
+        ['experiment_id', sa.text('timestamp DESC')])
+
+
+def downgrade():
+    op.drop_index('execution_experiment_timestamp_idx', table_name='execution')
@@ -1,10 +1,24 @@
 # -*- coding: utf-8 -*-
+from functools import wraps
 import os
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import uuid
 
-from flask import current_app, Flask
+from flask import current_app, Flask, g, has_request_context
 from flask_sqlalchemy import SQLAlchemy as SA
+import shortuuid
+from sqlalchemy import and_, event, or_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from sqlalchemy_utils import JSONType, UUIDType
 
-__all__ = ["db", "get_user_info_secret_key", "get_db_conn_uri_from_env"]
+__all__ = ["db", "get_user_info_secret_key", "get_db_conn_uri_from_env",
+           "request_memoized", "clear_request_memo", "get_request_memo_stats",
+           "JSONB", "UUID", "Cursor", "parse_cursor", "format_cursor",
+           "before_cursor"]
+
+# timestamp and identifier of the last row of a page, most recent first
+Cursor = Tuple[int, Optional[uuid.UUID]]
 
 
 class SQLAlchemy(SA):
@@ -23,6 +37,26 @@ class SQLAlchemy(SA):
 db = SQLAlchemy()
 
 
+class JSONB(JSONType):
+    """
+    JSON document stored as a native `jsonb` value on PostgreSQL, so it can
+    be indexed and queried with the JSON operators, and as text elsewhere.
+    """
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.JSONB())
+        return JSONType.load_dialect_impl(self, dialect)
+
+
+class UUID(UUIDType):
+    """
+    UUID stored as a native `uuid` value on PostgreSQL and as its 32
+    hexadecimal characters elsewhere.
+    """
+    def __init__(self, binary: bool = False, native: bool = True):
+        UUIDType.__init__(self, binary=binary, native=native)
+
+
 def get_db_conn_uri_from_env() -> str:
     """
     Create the DB connection URI to connect to the database backend.
@@ -47,3 +81,125 @@ def get_user_info_secret_key() -> str:
     if not key:
         raise RuntimeError("User profile secret key not set!")
     return key
+
+
+def parse_cursor(value: Optional[str]) -> Optional[Cursor]:
+    """
+    Parse a `<timestamp>.<id>` paging cursor, as made by `format_cursor`.
+    A bare timestamp is accepted as well. Return `None` when the value isn't
+    a cursor.
+    """
+    if not value:
+        return None
+
+    (timestamp, _, identifier) = value.partition(".")
+    try:
+        return (int(timestamp),
+                shortuuid.decode(identifier) if identifier else None)
+    except ValueError:
+        return None
+
+
+def format_cursor(timestamp: int, identifier: str) -> str:
+    """
+    Make the cursor of the page following the row with that timestamp and
+    short identifier.
+    """
+    return "{}.{}".format(timestamp, identifier)
+
+
+def before_cursor(timestamp: Any, identifier: Any, cursor: Cursor) -> Any:
+    """
+    Criterion of the rows following the cursor when ordered by the
+    `timestamp` and `identifier` columns, most recent first.
+
+    Timestamps aren't unique so rows sharing the cursor's timestamp are
+    paged through by identifier. Without one, only rows strictly older than
+    the cursor follow it.
+    """
+    (ts, ident) = cursor
+    if ident is None:
+        return timestamp<ts
+    return or_(timestamp<ts, and_(timestamp==ts, identifier<ident))
+
+
+class RequestMemo:
+    """
+    Results of model lookups performed during a single request
+    """
+    def __init__(self):
+        self.values: Dict[Tuple[Hashable, ...], Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.values.clear()
+
+
+def request_memoized(f: Callable) -> Callable:
+    """
+    Memoize the result of the decorated lookup for the duration of the
+    current request so that repeated calls, with the same arguments, do not
+    hit the database again.
+
+    Model instances passed as arguments, usually `self`, are keyed by their
+    identifier. Outside of a request, the lookup is always performed.
+
+    The memo is cleared whenever the session is flushed or rolled back so
+    that we never serve a result which may have been changed since.
+    """
+    @wraps(f)
+    def wrapped(*args):
+        if not has_request_context():
+            return f(*args)
+
+        memo = get_request_memo()
+        key = (f.__qualname__,) + tuple(memo_key(arg) for arg in args)
+        if key in memo.values:
+            memo.hits += 1
+            return memo.values[key]
+
+        memo.misses += 1
+        result = memo.values[key] = f(*args)
+        return result
+    return wrapped
+
+
+def get_request_memo() -> RequestMemo:
+    memo = getattr(g, "_request_memo", None)
+    if memo is None:
+        memo = g._request_memo = RequestMemo()
+    return memo
+
+
+def clear_request_memo(exc: BaseException = None):
+    """
+    Drop all the lookups memoized so far in the current request.
+    """
+    if has_request_context():
+        memo = getattr(g, "_request_memo", None)
+        if memo is not None:
+            memo.clear()
+
+
+def get_request_memo_stats() -> Dict[str, int]:
+    """
+    Return the number of hits and misses of the current request's memo.
+    """
+    if not has_request_context():
+        return {"hits": 0, "misses": 0}
+
+    memo = get_request_memo()
+    return {"hits": memo.hits, "misses": memo.misses}
+
+
+def memo_key(arg: Any) -> Hashable:
+    if isinstance(arg, db.Model):
+        return (arg.__class__.__name__, str(arg.id))
+    return str(arg)
+
+
+@event.listens_for(Session, "after_flush")
+@event.listens_for(Session, "after_soft_rollback")
+def session_changed(session: Session, *args):
+    clear_request_memo()
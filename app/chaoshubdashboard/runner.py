@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Code run by the warm worker processes of the local scheduler. It is kept out
+of the application's packages so that these processes only import chaoslib
+and the chaostoolkit, not the application.
+
+    $ python -m chaoshubdashboard.runner <pipe fd> <max runs>
+"""
+import json
+import logging
+from multiprocessing.connection import Connection
+import os
+import sys
+import traceback
+from typing import Any, Dict
+
+from chaoshub import get_context
+from chaoshub.publish import publish_to_hub
+from chaoslib.experiment import ensure_experiment_is_valid, run_experiment
+from chaoslib.loader import load_experiment
+from chaoslib.notification import notify, RunFlowEvent
+from chaoslib.settings import load_settings
+from chaostoolkit.cli import encoder
+from logzero import logger
+
+__all__ = ["RunRequest", "serve"]
+
+# what a run is given to work with: its directory and the files, written by
+# `write_run_files`, it reads the settings and the experiment from
+RunRequest = Dict[str, Any]
+
+
+class PipeHandler(logging.Handler):
+    def __init__(self, conn: Connection) -> None:
+        super().__init__()
+        self.conn = conn
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.conn.send(("log", self.format(record)))
+        except Exception:
+            self.handleError(record)
+
+
+def serve(conn: Connection, max_runs: int):
+    """
+    Loop of a worker process: run the experiments it is sent until it has
+    run `max_runs` of them or its pool goes away.
+    """
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.setLevel(logging.INFO)
+    handler = PipeHandler(conn)
+    handler.setFormatter(logging.Formatter(
+        "[%(asctime)s %(levelname)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+    logger.addHandler(handler)
+
+    for _ in range(max_runs):
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+
+        try:
+            conn.send(("journal", run_request(request)))
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+
+
+def run_request(request: RunRequest) -> Dict[str, Any]:
+    """
+    Do what `chaos run` does, from loading the experiment to publishing its
+    journal to the Chaos Hub, and return that journal.
+    """
+    os.chdir(request["dname"])
+    settings = load_settings(request["settings_path"])
+    experiment = load_experiment(request["experiment_path"], settings)
+    notify(settings, RunFlowEvent.RunStarted, experiment)
+    ensure_experiment_is_valid(experiment)
+    experiment["dry"] = False
+
+    journal = run_experiment(experiment)
+    # the journal is sent as it would have been saved by the CLI
+    journal = json.loads(json.dumps(journal, default=encoder))
+    journal_path = os.path.join(request["dname"], "journal.json")
+    with open(journal_path, "w") as f:
+        json.dump(journal, f, indent=2, ensure_ascii=False)
+
+    if journal["status"] == "completed":
+        notify(settings, RunFlowEvent.RunCompleted, journal)
+    else:
+        notify(settings, RunFlowEvent.RunFailed, journal)
+
+    context = get_context(
+        experiment, request["experiment_path"], request["org"],
+        request["workspace"], settings)
+    publish_to_hub(context, journal_path, journal)
+
+    return journal
+
+
+if __name__ == '__main__':
+    serve(Connection(int(sys.argv[1])), int(sys.argv[2]))
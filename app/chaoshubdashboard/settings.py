@@ -77,3 +77,72 @@ def configure_app(app: Flask):
     if app.config["CACHE_TYPE"] == "redis":
         app.config["CACHE_REDIS_HOST"] = os.getenv("CACHE_REDIS_HOST")
         app.config["CACHE_REDIS_PORT"] = os.getenv("CACHE_REDIS_PORT", 6379)
+
+    app.config["CLAIM_CACHE_TIMEOUT"] = int(
+        os.getenv("CLAIM_CACHE_TIMEOUT", 60))
+
+    app.config["EXECUTIONS_PAGE_SIZE"] = int(
+        os.getenv("EXECUTIONS_PAGE_SIZE", 100))
+    app.config["SEARCH_RESULTS_SIZE"] = int(
+        os.getenv("SEARCH_RESULTS_SIZE", 50))
+    app.config["EXECUTION_OUTPUT_TAIL_SIZE"] = int(
+        os.getenv("EXECUTION_OUTPUT_TAIL_SIZE", 500))
+    app.config["USER_SEARCH_INDEX_REFRESH_INTERVAL"] = float(
+        os.getenv("USER_SEARCH_INDEX_REFRESH_INTERVAL", 300))
+
+    app.config["API_BATCH_MAX_SIZE"] = int(
+        os.getenv("API_BATCH_MAX_SIZE", 500))
+
+    app.config["PROFILE_CACHE_SIZE"] = int(
+        os.getenv("PROFILE_CACHE_SIZE", 1024))
+    app.config["PROFILE_CACHE_TTL"] = int(os.getenv("PROFILE_CACHE_TTL", 300))
+    app.config["NAME_CACHE_SIZE"] = int(os.getenv("NAME_CACHE_SIZE", 1024))
+    app.config["NAME_CACHE_TTL"] = int(os.getenv("NAME_CACHE_TTL", 300))
+
+    app.config["TOKEN_CACHE_SIZE"] = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
+    app.config["TOKEN_CACHE_TTL"] = int(os.getenv("TOKEN_CACHE_TTL", 60))
+    app.config["TOKEN_USAGE_FLUSH_INTERVAL"] = float(
+        os.getenv("TOKEN_USAGE_FLUSH_INTERVAL", 10.0))
+
+    app.config["SCHED_LOCAL_WORKERS"] = int(
+        os.getenv("SCHED_LOCAL_WORKERS", 4))
+    if os.getenv("SCHED_LOCAL_CHAOSTOOLKIT_CLI_PATH"):
+        app.config["SCHED_LOCAL_CHAOSTOOLKIT_CLI_PATH"] = os.getenv(
+            "SCHED_LOCAL_CHAOSTOOLKIT_CLI_PATH")
+    if os.getenv("SCHED_LOCAL_OUTPUT_DIR"):
+        app.config["SCHED_LOCAL_OUTPUT_DIR"] = os.getenv(
+            "SCHED_LOCAL_OUTPUT_DIR")
+    app.config["SCHED_LOCAL_OUTPUT_LINES"] = int(
+        os.getenv("SCHED_LOCAL_OUTPUT_LINES", 1000))
+    app.config["SCHED_LOCAL_OUTPUT_MAX_BYTES"] = int(
+        os.getenv("SCHED_LOCAL_OUTPUT_MAX_BYTES", 10485760))
+    app.config["SCHED_LOCAL_OUTPUT_BACKUP_COUNT"] = int(
+        os.getenv("SCHED_LOCAL_OUTPUT_BACKUP_COUNT", 3))
+    app.config["SCHEDULE_PROGRESS_FLUSH_INTERVAL"] = float(
+        os.getenv("SCHEDULE_PROGRESS_FLUSH_INTERVAL", 1.0))
+    app.config["SCHED_LOCAL_RUNNER"] = os.getenv("SCHED_LOCAL_RUNNER", "cli")
+    app.config["SCHED_LOCAL_WARM_MAX_RUNS"] = int(
+        os.getenv("SCHED_LOCAL_WARM_MAX_RUNS", 50))
+    app.config["SCHED_LOCAL_LEASE_DURATION"] = float(
+        os.getenv("SCHED_LOCAL_LEASE_DURATION", 60))
+    app.config["SCHED_SUPERVISOR_CONCURRENCY"] = int(
+        os.getenv("SCHED_SUPERVISOR_CONCURRENCY", 64))
+    app.config["SCHED_SUPERVISOR_ORG_CONCURRENCY"] = int(
+        os.getenv("SCHED_SUPERVISOR_ORG_CONCURRENCY", 8))
+    app.config["SCHED_SUPERVISOR_TIMEOUT"] = float(
+        os.getenv("SCHED_SUPERVISOR_TIMEOUT", 3600))
+    app.config["SCHED_SUPERVISOR_DRAIN_TIMEOUT"] = float(
+        os.getenv("SCHED_SUPERVISOR_DRAIN_TIMEOUT", 60))
+    if os.getenv("SCHED_SUPERVISOR_CHAOSTOOLKIT_CLI_PATH"):
+        app.config["SCHED_SUPERVISOR_CHAOSTOOLKIT_CLI_PATH"] = os.getenv(
+            "SCHED_SUPERVISOR_CHAOSTOOLKIT_CLI_PATH")
+    if os.getenv("SCHED_SUPERVISOR_OUTPUT_DIR"):
+        app.config["SCHED_SUPERVISOR_OUTPUT_DIR"] = os.getenv(
+            "SCHED_SUPERVISOR_OUTPUT_DIR")
+
+    app.config["ACTIVITY_QUEUE_ENABLED"] = True if os.getenv(
+        "ACTIVITY_QUEUE_ENABLED") else False
+    app.config["ACTIVITY_QUEUE_BATCH_SIZE"] = int(
+        os.getenv("ACTIVITY_QUEUE_BATCH_SIZE", 100))
+    app.config["ACTIVITY_QUEUE_FLUSH_INTERVAL"] = float(
+        os.getenv("ACTIVITY_QUEUE_FLUSH_INTERVAL", 1.0))
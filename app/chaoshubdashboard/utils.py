@@ -3,12 +3,10 @@ from functools import wraps
 from typing import Any, Dict, Optional
 
 from flask import abort, current_app, redirect
-from jose import jwt
-from jose.exceptions import JOSEError
 from flask_caching import Cache
 
 from .model import db
-from .auth import get_current_user_claim_from_session
+from .auth import get_current_user_claim
 from .auth.model import Account, ProviderToken
 
 __all__ = ["get_user_claim", "cache", "load_user"]
@@ -26,44 +24,17 @@ def load_user(allow_anonymous: bool = False):
         """
         @wraps(f)
         def decorated(*args, **kwargs):
-            signed_account_claim = get_current_user_claim_from_session()
-            if not signed_account_claim and not allow_anonymous:
+            user_claim = get_current_user_claim()
+            if not user_claim and not allow_anonymous:
                 signin_url = "{}/signin".format(
                     current_app.config.get("OAUTH_REDIRECT_BASE"))
                 raise abort(redirect(signin_url))
 
-            kwargs['user_claim'] = None
-            if signed_account_claim:
-                secret = current_app.config.get("CLAIM_SIGNER_KEY")
-                if not secret:
-                    raise abort(500)
-
-                try:
-                    signed_claim = jwt.decode(
-                        signed_account_claim, key=secret, algorithms='HS384')
-                except JOSEError as x:
-                    raise abort(500)
-
-                kwargs['user_claim'] = signed_claim
-
+            kwargs['user_claim'] = user_claim or None
             return f(*args, **kwargs)
         return decorated
     return wrapped
 
 
 def get_user_claim():
-    signed_account_claim = get_current_user_claim_from_session()
-    if not signed_account_claim:
-        return None
-
-    secret = current_app.config.get("CLAIM_SIGNER_KEY")
-    if not secret:
-        return abort(500)
-
-    try:
-        signed_claim = jwt.decode(
-            signed_account_claim, key=secret, algorithms='HS384')
-    except JOSEError as x:
-        return None
-
-    return signed_claim
+    return get_current_user_claim()
@@ -98,7 +98,8 @@ setup_params = dict(
         ],
         'chaoshub.scheduling': [
             'cron = chaoshubdashboard.experiment.scheduler.cron:CronScheduler',
-            'local = chaoshubdashboard.experiment.scheduler.local:LocalScheduler'
+            'local = chaoshubdashboard.experiment.scheduler.local:LocalScheduler',
+            'supervisor = chaoshubdashboard.experiment.scheduler.supervisor:SupervisorScheduler'
         ]
     },
     include_package_data=True,
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+import os
+import uuid
+
+from authlib.specs.oidc import UserInfo as ProfileInfo
+from flask import Flask
+import pytest
+import shortuuid
+
+from chaoshubdashboard.app import create_app
+from chaoshubdashboard.api.model import APIAccessToken
+from chaoshubdashboard.dashboard import create_user_account, \
+    set_user_profile, set_user_privacy, add_default_org_to_account, \
+    add_public_workspace_to_account
+from chaoshubdashboard.experiment.model import Experiment
+from chaoshubdashboard.model import db
+from chaoshubdashboard.settings import load_settings
+
+
+@pytest.fixture(scope="session")
+def app() -> Flask:
+    load_settings(os.path.join(os.path.dirname(__file__), "..", ".env.test"))
+    application = create_app(create_tables=False)
+
+    with application.app_context():
+        db.create_all(app=application)
+
+    return application
+
+
+@pytest.fixture(scope="session")
+def default_dataset(app: Flask):
+    with app.app_context():
+        profile_info = ProfileInfo(
+            sub="12345",
+            preferred_username="TheDude",
+            email="the@dude.com",
+            name="Jon Doe"
+        )
+
+        account = create_user_account(
+            {"id": "c1337e77-ccaf-41cf-a68c-d6e2026aef21"})
+        set_user_profile(account, profile_info)
+        set_user_privacy(account)
+        org = add_default_org_to_account(account, "TheDude")
+        workspace = add_public_workspace_to_account(account, org)
+        db.session.commit()
+
+        experiment = Experiment(
+            shared_ref=uuid.uuid4(),
+            account_id=account.id,
+            org_id=org.id,
+            workspace_id=workspace.id,
+            payload={"title": "Hello world"}
+        )
+        token = APIAccessToken(
+            name="my token", access_token="apitoken",
+            account_id=account.id, revoked=False, expires_in=3600,
+            issued_at=int(datetime.utcnow().timestamp()))
+        db.session.add(experiment)
+        db.session.add(token)
+        db.session.commit()
+
+        yield {
+            "experiment_id": shortuuid.encode(experiment.id),
+            "access_token": token.access_token
+        }
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+from flask import Flask
+
+from chaoshubdashboard.model import db
+from chaoshubdashboard.api.model import APIAccessToken
+from chaoshubdashboard.api.tracker import TokenUsageTracker
+from chaoshubdashboard.auth.model import AccessToken, Account
+
+ACCOUNT_ID = "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+
+
+def test_token_usages_are_written_in_batches(app: Flask, count_queries):
+    account = Account(
+        id=ACCOUNT_ID, oauth_provider="github", oauth_provider_sub="12345")
+    tokens = []
+    for i in range(3):
+        tokens.append(AccessToken(
+            name="token {}".format(i), access_token="token{}".format(i),
+            account_id=ACCOUNT_ID, issued_at=0))
+        tokens.append(APIAccessToken(
+            name="token {}".format(i), access_token="token{}".format(i),
+            account_id=ACCOUNT_ID, issued_at=0))
+
+    with app.app_context():
+        db.session.add(account)
+        db.session.add_all(tokens)
+        db.session.commit()
+
+        try:
+            api_tokens = APIAccessToken.query.all()
+            tracker = TokenUsageTracker(app, flush_interval=60)
+            for i in range(5):
+                for token in api_tokens:
+                    tracker.track(token, datetime(2018, 9, 9, 10, i))
+
+            count_queries.reset()
+            tracker.flush()
+            # a single update per table, whatever the number of usages
+            assert count_queries.count == 3
+            assert not tracker.usages
+
+            db.session.expire_all()
+            for token in APIAccessToken.query.all():
+                assert token.last_used_on == datetime(2018, 9, 9, 10, 4)
+            for token in AccessToken.query.all():
+                assert token.last_used_on == datetime(2018, 9, 9, 10, 4)
+        finally:
+            for token in tokens:
+                db.session.delete(db.session.merge(token))
+            db.session.delete(db.session.merge(account))
+            db.session.commit()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+import uuid
+
+from authlib.specs.rfc6750 import InvalidTokenError
+from flask import Flask
+import pytest
+
+from chaoshubdashboard.model import db
+from chaoshubdashboard.api.auth import revoke_access_token, set_access_token
+from chaoshubdashboard.api.model import APIAccessToken
+from chaoshubdashboard.api.validator import CachingBearerTokenValidator
+
+ACCOUNT_ID = "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+
+
+@pytest.fixture
+def api_token_id(app: Flask) -> uuid.UUID:
+    with app.app_context():
+        token = APIAccessToken(
+            name="cached", access_token="cachedtoken", account_id=ACCOUNT_ID,
+            revoked=False, issued_at=int(datetime.utcnow().timestamp()),
+            expires_in=3600)
+        db.session.add(token)
+        db.session.commit()
+        token_id = token.id
+        db.session.expunge_all()
+
+        try:
+            yield token_id
+        finally:
+            APIAccessToken.query.filter(
+                APIAccessToken.access_token=="cachedtoken").delete()
+            db.session.commit()
+            revoke_access_token("cachedtoken")
+
+
+def test_validated_tokens_are_cached(app: Flask, api_token_id: uuid.UUID,
+                                     count_queries):
+    validator = CachingBearerTokenValidator()
+    with app.app_context():
+        count_queries.reset()
+        token = validator("cachedtoken", None, None)
+        assert token.id == api_token_id
+        assert count_queries.count == 1
+
+        db.session.remove()
+
+        count_queries.reset()
+        token = validator("cachedtoken", None, None)
+        assert token.id == api_token_id
+        assert str(token.account_id) == ACCOUNT_ID
+        assert count_queries.count == 0
+
+
+def test_unknown_tokens_are_cached(app: Flask, count_queries):
+    validator = CachingBearerTokenValidator()
+    with app.app_context():
+        count_queries.reset()
+        with pytest.raises(InvalidTokenError):
+            validator("unknowntoken", None, None)
+        with pytest.raises(InvalidTokenError):
+            validator("unknowntoken", None, None)
+        assert count_queries.count == 1
+
+
+def test_revoked_tokens_are_evicted(app: Flask, api_token_id: uuid.UUID):
+    validator = CachingBearerTokenValidator()
+    with app.app_context():
+        assert validator("cachedtoken", None, None)
+
+        revoke_access_token("cachedtoken")
+
+        with pytest.raises(InvalidTokenError):
+            validator("cachedtoken", None, None)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict
+
+from flask import Flask
+import simplejson as json
+
+from chaoshubdashboard.dashboard.model import Activity
+from chaoshubdashboard.experiment.model import Execution
+
+
+def test_upload_executions_in_batch(app: Flask,
+                                    default_dataset: Dict[str, Any]):
+    client = app.test_client()
+    url = "/api/thedude/public/experiment/{}/executions:batch".format(
+        default_dataset["experiment_id"])
+    headers = {
+        "Accept": "application/json",
+        "Authorization": "Bearer {}".format(default_dataset["access_token"])
+    }
+
+    r = client.post(url, headers=headers, json=[
+        {"status": "completed"}, "boom", {"status": "failed"},
+        {"title": "no status"}, {"status": "completed", "run": "boom"},
+        {"status": "completed", "rollbacks": ["boom"]}])
+    assert r.status_code == 207
+    results = r.get_json()["results"]
+    assert [x["status"] for x in results] == [201, 400, 201, 400, 400, 400]
+    assert [x["index"] for x in results] == [0, 1, 2, 3, 4, 5]
+    assert results[0]["timestamp"] < results[2]["timestamp"]
+    assert [x["message"] for x in results if x["status"] == 400] == [
+        "Execution must be a JSON object.",
+        "Execution must have a status.",
+        "Execution field 'run' has the wrong type.",
+        "Execution field 'rollbacks' must only hold objects."
+    ]
+
+    with app.app_context():
+        timestamps = [results[0]["timestamp"], results[2]["timestamp"]]
+        assert Execution.query.filter(
+            Execution.timestamp.in_(timestamps)).count() == 2
+        assert Activity.query.filter(
+            Activity.kind=="execution",
+            Activity.timestamp.in_(timestamps)).count() == 2
+
+
+def test_upload_executions_as_ndjson(app: Flask,
+                                     default_dataset: Dict[str, Any]):
+    client = app.test_client()
+    url = "/api/thedude/public/experiment/{}/executions:batch".format(
+        default_dataset["experiment_id"])
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": "application/x-ndjson",
+        "Authorization": "Bearer {}".format(default_dataset["access_token"])
+    }
+
+    data = "\n".join([json.dumps({"status": "completed"})] * 3)
+    r = client.post(url, headers=headers, data=data)
+    assert r.status_code == 201
+    assert [x["status"] for x in r.get_json()["results"]] == [201] * 3
+
+
+def test_upload_executions_requires_a_list(app: Flask,
+                                           default_dataset: Dict[str, Any]):
+    client = app.test_client()
+    url = "/api/thedude/public/experiment/{}/executions:batch".format(
+        default_dataset["experiment_id"])
+    headers = {
+        "Accept": "application/json",
+        "Authorization": "Bearer {}".format(default_dataset["access_token"])
+    }
+
+    r = client.post(url, headers=headers, json={"status": "completed"})
+    assert r.status_code == 400
@@ -15,7 +15,8 @@ from chaoshubdashboard.auth import get_account_by_subject, \
     get_current_user_claim_from_session, register_account, \
     generate_nonce_key, get_oauth_remote_app, get_user_claim, \
     get_user_profile_info_from_oauth, handle_signin, handle_signup, \
-    generate_access_token, sign_value, unsign_value, revoke_access_token
+    generate_access_token, sign_value, unsign_value, revoke_access_token, \
+    get_current_user_claim
 from chaoshubdashboard.auth.model import AccessToken, Account, Client, ProviderToken
 
 
@@ -76,6 +77,82 @@ def test_get_user_with_session_id(app: Flask):
             assert str(user["id"]) == "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
 
 
+def test_current_user_claim_is_cached(app: Flask):
+    with app.app_context():
+        with app.test_request_context():
+            session["sid"] = "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+            claim = get_current_user_claim()
+            assert claim["id"] == "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+
+            with patch('chaoshubdashboard.auth.Account') as account:
+                cached_claim = get_current_user_claim()
+                assert account.query.filter.call_count == 0
+
+            assert cached_claim == claim
+
+
+def test_current_user_claim_without_session(app: Flask):
+    with app.app_context():
+        with app.test_request_context():
+            assert get_current_user_claim() is None
+
+
+def test_revoke_access_token_invalidates_cached_claim(app: Flask):
+    account_id = "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+    token_id = "127e7132-c3a8-430e-a6c2-220e3b5d7796"
+    with app.app_context():
+        with app.test_request_context():
+            session["sid"] = account_id
+            claim = get_current_user_claim()
+            assert claim["tokens"][0]["revoked"] is False
+
+            token = AccessToken.query.filter(AccessToken.id==token_id).first()
+            expires_in = token.expires_in
+            try:
+                revoke_access_token(account_id, token_id)
+
+                claim = get_current_user_claim()
+                assert claim["tokens"][0]["revoked"] is True
+            finally:
+                token.expires_in = expires_in
+                token.revoked = False
+                db.session.commit()
+
+
+def test_cached_claim_holds_no_secrets(app: Flask):
+    with app.app_context():
+        with app.test_request_context():
+            session["sid"] = "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+            claim = get_current_user_claim()
+            assert claim["client"]["client_id"]
+            assert "client_secret" not in claim["client"]
+            assert claim["tokens"]
+            for token in claim["tokens"]:
+                assert "access_token" not in token
+                assert "refresh_token" not in token
+
+
+def test_account_change_invalidates_claim_once_committed(app: Flask):
+    account_id = "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+    with app.app_context():
+        with app.test_request_context():
+            session["sid"] = account_id
+            claim = get_current_user_claim()
+            assert claim["active"] is True
+
+            account = Account.query.filter(Account.id==account_id).first()
+            try:
+                account.turn_inactive()
+                db.session.flush()
+                assert get_current_user_claim() == claim
+
+                db.session.commit()
+                assert get_current_user_claim()["active"] is False
+            finally:
+                account.turn_active()
+                db.session.commit()
+
+
 def test_register_user(app: Flask):
     with app.app_context():
         users = Account.query.all()
@@ -6,6 +6,8 @@ import dateparser
 from flask import Flask
 from flask_caching import Cache
 import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 from chaoshubdashboard.app import create_app
 from chaoshubdashboard.settings import load_settings
@@ -21,3 +23,27 @@ def app() -> Flask:
 @pytest.fixture(scope="session")
 def cache(app: Flask) -> Cache:
     return Cache(app, config={'CACHE_TYPE': 'simple'})
+
+
+class QueryCounter:
+    """
+    Count the SQL statements sent to any database engine
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+@pytest.fixture(scope="function")
+def count_queries() -> QueryCounter:
+    counter = QueryCounter()
+    event.listen(Engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, "before_cursor_execute", counter)
@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+import uuid
+
+from flask import Flask
+from flask_caching import Cache
+import shortuuid
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from chaoshubdashboard.lru import MISSING
+from chaoshubdashboard.model import db, parse_cursor
+from chaoshubdashboard.dashboard import compute_workspace_acls, \
+    compute_workspaces_acls, get_account_activities, get_activities_cursor, \
+    get_caller_org_activities, get_workspace, get_workspaces, \
+    lookup_collaborators, lookup_members, lookup_users, record_activity, \
+    setup_activity_recorder, shutdown_activity_recorder
+from chaoshubdashboard.dashboard import search
+from chaoshubdashboard.dashboard.resolver import get_name_resolver, \
+    NameResolver
+from chaoshubdashboard.dashboard.search import find_users, UserSearchIndex
+from chaoshubdashboard.dashboard.model import Activity, \
+    ActivityVisibility, Org, WorkpacesMembers, Workspace, WorkspaceType
+
+ACCOUNT_ID = "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+
+
+def test_compute_workspace_acls_of_owner(app: Flask):
+    with app.app_context():
+        personal = Workspace.get_by_id("b393802e-182d-464f-9747-1a642953fd1d")
+        public = Workspace.get_by_id("08faab84-2302-4f89-bc85-444bd43d1195")
+
+        acls = compute_workspaces_acls(ACCOUNT_ID, [personal, public])
+        assert acls[personal.id] == ["owner", "view", "write"]
+        assert acls[public.id] == ["owner", "view", "write"]
+
+        assert compute_workspace_acls(
+            ACCOUNT_ID, personal.org, personal) == acls[personal.id]
+
+
+def test_compute_workspace_acls_anonymously(app: Flask):
+    with app.app_context():
+        personal = Workspace.get_by_id("b393802e-182d-464f-9747-1a642953fd1d")
+        public = Workspace.get_by_id("08faab84-2302-4f89-bc85-444bd43d1195")
+
+        acls = compute_workspaces_acls(None, [personal, public])
+        assert acls[personal.id] == []
+        assert acls[public.id] == ["view"]
+
+
+def test_get_workspace(app: Flask):
+    with app.app_context():
+        w = get_workspace({"id": ACCOUNT_ID}, "thedude", "PUBLIC")
+        assert w["name"] == "Public"
+        assert w["context"]["acls"] == ["owner", "view", "write"]
+
+        assert get_workspace({"id": ACCOUNT_ID}, "thedude", "unknown") is None
+
+
+def test_get_workspaces_query_count_does_not_grow(app: Flask,
+                                                  count_queries):
+    with app.app_context():
+        db.session.expunge_all()
+        count_queries.reset()
+        workspaces = get_workspaces({"id": ACCOUNT_ID})
+        queries_count = count_queries.count
+        assert len(workspaces) == 2
+
+        org = Org.find_by_name("thedude")
+        added = []
+        for i in range(10):
+            w = Workspace(
+                name="Team{}".format(i), name_lower="team{}".format(i),
+                kind=WorkspaceType.protected, org_id=org.id)
+            m = WorkpacesMembers(
+                account_id=ACCOUNT_ID, workspace=w, is_owner=False)
+            db.session.add(w)
+            db.session.add(m)
+            added.append((w, m))
+        db.session.commit()
+
+        try:
+            db.session.expunge_all()
+            count_queries.reset()
+            workspaces = get_workspaces({"id": ACCOUNT_ID})
+            assert count_queries.count == queries_count
+            assert len(workspaces) == 12
+
+            for w in workspaces:
+                if w["type"] == "protected":
+                    assert w["context"]["acls"] == ["write"]
+        finally:
+            for w, m in added:
+                db.session.delete(db.session.merge(m))
+                db.session.delete(db.session.merge(w))
+            db.session.commit()
+
+
+def test_activities_are_enriched_in_bulk(app: Flask, count_queries):
+    with app.app_context():
+        org = Org.find_by_name("thedude")
+        workspace_ids = [
+            "b393802e-182d-464f-9747-1a642953fd1d",
+            "08faab84-2302-4f89-bc85-444bd43d1195"
+        ]
+        added = []
+        for i in range(12):
+            a = Activity(
+                account_id=ACCOUNT_ID, org_id=org.id,
+                workspace_id=workspace_ids[i % 2] if i % 3 else None,
+                kind="experiment", title="Activity {}".format(i),
+                visibility=ActivityVisibility.authenticated, timestamp=i)
+            db.session.add(a)
+            added.append(a)
+        db.session.commit()
+
+        try:
+            db.session.expunge_all()
+            count_queries.reset()
+            activities = get_account_activities(ACCOUNT_ID, {"id": ACCOUNT_ID})
+            assert count_queries.count == 3
+            assert len(activities) == 10
+
+            for activity in activities:
+                assert activity["org"] == {"name": "TheDude"}
+                if activity["workspace_id"]:
+                    assert activity["workspace"]["name"] in (
+                        "Personal", "Public")
+                else:
+                    assert "workspace" not in activity
+
+            org = Org.find_by_name("thedude")
+            count_queries.reset()
+            activities = get_caller_org_activities(org, {"org_owner": True})
+            assert count_queries.count == 2
+            assert len(activities) == 10
+            assert all(a["org"] == {"name": "TheDude"} for a in activities)
+        finally:
+            for a in added:
+                db.session.delete(db.session.merge(a))
+            db.session.commit()
+
+
+def test_record_activity_stores_display_names(app: Flask, count_queries):
+    with app.app_context():
+        org = Org.find_by_name("thedude")
+        act = record_activity({
+            "title": "Hello",
+            "account_id": shortuuid.encode(uuid.UUID(ACCOUNT_ID)),
+            "org_id": shortuuid.encode(org.id),
+            "workspace_id": shortuuid.encode(
+                uuid.UUID("08faab84-2302-4f89-bc85-444bd43d1195")),
+            "type": "experiment",
+            "visibility": ActivityVisibility.authenticated,
+            "timestamp": 1000
+        })
+
+        try:
+            assert act.org_name == "TheDude"
+            assert act.workspace_name == "Public"
+
+            db.session.expunge_all()
+            count_queries.reset()
+            activities = get_account_activities(ACCOUNT_ID, {"id": ACCOUNT_ID})
+            assert count_queries.count == 1
+            assert activities[0]["org"] == {"name": "TheDude"}
+            assert activities[0]["workspace"] == {"name": "Public"}
+        finally:
+            db.session.delete(db.session.merge(act))
+            db.session.commit()
+
+
+def test_activities_can_be_paginated(app: Flask):
+    with app.app_context():
+        added = []
+        for i in range(15):
+            # activities recorded within the same millisecond share their
+            # timestamp
+            a = Activity(
+                account_id=ACCOUNT_ID, kind="experiment",
+                title="Activity {}".format(i), timestamp=i // 4,
+                visibility=ActivityVisibility.authenticated)
+            db.session.add(a)
+            added.append(a)
+        db.session.commit()
+
+        try:
+            caller = {"id": ACCOUNT_ID}
+            first = get_account_activities(ACCOUNT_ID, caller)
+            assert len(first) == 10
+            cursor = get_activities_cursor(first)
+            assert cursor == "{}.{}".format(
+                first[-1]["timestamp"], first[-1]["id"])
+
+            second = get_account_activities(
+                ACCOUNT_ID, caller, before=parse_cursor(cursor))
+            assert len(second) == 5
+            assert get_activities_cursor(second) is None
+
+            activities = first + second
+            assert [a["timestamp"] for a in activities] == \
+                sorted((i // 4 for i in range(15)), reverse=True)
+            assert {a["id"] for a in activities} == \
+                {shortuuid.encode(a.id) for a in added}
+        finally:
+            for a in added:
+                db.session.delete(a)
+            db.session.commit()
+
+
+def test_activities_are_recorded_in_batches(app: Flask):
+    app.config["ACTIVITY_QUEUE_ENABLED"] = True
+    app.config["ACTIVITY_QUEUE_BATCH_SIZE"] = 5
+    app.config["ACTIVITY_QUEUE_FLUSH_INTERVAL"] = 30
+    try:
+        setup_activity_recorder(app)
+
+        with app.app_context():
+            for i in range(3):
+                record_activity({
+                    "title": "Queued {}".format(i),
+                    "account_id": shortuuid.encode(uuid.UUID(ACCOUNT_ID)),
+                    "type": "experiment",
+                    "visibility": ActivityVisibility.authenticated
+                })
+            assert Activity.query.filter(
+                Activity.title.like("Queued %")).count() == 0
+
+        shutdown_activity_recorder()
+
+        with app.app_context():
+            activities = Activity.query.filter(
+                Activity.title.like("Queued %")).all()
+            assert len(activities) == 3
+            assert all(a.timestamp for a in activities)
+            for a in activities:
+                db.session.delete(a)
+            db.session.commit()
+    finally:
+        shutdown_activity_recorder()
+        app.config["ACTIVITY_QUEUE_ENABLED"] = False
+
+
+def test_lookup_users(app: Flask):
+    with app.app_context():
+        users = lookup_users("dud")
+        assert users == [{
+            "id": shortuuid.encode(uuid.UUID(ACCOUNT_ID)),
+            "name": "Jon Doe",
+            "username": "TheDude"
+        }]
+
+        assert lookup_users("jon d") == users
+        assert lookup_users("nobody") == []
+        assert lookup_users("   ") == []
+
+
+def test_lookup_members_and_collaborators(app: Flask):
+    with app.app_context():
+        org = Org.find_by_name("thedude")
+        members = lookup_members(org, "DUDE")
+        assert [m["id"] for m in members] == [
+            shortuuid.encode(uuid.UUID(ACCOUNT_ID))]
+
+        workspace = Workspace.get_by_id("08faab84-2302-4f89-bc85-444bd43d1195")
+        assert lookup_collaborators(workspace, "doe") == members
+
+        other = Org(name="Other", name_lower="other")
+        db.session.add(other)
+        db.session.commit()
+        try:
+            assert lookup_members(other, "dude") == []
+        finally:
+            db.session.delete(other)
+            db.session.commit()
+
+
+def test_lookup_members_reads_names_only(app: Flask, monkeypatch):
+    statements = []
+
+    def collect(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        org = Org.find_by_name("thedude")
+        expected = [{
+            "id": shortuuid.encode(uuid.UUID(ACCOUNT_ID)),
+            "joined": "2018-04-01T18:11:48.681677Z",
+            "org": {"name": "TheDude"},
+            "profile": {
+                "id": shortuuid.encode(
+                    uuid.UUID("9c5c0aff-4cd2-482c-a25b-7611d6f4496a")),
+                "username": "TheDude",
+                "name": "Jon Doe"
+            }
+        }]
+
+        lookup_members(org, "dude")
+        event.listen(Engine, "before_cursor_execute", collect)
+        try:
+            assert lookup_members(org, "dude") == expected
+            assert len(statements) == 2
+
+            del statements[:]
+            monkeypatch.setattr(search, "_index", None)
+            assert lookup_members(org, "dude") == expected
+            assert len(statements) == 1
+            assert "JOIN orgs_members" in statements[0]
+        finally:
+            event.remove(Engine, "before_cursor_execute", collect)
+
+        assert not any("details" in s for s in statements)
+
+
+def test_lookup_users_without_search_index(app: Flask, monkeypatch):
+    monkeypatch.setattr(search, "_index", None)
+    with app.app_context():
+        assert find_users("dude") == [
+            (uuid.UUID(ACCOUNT_ID), "TheDude", "Jon Doe")]
+        assert find_users("100%") == []
+
+
+def test_user_search_index_ranks_prefixes_first():
+    jane, janet, dejan = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    index = UserSearchIndex()
+    index.load([(dejan, "dejan", "Dejan Petrovic"), (jane, "jane", None)])
+    index.add(janet, "janet", "Janet Smith")
+
+    assert [m[0] for m in index.search("jan")] == [jane, janet, dejan]
+    assert [m[0] for m in index.search("ja", count=2)] == [jane, janet]
+    assert [m[0] for m in index.search("smith")] == [janet]
+    assert index.search("jan", within={dejan}) == [
+        (dejan, "dejan", "Dejan Petrovic")]
+
+    index.add(janet, "jsmith", "J. Smith")
+    assert [m[0] for m in index.search("jan")] == [jane, dejan]
+
+    index.remove(jane)
+    assert [m[0] for m in index.search("jan")] == [dejan]
+    assert len(index) == 2
+
+
+def test_name_resolver_caches_identifiers(app: Flask, count_queries):
+    resolver = NameResolver()
+    with app.app_context():
+        count_queries.reset()
+        o = resolver.find_org("thedude")
+        w = resolver.find_workspace("TheDude", "Public")
+        assert o.name == "TheDude"
+        assert w.name == "Public"
+        assert w.org is o
+        assert count_queries.count == 2
+        assert len(resolver.local) == 2
+
+        db.session.expunge_all()
+        count_queries.reset()
+        assert resolver.find_workspace("thedude", "public").name == "Public"
+        assert count_queries.count == 1
+
+        assert resolver.find_org("unknown") is None
+        assert resolver.find_workspace("thedude", "unknown") is None
+        assert resolver.find_workspace("unknown", "public") is None
+        assert len(resolver.local) == 2
+
+
+def test_name_resolver_generation_is_bumped_on_rename(app: Flask):
+    resolver = get_name_resolver()
+    with app.app_context():
+        w = resolver.find_workspace("TheDude", "Public")
+        generation = resolver.generation()
+        try:
+            w.name = "Shared"
+            w.name_lower = "shared"
+            db.session.commit()
+            assert resolver.generation() == generation + 1
+            assert len(resolver.local) == 0
+            assert resolver.find_workspace("TheDude", "Public") is None
+            assert resolver.find_workspace("TheDude", "Shared") is w
+        finally:
+            w.name = "Public"
+            w.name_lower = "public"
+            db.session.commit()
+
+        # other changes keep the resolved names
+        generation = resolver.generation()
+        w.settings = dict(w.settings)
+        db.session.commit()
+        assert resolver.generation() == generation
+
+
+def test_name_resolver_shares_names_across_processes(app: Flask,
+                                                     cache: Cache):
+    resolver = NameResolver(shared=cache)
+    other = NameResolver(shared=cache)
+    with app.app_context():
+        cache.clear()
+        w = resolver.find_workspace("TheDude", "Public")
+        key = ("workspace", "thedude", "public")
+        assert other.get(key) == (w.org_id, w.id)
+
+        resolver.bump()
+        assert other.generation() == 1
+        assert other.get(key) is MISSING
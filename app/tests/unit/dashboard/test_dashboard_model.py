@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from flask import Flask
+import shortuuid
+
+from chaoshubdashboard.model import db, get_request_memo_stats
+from chaoshubdashboard.dashboard.model import evict_cached_profile, Org, \
+    UserInfo, Workspace
+
+ACCOUNT_ID = "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+PUBLIC_WORKSPACE_ID = "08faab84-2302-4f89-bc85-444bd43d1195"
+
+
+def test_org_lookups_are_memoized_during_request(app: Flask,
+                                                 count_queries):
+    with app.test_request_context():
+        count_queries.reset()
+        org = Org.find_by_name("thedude")
+        assert Org.find_by_name("thedude") is org
+        assert Org.get_by_id(org.id) is org
+        assert Org.get_by_id(org.id) is org
+        assert org.is_owner(ACCOUNT_ID) is True
+        assert org.is_owner(ACCOUNT_ID) is True
+        assert org.is_member(ACCOUNT_ID) is True
+        assert org.is_member(ACCOUNT_ID) is True
+
+        assert count_queries.count == 4
+        assert get_request_memo_stats() == {"hits": 4, "misses": 4}
+
+
+def test_workspace_lookups_are_memoized_during_request(app: Flask,
+                                                       count_queries):
+    with app.test_request_context():
+        count_queries.reset()
+        w = Workspace.get_by_id("08faab84-2302-4f89-bc85-444bd43d1195")
+        assert Workspace.get_by_id(
+            "08faab84-2302-4f89-bc85-444bd43d1195") is w
+        assert w.is_owner(ACCOUNT_ID) is True
+        assert w.is_owner(ACCOUNT_ID) is True
+        assert w.is_collaborator(ACCOUNT_ID) is True
+        assert w.is_collaborator(ACCOUNT_ID) is True
+
+        assert count_queries.count == 3
+        assert get_request_memo_stats() == {"hits": 3, "misses": 3}
+
+
+def test_memo_is_cleared_on_flush(app: Flask):
+    with app.test_request_context():
+        w = Workspace.get_by_id("08faab84-2302-4f89-bc85-444bd43d1195")
+        assert w.is_owner(ACCOUNT_ID) is True
+        w.make_collaborator(ACCOUNT_ID)
+        assert w.is_owner(ACCOUNT_ID) is True
+
+        try:
+            db.session.flush()
+            assert w.is_owner(ACCOUNT_ID) is False
+        finally:
+            db.session.rollback()
+
+
+def test_lookups_are_not_memoized_outside_request(app: Flask,
+                                                  count_queries):
+    with app.app_context():
+        count_queries.reset()
+        Org.find_by_name("thedude")
+        Org.find_by_name("thedude")
+
+        assert count_queries.count == 2
+        assert get_request_memo_stats() == {"hits": 0, "misses": 0}
+
+
+def test_public_profile_is_decrypted_once(app: Flask, count_queries):
+    with app.app_context():
+        evict_cached_profile(ACCOUNT_ID)
+        info = UserInfo.get_for_account(ACCOUNT_ID)
+        expected = {
+            "id": shortuuid.encode(info.id),
+            "username": "TheDude",
+            "name": "Jon Doe",
+            "picture": None
+        }
+
+        count_queries.reset()
+        assert info.to_public_dict() == expected
+        # the encrypted profile is only loaded now
+        assert count_queries.count == 1
+
+        db.session.expunge_all()
+        info = UserInfo.get_for_account(ACCOUNT_ID)
+        count_queries.reset()
+        assert info.to_public_dict() == expected
+        assert count_queries.count == 0
+
+        evict_cached_profile(ACCOUNT_ID)
+        assert info.to_public_dict() == expected
+        assert count_queries.count == 1
+
+
+def test_public_profile_is_read_again_once_updated(app: Flask):
+    with app.app_context():
+        info = UserInfo.get_for_account(ACCOUNT_ID)
+        assert info.to_public_dict()["name"] == "Jon Doe"
+
+        last_updated = info.last_updated
+        profile = info.profile
+        try:
+            info.profile = dict(profile, name="Walter")
+            db.session.commit()
+            assert info.last_updated != last_updated
+            assert info.to_public_dict()["name"] == "Walter"
+        finally:
+            info.profile = profile
+            info.last_updated = last_updated
+            db.session.commit()
+            evict_cached_profile(ACCOUNT_ID)
+
+
+def test_workspace_is_found_by_name_within_org(app: Flask, count_queries):
+    with app.app_context():
+        org = Org.find_by_name("thedude")
+
+        count_queries.reset()
+        w = org.find_workspace_by_name("PUBLIC")
+        assert str(w.id) == PUBLIC_WORKSPACE_ID
+        assert org.find_workspace_by_name("unknown") is None
+        assert count_queries.count == 2
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+import uuid
+
+from flask import Flask
+import pytest
+import shortuuid
+
+from chaoshubdashboard.dashboard.model import UserAccount
+from chaoshubdashboard.model import db
+
+ACCOUNT_ID = "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+USER_CLAIM = {
+    "id": ACCOUNT_ID,
+    "short_id": shortuuid.encode(uuid.UUID(ACCOUNT_ID))
+}
+
+# number of statements each endpoint may send, once the caches are warm
+ENDPOINTS = [
+    ("/dashboard", 6),
+    ("/TheDude/dashboard", 8),
+    ("/TheDude/settings/general", 6),
+    ("/TheDude/settings/members", 6),
+    ("/TheDude/lookup/member?q=dude", 4),
+    ("/TheDude/Public/dashboard", 10),
+    ("/TheDude/Public/settings/general", 7),
+    ("/TheDude/Public/settings/collaborators", 8),
+    ("/TheDude/Public/lookup/collaborator?q=dude", 4)
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def other_services_tables(app: Flask):
+    # the dashboards also read experiments and executions
+    with app.app_context():
+        db.create_all(bind='experiment_service')
+
+
+@pytest.mark.parametrize("url,expected", ENDPOINTS)
+@patch('chaoshubdashboard.utils.get_current_user_claim', autospec=False)
+def test_endpoint_query_count(get_current_user_claim, url: str,
+                              expected: int, app: Flask, count_queries):
+    get_current_user_claim.return_value = USER_CLAIM
+    client = app.test_client()
+    headers = {"Accept": "application/json"}
+
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200
+
+    count_queries.reset()
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200
+    assert count_queries.count <= expected
+
+
+def test_account_badge_is_a_single_query(app: Flask, count_queries):
+    with app.app_context():
+        UserAccount.get_by_id(ACCOUNT_ID).to_short_dict()
+
+        count_queries.reset()
+        account = UserAccount.get_by_id(ACCOUNT_ID)
+        account.to_short_dict()
+        assert count_queries.count == 1
+
+
+def test_account_memberships_are_loaded_on_demand(app: Flask, count_queries):
+    with app.app_context():
+        account = UserAccount.get_by_id(ACCOUNT_ID, with_memberships=True)
+
+        count_queries.reset()
+        assert len(account.orgs) == 1
+        assert len(account.workspaces) == 2
+        assert count_queries.count == 0
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import os
+import uuid
+
+from flask import Flask
+import pytest
+
+from chaoshubdashboard.app import create_app
+from chaoshubdashboard.experiment.model import Execution, Experiment
+from chaoshubdashboard.model import db
+from chaoshubdashboard.settings import load_settings
+
+ACCOUNT_ID = "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+ORG_ID = uuid.UUID("9bcb0a3e-ed4d-4fa3-a4d6-cfb4a4f8f3a8")
+WORKSPACE_ID = uuid.UUID("08faab84-2302-4f89-bc85-444bd43d1195")
+
+
+@pytest.fixture(scope="session")
+def app(tmpdir_factory) -> Flask:
+    load_settings(os.path.join(os.path.dirname(__file__), "..", ".env.test"))
+
+    # schedulers write from their own threads, which can't share the single
+    # connection of an in-memory database
+    db_host = os.environ["DB_HOST"]
+    os.environ["DB_HOST"] = "sqlite:///{}".format(
+        tmpdir_factory.mktemp("db").join("experiment.db"))
+    try:
+        application = create_app(create_tables=False)
+    finally:
+        os.environ["DB_HOST"] = db_host
+
+    with application.app_context():
+        db.create_all(app=application)
+
+    return application
+
+
+@pytest.fixture
+def experiment(app: Flask) -> uuid.UUID:
+    with app.app_context():
+        experiment = Experiment(
+            shared_ref=uuid.uuid4(), account_id=ACCOUNT_ID, org_id=ORG_ID,
+            workspace_id=WORKSPACE_ID, payload={"title": "Hello world"})
+        for timestamp in range(1000, 1025):
+            experiment.executions.append(Execution(
+                account_id=ACCOUNT_ID, org_id=ORG_ID,
+                workspace_id=WORKSPACE_ID, timestamp=timestamp,
+                status="completed", payload={"status": "completed"}))
+        db.session.add(experiment)
+        db.session.commit()
+        experiment_id = experiment.id
+
+        try:
+            yield experiment_id
+        finally:
+            db.session.delete(experiment)
+            db.session.commit()
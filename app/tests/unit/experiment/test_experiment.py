@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+import uuid
+
+from flask import Flask
+import pytest
+import shortuuid
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from chaoshubdashboard.model import db
+from chaoshubdashboard import experiment as experiment_service
+from chaoshubdashboard.experiment import get_experiment_executions, \
+    migrate_execution_journals, search_experiments, store_executions, \
+    store_experiment
+from chaoshubdashboard.experiment.model import Execution, ExecutionJournal, \
+    Experiment
+
+ACCOUNT_ID = "c1337e77-ccaf-41cf-a68c-d6e2026aef21"
+
+
+def test_executions_are_paginated(app: Flask, experiment: uuid.UUID):
+    with app.app_context():
+        runs = get_experiment_executions(experiment, "full", limit=10)
+        assert [r["timestamp"] for r in runs] == list(range(1024, 1014, -1))
+        assert runs[0]["result"] == {"status": "completed"}
+
+        runs = get_experiment_executions(
+            experiment, "full", before=runs[-1]["timestamp"], limit=10)
+        assert [r["timestamp"] for r in runs] == list(range(1014, 1004, -1))
+
+        runs = get_experiment_executions(
+            experiment, "full", before=runs[-1]["timestamp"], limit=10)
+        assert [r["timestamp"] for r in runs] == list(range(1004, 999, -1))
+
+
+def test_execution_timestamps_are_unique_per_experiment(
+        app: Flask, experiment: uuid.UUID):
+    with app.app_context():
+        last = Execution.query.filter(
+            Execution.experiment_id==experiment, Execution.timestamp==1024).\
+            one()
+        db.session.add(Execution(
+            account_id=last.account_id, org_id=last.org_id,
+            workspace_id=last.workspace_id, experiment_id=experiment,
+            timestamp=1024, status="completed"))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+
+def test_executions_payload_is_only_read_when_needed(app: Flask,
+                                                     experiment: uuid.UUID):
+    statements = []
+
+    def collect(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", collect)
+    try:
+        with app.app_context():
+            runs = get_experiment_executions(
+                experiment, "full", limit=5, fields=["timestamp", "status"])
+            assert runs[0] == {"timestamp": 1024, "status": "completed"}
+            assert "JOIN execution_journal" not in statements[-1]
+
+            runs = get_experiment_executions(experiment, "status", limit=5)
+            assert "result" not in runs[0]
+            assert "JOIN execution_journal" not in statements[-1]
+
+            count = len(statements)
+            get_experiment_executions(experiment, "full", limit=5)
+            assert len(statements) == count + 1
+            assert "JOIN execution_journal" in statements[-1]
+    finally:
+        event.remove(Engine, "before_cursor_execute", collect)
+
+
+def test_stored_executions_follow_the_most_recent_one(
+        app: Flask, experiment: uuid.UUID, monkeypatch):
+    next_timestamp = experiment_service.next_execution_timestamp
+    starts = []
+
+    def racing_next_timestamp(experiment_id: uuid.UUID) -> int:
+        # executions stored at the same time took the first timestamps
+        start = 1020 if not starts else next_timestamp(experiment_id)
+        starts.append(start)
+        return start
+
+    monkeypatch.setattr(
+        experiment_service, "next_execution_timestamp",
+        racing_next_timestamp)
+
+    with app.app_context():
+        org = shortuuid.encode(uuid.uuid4())
+        workspace = shortuuid.encode(uuid.uuid4())
+        runs = store_executions(
+            {"id": ACCOUNT_ID}, org, workspace, shortuuid.encode(experiment),
+            [{"status": "completed"}, {"status": "failed"}])
+
+        assert len(starts) == 2
+        assert [r["timestamp"] for r in runs] == [starts[1], starts[1] + 1]
+        assert starts[1] > 1024
+        assert Execution.query.filter(
+            Execution.experiment_id==experiment).count() == 27
+
+
+def test_stored_executions_give_up_after_some_attempts(
+        app: Flask, experiment: uuid.UUID, monkeypatch):
+    monkeypatch.setattr(
+        experiment_service, "next_execution_timestamp", lambda e: 1020)
+
+    with app.app_context():
+        with pytest.raises(IntegrityError):
+            store_executions(
+                {"id": ACCOUNT_ID}, shortuuid.encode(uuid.uuid4()),
+                shortuuid.encode(uuid.uuid4()), shortuuid.encode(experiment),
+                [{"status": "completed"}])
+        assert Execution.query.filter(
+            Execution.experiment_id==experiment).count() == 25
+
+
+def test_journal_stored_meanwhile_is_reused(app: Flask, monkeypatch):
+    payload = {"status": "failed", "run": []}
+    with app.app_context():
+        stored = ExecutionJournal.store(payload)
+        db.session.commit()
+        journal_id = stored.id
+        db.session.expunge_all()
+
+        query = ExecutionJournal.query
+        lookups = []
+
+        class RacingQuery:
+            def get(self, ident: str) -> ExecutionJournal:
+                lookups.append(ident)
+                # the journal was stored by another upload after we looked
+                # it up
+                return None if len(lookups) == 1 else query.get(ident)
+
+        monkeypatch.setattr(ExecutionJournal, "query", RacingQuery())
+        journal = ExecutionJournal.store(payload)
+        db.session.commit()
+
+        assert lookups == [journal_id, journal_id]
+        assert journal.id == journal_id
+        assert journal.load() == payload
+
+        db.session.delete(journal)
+        db.session.commit()
+
+
+def test_migrate_execution_journals(app: Flask, experiment: uuid.UUID):
+    with app.app_context():
+        executions = Execution.query.filter(
+            Execution.experiment_id==experiment).all()
+        for execution in executions:
+            execution.journal_id = None
+            execution.legacy_payload = {"status": "completed"}
+        db.session.commit()
+
+        assert migrate_execution_journals(batch_size=10) == 25
+        db.session.expire_all()
+
+        executions = Execution.query.filter(
+            Execution.experiment_id==experiment).all()
+        # all the journals are identical and thus stored once
+        assert len({e.journal_id for e in executions}) == 1
+        for execution in executions:
+            assert execution.legacy_payload is None
+            assert execution.payload == {"status": "completed"}
+
+        assert migrate_execution_journals() == 0
+
+
+def test_search_experiments_by_title_and_tags(app: Flask):
+    user_claim = {"id": uuid.uuid4()}
+    org = shortuuid.uuid()
+    workspace = shortuuid.uuid()
+
+    with app.app_context():
+        stored = [
+            store_experiment(user_claim, org, workspace, {
+                "title": "Kill a pod", "tags": ["kubernetes", "pod"]}),
+            store_experiment(user_claim, org, workspace, {
+                "title": "Drain a node", "tags": ["kubernetes"]}),
+            store_experiment(user_claim, org, workspace, {
+                "title": "Slow network 100%"}),
+        ]
+        try:
+            experiment = Experiment.get_by_id(stored[0]["id"])
+            assert experiment.title == "Kill a pod"
+            assert experiment.tags == ["kubernetes", "pod"]
+
+            found = search_experiments(user_claim, terms="A POD")
+            assert [e["id"] for e in found] == [stored[0]["id"]]
+
+            found = search_experiments(user_claim, tags=["kubernetes"])
+            assert sorted(e["id"] for e in found) == \
+                sorted(e["id"] for e in stored[:2])
+
+            found = search_experiments(
+                user_claim, terms="node", tags=["kubernetes"])
+            assert [e["id"] for e in found] == [stored[1]["id"]]
+
+            assert search_experiments(user_claim, terms="node", tags=["pod"]) \
+                == []
+            assert search_experiments(
+                {"id": uuid.uuid4()}, tags=["kubernetes"]) == []
+            assert len(search_experiments(user_claim, tags=["kubernetes"],
+                                          limit=1)) == 1
+        finally:
+            Experiment.query.filter(
+                Experiment.id.in_([
+                    shortuuid.decode(e["id"]) for e in stored])).delete(
+                        synchronize_session=False)
+            db.session.commit()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import gzip
+import uuid
+
+from flask import Flask
+import simplejson as json
+
+from chaoshubdashboard.experiment.export import export_workspace
+
+WORKSPACE_ID = uuid.UUID("08faab84-2302-4f89-bc85-444bd43d1195")
+
+
+def test_export_workspace(app: Flask, experiment: uuid.UUID):
+    with app.app_context():
+        data = b"".join(export_workspace(WORKSPACE_ID))
+
+    records = [
+        json.loads(line) for line in
+        gzip.decompress(data).decode('utf-8').splitlines()]
+    assert len(records) == 26
+    assert records[0]["type"] == "experiment"
+    assert records[0]["title"] == "Hello world"
+    assert [r["timestamp"] for r in records[1:]] == list(range(1000, 1025))
+    assert all(r["status"] == "completed" for r in records[1:])
+
+
+def test_export_workspace_since(app: Flask, experiment: uuid.UUID):
+    with app.app_context():
+        data = b"".join(export_workspace(WORKSPACE_ID, since=1023))
+
+    records = [
+        json.loads(line) for line in
+        gzip.decompress(data).decode('utf-8').splitlines()]
+    # the experiment was updated since then but only two executions were run
+    assert [r["type"] for r in records] == [
+        "experiment", "execution", "execution"]
+    assert [r["timestamp"] for r in records[1:]] == [1023, 1024]
+
+
+def test_export_unknown_workspace(app: Flask):
+    with app.app_context():
+        data = b"".join(export_workspace(uuid.uuid4()))
+
+    assert gzip.decompress(data) == b""
@@ -0,0 +1,704 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+import os
+import stat
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from flask import Flask
+import pytest
+import shortuuid
+
+from chaoshubdashboard.auth.model import AccessToken, Account
+from chaoshubdashboard.experiment.model import Execution, \
+    LocalScheduleJob, Schedule, ScheduleStatus
+from chaoshubdashboard.experiment.scheduler.local import LocalScheduler
+from chaoshubdashboard.experiment.scheduler.output import ExecutionOutput, \
+    pump_output, RotatingLog, tail_file
+from chaoshubdashboard.experiment.scheduler.progress import \
+    get_schedule_progress_updater, ScheduleProgressUpdater, \
+    setup_schedule_progress_updater
+from chaoshubdashboard.experiment.scheduler.supervisor import \
+    SupervisorScheduler
+from chaoshubdashboard.experiment.scheduler.warm import WarmPool
+from chaoshubdashboard.model import db
+
+TOKEN_ACCOUNT_ID = uuid.UUID("5a1e0d3c-5a55-4a3e-9d8c-2b7f0e6c1d42")
+TOKEN_ID = uuid.UUID("c0ffee00-4b1d-4c0f-9a6e-0d5e7a11ab1e")
+
+# stands for the chaostoolkit CLI: logs the experiment's title and how many
+# runs were going on at the same time, then writes a journal which starts
+# with the title
+FAKE_CLI = """#!{python}
+import json, os, sys, time
+running = os.path.join({log_dir!r}, "running")
+os.makedirs(running, exist_ok=True)
+marker = os.path.join(running, str(os.getpid()))
+open(marker, "w").close()
+concurrent = len(os.listdir(running))
+with open(sys.argv[-1]) as f:
+    title = json.load(f)["title"]
+time.sleep({duration})
+os.remove(marker)
+with open(os.path.join({log_dir!r}, "runs.log"), "a") as f:
+    f.write("{{}} {{}}\\n".format(title, concurrent))
+with open(sys.argv[sys.argv.index("--journal-path") + 1], "w") as f:
+    json.dump({{"start": title, "status": "completed"}}, f)
+"""
+
+# stands for a verbose chaostoolkit CLI, writing far more than a pipe holds
+# to both its stdout and stderr
+VERBOSE_SCRIPT = """
+import sys
+for i in range(20000):
+    sys.stdout.write("out {}\\n".format(i))
+    sys.stderr.write("err {}\\n".format(i))
+sys.stdout.write("done")
+"""
+
+
+# a genuine experiment, run in-process by the warm runner
+EXPERIMENT = {
+    "title": "the dude abides",
+    "description": "n/a",
+    "method": [
+        {
+            "type": "probe",
+            "name": "rug-is-there",
+            "provider": {
+                "type": "python",
+                "module": "os.path",
+                "func": "exists",
+                "arguments": {"path": "."}
+            }
+        }
+    ]
+}
+
+
+def write_fake_cli(log_dir: str, duration: float) -> str:
+    path = os.path.join(log_dir, "chaos")
+    with open(path, "w") as f:
+        f.write(FAKE_CLI.format(
+            python=sys.executable, log_dir=log_dir, duration=duration))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+@pytest.fixture
+def fake_cli(tmpdir) -> str:
+    return write_fake_cli(str(tmpdir), 0.2)
+
+
+@pytest.fixture
+def slow_cli(tmpdir) -> str:
+    return write_fake_cli(str(tmpdir), 30)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def access_token(app: Flask):
+    """
+    The token scheduled executions run with, looked up when they start
+    """
+    with app.app_context():
+        account = Account(id=TOKEN_ACCOUNT_ID, joined_on=datetime.utcnow())
+        account.access_tokens.append(AccessToken(
+            id=TOKEN_ID, name="scheduler", access_token="xyz",
+            token_type="bearer"))
+        db.session.add(account)
+        db.session.commit()
+
+    try:
+        yield
+    finally:
+        with app.app_context():
+            db.session.delete(Account.query.get(TOKEN_ACCOUNT_ID))
+            db.session.commit()
+
+
+@pytest.fixture(autouse=True)
+def clear_jobs(app: Flask):
+    yield
+    with app.app_context():
+        LocalScheduleJob.query.delete()
+        Schedule.query.delete()
+        db.session.commit()
+
+
+def make_schedule(app: Flask, experiment_id: uuid.UUID,
+                  scheduled: datetime) -> uuid.UUID:
+    with app.app_context():
+        s = Schedule(
+            account_id=uuid.uuid4(), org_id=uuid.uuid4(),
+            workspace_id=uuid.uuid4(), experiment_id=experiment_id,
+            token_id=uuid.uuid4(), scheduled=scheduled)
+        db.session.add(s)
+        db.session.commit()
+        return s.id
+
+
+def load_schedule(app: Flask, schedule_id: uuid.UUID) -> dict:
+    with app.app_context():
+        try:
+            return Schedule.query.get(schedule_id).to_dict()
+        finally:
+            db.session.remove()
+
+
+def make_context(title: str, scheduled: datetime,
+                 org_name: str = "TheDude") -> dict:
+    return {
+        "id": shortuuid.encode(uuid.uuid4()),
+        "scheduled": "{}Z".format(scheduled.isoformat()),
+        "hub_url": "http://localhost",
+        "token": "xyz",
+        "token_id": shortuuid.encode(TOKEN_ID),
+        "org": {"name": org_name},
+        "workspace": {"name": "Public"},
+        "experiment": {"payload": {"title": title}}
+    }
+
+
+def read_runs(fake_cli: str, expected: int, timeout: float = 10) -> list:
+    path = os.path.join(os.path.dirname(fake_cli), "runs.log")
+    deadline = time.monotonic() + timeout
+    runs = []
+    while time.monotonic() < deadline:
+        if os.path.exists(path):
+            with open(path) as f:
+                runs = [line.split() for line in f.read().splitlines()]
+            if len(runs) >= expected:
+                break
+        time.sleep(0.05)
+    return runs
+
+
+def job_statuses(app: Flask, expected: list, timeout: float = 10) -> list:
+    deadline = time.monotonic() + timeout
+    while True:
+        with app.app_context():
+            try:
+                statuses = sorted(
+                    s.value for (s,) in db.session.query(
+                        LocalScheduleJob.status))
+            finally:
+                db.session.remove()
+        if statuses == expected or time.monotonic() > deadline:
+            return statuses
+        time.sleep(0.05)
+
+
+def supervised_status(scheduler: SupervisorScheduler, id: str,
+                      expected: str, timeout: float = 10) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        status = scheduler.status(id)
+        if status["status"] == expected or time.monotonic() > deadline:
+            return status
+        time.sleep(0.05)
+
+
+def test_workers_bound_concurrent_executions(app: Flask, fake_cli: str):
+    scheduler = LocalScheduler(chaostoolkit_cli_path=fake_cli, workers=2)
+    scheduler.start(app)
+    try:
+        with app.app_context():
+            now = datetime.utcnow()
+            for i in range(5):
+                scheduler.schedule(make_context("run{}".format(i), now))
+
+        runs = read_runs(fake_cli, 5)
+        statuses = job_statuses(app, ["completed"] * 5)
+    finally:
+        scheduler.shutdown()
+
+    assert len(runs) == 5
+    assert max(int(concurrent) for (_, concurrent) in runs) <= 2
+    assert statuses == ["completed"] * 5
+
+
+def test_executions_run_in_scheduled_order(app: Flask, fake_cli: str):
+    scheduler = LocalScheduler(chaostoolkit_cli_path=fake_cli, workers=1)
+    now = datetime.utcnow()
+    with app.app_context():
+        scheduler.schedule(make_context("third", now - timedelta(seconds=1)))
+        scheduler.schedule(make_context("first", now - timedelta(hours=1)))
+        scheduler.schedule(make_context("later", now + timedelta(hours=1)))
+        scheduler.schedule(make_context("second", now - timedelta(minutes=1)))
+
+    scheduler.start(app)
+    try:
+        runs = read_runs(fake_cli, 3)
+        statuses = job_statuses(app, ["completed"] * 3 + ["pending"])
+    finally:
+        scheduler.shutdown()
+
+    assert [title for (title, _) in runs] == ["first", "second", "third"]
+    assert statuses == ["completed"] * 3 + ["pending"]
+
+
+def test_pending_executions_survive_restart(app: Flask, fake_cli: str):
+    previous = LocalScheduler(chaostoolkit_cli_path=fake_cli, workers=1)
+    with app.app_context():
+        now = datetime.utcnow()
+        for title in ("interrupted", "elsewhere", "pending"):
+            previous.schedule(make_context(title, now))
+        (interrupted, elsewhere, _) = LocalScheduleJob.query.order_by(
+            LocalScheduleJob.created).all()
+        # the process which ran it died, its lease expired
+        interrupted.status = ScheduleStatus.active
+        interrupted.owner = "dead"
+        interrupted.lease_expires = now - timedelta(seconds=1)
+        # still run by another process
+        elsewhere.status = ScheduleStatus.active
+        elsewhere.owner = "alive"
+        elsewhere.lease_expires = now + timedelta(hours=1)
+        db.session.commit()
+
+    scheduler = LocalScheduler(chaostoolkit_cli_path=fake_cli, workers=1)
+    scheduler.start(app)
+    try:
+        runs = read_runs(fake_cli, 2)
+        statuses = job_statuses(app, ["active"] + ["completed"] * 2)
+    finally:
+        scheduler.shutdown()
+
+    assert sorted(title for (title, _) in runs) == ["interrupted", "pending"]
+    assert statuses == ["active"] + ["completed"] * 2
+
+
+def test_running_executions_are_leased(app: Flask, slow_cli: str):
+    scheduler = LocalScheduler(
+        chaostoolkit_cli_path=slow_cli, workers=1, lease_duration=0.3)
+    scheduler.start(app)
+    try:
+        with app.app_context():
+            scheduler.schedule(make_context("leased", datetime.utcnow()))
+        assert job_statuses(app, ["active"]) == ["active"]
+
+        time.sleep(0.6)
+        with app.app_context():
+            try:
+                job = LocalScheduleJob.query.one()
+                assert job.owner == scheduler.owner
+                assert job.lease_expires > datetime.utcnow()
+            finally:
+                db.session.remove()
+    finally:
+        scheduler.shutdown()
+
+    # released for the next process to run it again
+    with app.app_context():
+        job = LocalScheduleJob.query.one()
+        assert job.status == ScheduleStatus.pending
+        assert job.owner is None
+
+
+def test_execution_without_valid_token_is_cancelled(app: Flask,
+                                                    fake_cli: str):
+    scheduler = LocalScheduler(chaostoolkit_cli_path=fake_cli, workers=1)
+    scheduler.start(app)
+    try:
+        with app.app_context():
+            context = make_context("revoked", datetime.utcnow())
+            context["token_id"] = shortuuid.encode(uuid.uuid4())
+            scheduler.schedule(context)
+            assert "token" not in LocalScheduleJob.query.one().context
+        statuses = job_statuses(app, ["cancelled"])
+    finally:
+        scheduler.shutdown()
+
+    assert statuses == ["cancelled"]
+    assert read_runs(fake_cli, 1, timeout=0.5) == []
+
+
+def test_cancelled_execution_does_not_run(app: Flask, fake_cli: str):
+    scheduler = LocalScheduler(chaostoolkit_cli_path=fake_cli, workers=1)
+    scheduler.start(app)
+    try:
+        with app.app_context():
+            later = datetime.utcnow() + timedelta(seconds=1)
+            info = scheduler.schedule(make_context("cancelled", later))
+            scheduler.schedule(make_context("kept", later))
+        scheduler.cancel(info["id"])
+
+        statuses = job_statuses(app, ["cancelled", "completed"])
+        runs = read_runs(fake_cli, 1)
+    finally:
+        scheduler.shutdown()
+
+    assert [title for (title, _) in runs] == ["kept"]
+    assert statuses == ["cancelled", "completed"]
+
+
+def test_output_is_pumped_from_both_pipes(tmpdir):
+    proc = subprocess.Popen(
+        [sys.executable, "-c", VERBOSE_SCRIPT],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    path = os.path.join(str(tmpdir), "output.log")
+    output = ExecutionOutput(RotatingLog(path, max_bytes=0), max_lines=10)
+    pump_output(proc, output)
+    assert proc.wait(timeout=10) == 0
+    output.close()
+
+    assert output.count == 40001
+    result = output.tail(lines=3)
+    assert result["lines"][-1] == "done"
+    assert result["next"] == 40001
+    assert result["running"] is False
+    assert output.tail(lines=5, since=40000)["lines"] == ["done"]
+    assert output.tail(lines=5, since=40001) == {
+        "lines": [], "next": 40001, "running": False}
+
+    assert tail_file(path, 1) == ["done"]
+    with open(path) as f:
+        assert len(f.read().splitlines()) == 40001
+
+
+def test_output_log_is_rotated(app: Flask, tmpdir):
+    path = os.path.join(str(tmpdir), "chaos")
+    with open(path, "w") as f:
+        f.write("#!{}{}".format(sys.executable, VERBOSE_SCRIPT))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    output_dir = os.path.join(str(tmpdir), "output")
+
+    scheduler = LocalScheduler(
+        chaostoolkit_cli_path=path, workers=1, output_dir=output_dir,
+        output_lines=10, output_max_bytes=65536, output_backup_count=2)
+    scheduler.start(app)
+    try:
+        with app.app_context():
+            info = scheduler.schedule(
+                make_context("verbose", datetime.utcnow()))
+        statuses = job_statuses(app, ["completed"])
+    finally:
+        scheduler.shutdown()
+
+    assert statuses == ["completed"]
+    assert sorted(os.listdir(output_dir)) == [
+        "{}.log".format(info["id"]), "{}.log.1".format(info["id"]),
+        "{}.log.2".format(info["id"])]
+    for name in os.listdir(output_dir):
+        assert os.path.getsize(os.path.join(output_dir, name)) <= 65536
+
+    result = scheduler.tail(info["id"], lines=2)
+    assert result["lines"][-1] == "done"
+    assert result["running"] is False
+    assert scheduler.tail(str(uuid.uuid4())) is None
+
+
+def test_supervisor_bounds_executions_per_org(app: Flask, fake_cli: str):
+    scheduler = SupervisorScheduler(
+        chaostoolkit_cli_path=fake_cli, concurrency=2, org_concurrency=1)
+    scheduler.start(app)
+    try:
+        now = datetime.utcnow()
+        ids = [
+            scheduler.schedule(
+                make_context("dude{}".format(i), now))["id"]
+            for i in range(3)
+        ]
+        ids.append(scheduler.schedule(
+            make_context("walter", now, org_name="Walter"))["id"])
+
+        runs = read_runs(fake_cli, 4)
+        statuses = [
+            supervised_status(scheduler, id, "completed") for id in ids]
+    finally:
+        scheduler.shutdown()
+
+    assert sorted(title for (title, _) in runs) == [
+        "dude0", "dude1", "dude2", "walter"]
+    assert max(int(concurrent) for (_, concurrent) in runs) <= 2
+    assert statuses == [{"status": "completed", "exit_code": 0}] * 4
+    assert scheduler.org_slots == {}
+
+
+def test_supervisor_terminates_timed_out_execution(
+        app: Flask, slow_cli: str):
+    scheduler = SupervisorScheduler(
+        chaostoolkit_cli_path=slow_cli, timeout=0.5)
+    scheduler.start(app)
+    try:
+        info = scheduler.schedule(make_context("slow", datetime.utcnow()))
+        status = supervised_status(scheduler, info["id"], "timedout")
+    finally:
+        scheduler.shutdown()
+
+    assert status["status"] == "timedout"
+    assert status["exit_code"] < 0
+    assert read_runs(slow_cli, 1, timeout=0.1) == []
+
+
+def test_supervisor_cancels_executions(app: Flask, slow_cli: str):
+    scheduler = SupervisorScheduler(chaostoolkit_cli_path=slow_cli)
+    scheduler.start(app)
+    try:
+        now = datetime.utcnow()
+        running = scheduler.schedule(make_context("running", now))
+        later = scheduler.schedule(
+            make_context("later", now + timedelta(hours=1)))
+        assert supervised_status(
+            scheduler, running["id"], "active")["status"] == "active"
+
+        started = time.monotonic()
+        scheduler.cancel(running["id"])
+        scheduler.cancel(later["id"])
+        statuses = [
+            supervised_status(scheduler, info["id"], "cancelled")
+            for info in (running, later)]
+        elapsed = time.monotonic() - started
+    finally:
+        scheduler.shutdown()
+
+    assert statuses == [{"status": "cancelled", "exit_code": None}] * 2
+    assert elapsed < 5
+    assert read_runs(slow_cli, 1, timeout=0.1) == []
+
+
+def test_supervisor_drains_running_executions_on_shutdown(
+        app: Flask, experiment: uuid.UUID, fake_cli: str):
+    now = datetime.utcnow()
+    later_id = make_schedule(app, experiment, now + timedelta(hours=1))
+    context = make_context("later", now + timedelta(hours=1))
+    context["id"] = shortuuid.encode(later_id)
+
+    scheduler = SupervisorScheduler(chaostoolkit_cli_path=fake_cli)
+    scheduler.start(app)
+    running = scheduler.schedule(make_context("running", now))
+    later = scheduler.schedule(context)
+    supervised_status(scheduler, running["id"], "active")
+    scheduler.shutdown()
+    get_schedule_progress_updater().flush()
+
+    assert scheduler.status(running["id"]) == {
+        "status": "completed", "exit_code": 0}
+    assert scheduler.status(later["id"]) == {
+        "status": "cancelled", "exit_code": None}
+    assert [title for (title, _) in read_runs(fake_cli, 1)] == ["running"]
+    # the schedule which did not start is dispatched again later on
+    assert load_schedule(app, later_id)["status"] == "pending"
+    with pytest.raises(RuntimeError):
+        scheduler.schedule(make_context("refused", now))
+
+
+def test_warm_runner_runs_experiments_in_process(app: Flask, tmpdir):
+    output_dir = os.path.join(str(tmpdir), "output")
+    scheduler = LocalScheduler(
+        chaostoolkit_cli_path=os.path.join(str(tmpdir), "missing"),
+        workers=1, output_dir=output_dir, runner="warm")
+    scheduler.start(app)
+    try:
+        with app.app_context():
+            ids = []
+            for i in range(2):
+                context = make_context(EXPERIMENT["title"], datetime.utcnow())
+                # nothing to publish to
+                context["hub_url"] = context["token"] = None
+                context["experiment"]["payload"] = EXPERIMENT
+                ids.append(scheduler.schedule(context)["id"])
+        statuses = job_statuses(app, ["completed"] * 2)
+    finally:
+        scheduler.shutdown()
+
+    assert statuses == ["completed"] * 2
+    for id in ids:
+        lines = scheduler.tail(id, lines=100)["lines"]
+        assert any(
+            "Running experiment: the dude abides" in line for line in lines)
+        assert any("Experiment ended with status: completed" in line
+                   for line in lines)
+
+
+def test_warm_workers_are_recycled(tmpdir):
+    pool = WarmPool(size=1, max_runs=2)
+    pool.start()
+    try:
+        pids = []
+        for i in range(3):
+            worker = pool.acquire()
+            pids.append(worker.process.pid)
+            output = ExecutionOutput(RotatingLog(
+                os.path.join(str(tmpdir), "{}.log".format(i))))
+            # an empty request fails but still counts as a run
+            assert worker.run({}, output) is None
+            output.close()
+            pool.release(worker)
+    finally:
+        pool.shutdown()
+
+    assert pids[0] == pids[1]
+    assert pids[2] != pids[1]
+    assert "KeyError" in output.tail()["lines"][-1]
+
+
+def test_warm_runner_is_validated():
+    with pytest.raises(ValueError):
+        LocalScheduler(runner="lukewarm")
+
+
+def test_schedule_moves_through_allowed_transitions_only():
+    s = Schedule(status=ScheduleStatus.pending)
+    started = datetime(2018, 9, 1, 10, 0, 0)
+    ended = started + timedelta(seconds=30)
+
+    assert s.transition(ScheduleStatus.completed, ended) is False
+    assert s.transition(ScheduleStatus.active, started) is True
+    assert s.transition(ScheduleStatus.completed, ended, 0) is True
+    assert (s.status, s.started, s.ended, s.exit_code) == (
+        ScheduleStatus.completed, started, ended, 0)
+
+    assert s.transition(ScheduleStatus.active, ended) is False
+    assert s.transition(ScheduleStatus.cancelled, ended) is False
+    assert s.status is ScheduleStatus.completed
+
+
+def test_progress_is_written_in_batches(app: Flask, experiment: uuid.UUID,
+                                        count_queries):
+    now = datetime.utcnow().replace(microsecond=0)
+    (done, unknown, cancelled, interrupted) = [
+        make_schedule(app, experiment, now) for _ in range(4)]
+    with app.app_context():
+        # published by the run of `done` and by another run meanwhile
+        executions = [
+            Execution(
+                account_id=uuid.uuid4(), org_id=uuid.uuid4(),
+                workspace_id=uuid.uuid4(), experiment_id=experiment,
+                timestamp=int(
+                    (now + timedelta(seconds=seconds)).timestamp() * 1000),
+                status="completed",
+                payload={"status": "completed", "start": start})
+            for (seconds, start) in ((5, "done"), (6, "other"))
+        ]
+        db.session.add_all(executions)
+        db.session.commit()
+        timestamp = executions[0].timestamp
+
+    updater = ScheduleProgressUpdater(app, flush_interval=0)
+    updater.report(done, ScheduleStatus.active, at=now)
+    updater.report(done, ScheduleStatus.completed, 0,
+                   at=now + timedelta(seconds=10), journal_start="done")
+    # without a journal, the run could have published either execution
+    updater.report(unknown, ScheduleStatus.active, at=now)
+    updater.report(unknown, ScheduleStatus.completed, 0,
+                   at=now + timedelta(seconds=10))
+    # the run cannot complete once it was cancelled
+    updater.report(cancelled, ScheduleStatus.active, at=now)
+    updater.report(cancelled, ScheduleStatus.cancelled, at=now)
+    updater.report(cancelled, ScheduleStatus.completed, 1, at=now)
+    updater.report(interrupted, ScheduleStatus.active, at=now)
+    updater.report(interrupted, ScheduleStatus.pending, at=now)
+
+    get_schedule_progress_updater().flush()
+    count_queries.reset()
+    updater.flush()
+    # loading the schedules, looking up the execution of each completed run
+    # along with the journals and the updates
+    assert count_queries.count <= 6
+
+    s = load_schedule(app, done)
+    assert s["status"] == "completed"
+    assert s["started"] == "{}Z".format(now.isoformat())
+    assert s["ended"] == "{}Z".format(
+        (now + timedelta(seconds=10)).isoformat())
+    assert s["exit_code"] == 0
+    assert s["execution_timestamp"] == timestamp
+    assert load_schedule(app, unknown)["status"] == "completed"
+    assert load_schedule(app, unknown)["execution_timestamp"] is None
+    assert load_schedule(app, cancelled)["status"] == "cancelled"
+    assert load_schedule(app, cancelled)["exit_code"] is None
+    assert load_schedule(app, interrupted)["status"] == "pending"
+    assert load_schedule(app, interrupted)["started"] is None
+
+    with app.app_context():
+        assert [s.id for s in Schedule.get_due()] == [interrupted]
+        assert Schedule.get_stuck(now + timedelta(hours=1)) == []
+
+
+def test_local_scheduler_reports_progress(app: Flask, experiment: uuid.UUID,
+                                          fake_cli: str):
+    now = datetime.utcnow()
+    schedule_id = make_schedule(app, experiment, now)
+    context = make_context("reported", now)
+    context["id"] = shortuuid.encode(schedule_id)
+
+    # the fake CLI does not publish, stand for its execution and another
+    # one published while it runs, which the journal of the run tells apart
+    timestamps = []
+    with app.app_context():
+        for start in ("someone else's", "reported"):
+            execution = Execution(
+                account_id=uuid.uuid4(), org_id=uuid.uuid4(),
+                workspace_id=uuid.uuid4(), experiment_id=experiment,
+                timestamp=int(datetime.utcnow().timestamp() * 1000),
+                status="completed", payload={"start": start})
+            db.session.add(execution)
+            db.session.commit()
+            timestamps.append(execution.timestamp)
+            time.sleep(0.01)
+
+    scheduler = LocalScheduler(chaostoolkit_cli_path=fake_cli, workers=1)
+    scheduler.start(app)
+    try:
+        with app.app_context():
+            scheduler.schedule(context)
+        job_statuses(app, ["completed"])
+    finally:
+        scheduler.shutdown()
+    get_schedule_progress_updater().flush()
+
+    s = load_schedule(app, schedule_id)
+    assert s["status"] == "completed"
+    assert s["exit_code"] == 0
+    assert s["started"] <= s["ended"]
+    assert s["execution_timestamp"] == timestamps[1]
+
+
+def test_supervisor_reports_progress_off_the_event_loop(
+        app: Flask, experiment: uuid.UUID, fake_cli: str, monkeypatch):
+    now = datetime.utcnow()
+    schedule_id = make_schedule(app, experiment, now)
+    context = make_context("reported", now)
+    context["id"] = shortuuid.encode(schedule_id)
+    with app.app_context():
+        execution = Execution(
+            account_id=uuid.uuid4(), org_id=uuid.uuid4(),
+            workspace_id=uuid.uuid4(), experiment_id=experiment,
+            status="completed", payload={"start": "reported"})
+        db.session.add(execution)
+        db.session.commit()
+        timestamp = execution.timestamp
+
+    # progress is written as soon as it is reported
+    interval = app.config["SCHEDULE_PROGRESS_FLUSH_INTERVAL"]
+    app.config["SCHEDULE_PROGRESS_FLUSH_INTERVAL"] = 0
+    setup_schedule_progress_updater(app)
+
+    flushed_from = []
+    flush = ScheduleProgressUpdater.flush
+
+    def record_flush(updater: ScheduleProgressUpdater):
+        flushed_from.append(threading.current_thread().name)
+        flush(updater)
+
+    monkeypatch.setattr(ScheduleProgressUpdater, "flush", record_flush)
+    try:
+        scheduler = SupervisorScheduler(chaostoolkit_cli_path=fake_cli)
+        scheduler.start(app)
+        try:
+            info = scheduler.schedule(context)
+            supervised_status(scheduler, info["id"], "completed")
+        finally:
+            scheduler.shutdown()
+        s = load_schedule(app, schedule_id)
+    finally:
+        monkeypatch.undo()
+        app.config["SCHEDULE_PROGRESS_FLUSH_INTERVAL"] = interval
+        setup_schedule_progress_updater(app)
+
+    assert s["status"] == "completed"
+    assert s["execution_timestamp"] == timestamp
+    assert flushed_from == ["supervisor-progress_0"] * 2
@@ -0,0 +1,345 @@
+-- Schema created by `chaoshub-dashboard run --create-tables` on SQLite with
+-- the Chaos Hub 0.1.0, which the database migrations upgrade from
+
+CREATE TABLE user_account (
+    id CHAR(32) NOT NULL,
+    joined_dt DATETIME DEFAULT CURRENT_TIMESTAMP,
+    closed_dt DATETIME,
+    inactive_dt DATETIME,
+    is_closed BOOLEAN,
+    is_active BOOLEAN,
+    PRIMARY KEY (id),
+    CHECK (is_closed IN (0, 1)),
+    CHECK (is_active IN (0, 1))
+);
+
+CREATE TABLE activity (
+    id CHAR(32) NOT NULL,
+    account_id CHAR(32),
+    org_id CHAR(32),
+    workspace_id CHAR(32),
+    experiment_id CHAR(32),
+    execution_id CHAR(32),
+    timestamp BIGINT,
+    kind VARCHAR,
+    visibility VARCHAR(13) NOT NULL,
+    title VARCHAR NOT NULL,
+    info VARCHAR,
+    extra TEXT,
+    PRIMARY KEY (id),
+    CONSTRAINT activityvisibility CHECK (visibility IN ('anonymous', 'authenticated', 'collaborator', 'owner'))
+);
+
+CREATE TABLE user_info (
+    id CHAR(32) NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
+    verified_email BOOLEAN,
+    username VARCHAR,
+    fullname VARCHAR,
+    details BLOB NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(account_id) REFERENCES user_account (id),
+    CHECK (verified_email IN (0, 1))
+);
+
+CREATE TABLE user_privacy (
+    id CHAR(32) NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    last_changed DATETIME DEFAULT CURRENT_TIMESTAMP,
+    details TEXT,
+    PRIMARY KEY (id),
+    FOREIGN KEY(account_id) REFERENCES user_account (id)
+);
+
+CREATE TABLE org (
+    id CHAR(32) NOT NULL,
+    account_id CHAR(32),
+    name VARCHAR NOT NULL,
+    name_lower VARCHAR NOT NULL,
+    kind VARCHAR(13) NOT NULL,
+    created_on DATETIME DEFAULT CURRENT_TIMESTAMP,
+    settings TEXT NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(account_id) REFERENCES user_account (id),
+    UNIQUE (name),
+    UNIQUE (name_lower),
+    CONSTRAINT orgtype CHECK (kind IN ('personal', 'collaborative'))
+);
+
+CREATE TABLE orgs_members (
+    org_id CHAR(32) NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    is_owner BOOLEAN,
+    PRIMARY KEY (org_id, account_id),
+    FOREIGN KEY(org_id) REFERENCES org (id),
+    FOREIGN KEY(account_id) REFERENCES user_account (id),
+    CHECK (is_owner IN (0, 1))
+);
+
+CREATE TABLE workspace (
+    id CHAR(32) NOT NULL,
+    name VARCHAR NOT NULL,
+    name_lower VARCHAR NOT NULL,
+    kind VARCHAR(9) NOT NULL,
+    org_id CHAR(32) NOT NULL,
+    settings TEXT NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT workspace_org_uniq UNIQUE (name, org_id),
+    CONSTRAINT workspacetype CHECK (kind IN ('personal', 'protected', 'public')),
+    FOREIGN KEY(org_id) REFERENCES org (id)
+);
+
+CREATE TABLE workspaces_members (
+    workspace_id CHAR(32) NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    is_owner BOOLEAN,
+    PRIMARY KEY (workspace_id, account_id),
+    FOREIGN KEY(workspace_id) REFERENCES workspace (id),
+    FOREIGN KEY(account_id) REFERENCES user_account (id),
+    CHECK (is_owner IN (0, 1))
+);
+
+CREATE TABLE discovery (
+    id CHAR(32) NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    received_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    workspace_id CHAR(32) NOT NULL,
+    payload TEXT,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE experiment (
+    id CHAR(32) NOT NULL,
+    shared_ref CHAR(32) NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    suggested_experiment_id CHAR(32),
+    org_id CHAR(32) NOT NULL,
+    workspace_id CHAR(32) NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE init (
+    id CHAR(32) NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    received_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    workspace_id CHAR(32) NOT NULL,
+    payload TEXT,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE recommendation (
+    id CHAR(32) NOT NULL,
+    recommendation_type VARCHAR,
+    checksum VARCHAR NOT NULL,
+    last_updated DATETIME,
+    rating FLOAT,
+    meta TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE recommendation_tag (
+    id INTEGER NOT NULL,
+    value VARCHAR NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (value)
+);
+
+CREATE TABLE schedule (
+    id CHAR(32) NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    scheduled DATETIME NOT NULL,
+    status VARCHAR(9) NOT NULL,
+    org_id CHAR(32) NOT NULL,
+    workspace_id CHAR(32) NOT NULL,
+    experiment_id CHAR(32) NOT NULL,
+    token_id CHAR(32) NOT NULL,
+    definition TEXT,
+    info TEXT,
+    PRIMARY KEY (id),
+    CONSTRAINT schedulestatus CHECK (status IN ('pending', 'active', 'completed', 'cancelled'))
+);
+
+CREATE TABLE execution (
+    id CHAR(32) NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    timestamp BIGINT,
+    org_id CHAR(32) NOT NULL,
+    workspace_id CHAR(32) NOT NULL,
+    experiment_id CHAR(32) NOT NULL,
+    status VARCHAR,
+    payload TEXT,
+    PRIMARY KEY (id),
+    CONSTRAINT index_per_experiment_uniq UNIQUE (timestamp, experiment_id),
+    FOREIGN KEY(experiment_id) REFERENCES experiment (id) ON DELETE CASCADE
+);
+
+CREATE TABLE recommendation_tags_assoc (
+    recommendation_id BINARY(16) NOT NULL,
+    tag_id INTEGER NOT NULL,
+    PRIMARY KEY (recommendation_id, tag_id),
+    FOREIGN KEY(recommendation_id) REFERENCES recommendation (id),
+    FOREIGN KEY(tag_id) REFERENCES recommendation_tag (id)
+);
+
+CREATE TABLE account (
+    id CHAR(32) NOT NULL,
+    joined_on DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    closed_since DATETIME,
+    inactive_since DATETIME,
+    is_closed BOOLEAN,
+    is_active BOOLEAN,
+    oauth_provider VARCHAR,
+    oauth_provider_sub VARCHAR,
+    PRIMARY KEY (id),
+    CONSTRAINT oauth_provider_sub_uniq UNIQUE (oauth_provider, oauth_provider_sub),
+    UNIQUE (id),
+    CHECK (is_closed IN (0, 1)),
+    CHECK (is_active IN (0, 1))
+);
+
+CREATE TABLE client (
+    client_id VARCHAR(48),
+    client_secret VARCHAR(120) NOT NULL,
+    issued_at INTEGER NOT NULL,
+    expires_at INTEGER NOT NULL,
+    redirect_uri TEXT NOT NULL,
+    token_endpoint_auth_method VARCHAR(48),
+    grant_type TEXT NOT NULL,
+    response_type TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    client_name VARCHAR(100),
+    client_uri TEXT,
+    logo_uri TEXT,
+    contact TEXT,
+    tos_uri TEXT,
+    policy_uri TEXT,
+    jwks_uri TEXT,
+    jwks_text TEXT,
+    i18n_metadata TEXT,
+    software_id VARCHAR(36),
+    software_version VARCHAR(48),
+    id INTEGER NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(account_id) REFERENCES account (id) ON DELETE CASCADE
+);
+
+CREATE TABLE access_token (
+    client_id VARCHAR(48),
+    token_type VARCHAR(40),
+    access_token VARCHAR(255) NOT NULL,
+    refresh_token VARCHAR(255),
+    scope TEXT,
+    revoked BOOLEAN,
+    issued_at INTEGER NOT NULL,
+    expires_in INTEGER NOT NULL,
+    id CHAR(32) NOT NULL,
+    name VARCHAR NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    last_used_on DATETIME,
+    PRIMARY KEY (id),
+    UNIQUE (access_token),
+    CHECK (revoked IN (0, 1)),
+    UNIQUE (id),
+    FOREIGN KEY(account_id) REFERENCES account (id) ON DELETE CASCADE
+);
+
+CREATE TABLE provider_token (
+    client_id VARCHAR(48),
+    token_type VARCHAR(40),
+    access_token VARCHAR(255) NOT NULL,
+    refresh_token VARCHAR(255),
+    scope TEXT,
+    revoked BOOLEAN,
+    issued_at INTEGER NOT NULL,
+    expires_in INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    name VARCHAR(20) NOT NULL,
+    account_id CHAR(32),
+    PRIMARY KEY (id),
+    UNIQUE (access_token),
+    CHECK (revoked IN (0, 1)),
+    FOREIGN KEY(account_id) REFERENCES account (id) ON DELETE CASCADE
+);
+
+CREATE TABLE local_account (
+    id CHAR(32) NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    username VARCHAR NOT NULL,
+    password BLOB NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (id),
+    FOREIGN KEY(account_id) REFERENCES account (id) ON DELETE CASCADE
+);
+
+CREATE TABLE api_access_token (
+    id CHAR(32) NOT NULL,
+    name VARCHAR NOT NULL,
+    account_id CHAR(32) NOT NULL,
+    last_used_on DATETIME,
+    client_id VARCHAR(48),
+    token_type VARCHAR(40),
+    access_token VARCHAR(255) NOT NULL,
+    refresh_token VARCHAR(255),
+    scope TEXT,
+    revoked BOOLEAN NOT NULL,
+    issued_at INTEGER NOT NULL,
+    expires_in INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT name_account_uniq UNIQUE (name, account_id),
+    UNIQUE (access_token),
+    CHECK (revoked IN (0, 1))
+);
+
+CREATE INDEX ix_user_info_username ON user_info (username);
+
+CREATE INDEX ix_user_info_fullname ON user_info (fullname);
+
+CREATE INDEX ix_discovery_workspace_id ON discovery (workspace_id);
+
+CREATE INDEX ix_discovery_account_id ON discovery (account_id);
+
+CREATE INDEX ix_experiment_suggested_experiment_id ON experiment (suggested_experiment_id);
+
+CREATE INDEX ix_experiment_workspace_id ON experiment (workspace_id);
+
+CREATE INDEX ix_experiment_shared_ref ON experiment (shared_ref);
+
+CREATE INDEX ix_experiment_org_id ON experiment (org_id);
+
+CREATE INDEX ix_experiment_account_id ON experiment (account_id);
+
+CREATE INDEX ix_init_workspace_id ON init (workspace_id);
+
+CREATE INDEX ix_init_account_id ON init (account_id);
+
+CREATE INDEX ix_recommendation_recommendation_type ON recommendation (recommendation_type);
+
+CREATE INDEX ix_schedule_org_id ON schedule (org_id);
+
+CREATE INDEX ix_schedule_experiment_id ON schedule (experiment_id);
+
+CREATE INDEX ix_schedule_account_id ON schedule (account_id);
+
+CREATE INDEX ix_schedule_workspace_id ON schedule (workspace_id);
+
+CREATE INDEX ix_execution_org_id ON execution (org_id);
+
+CREATE INDEX ix_execution_workspace_id ON execution (workspace_id);
+
+CREATE INDEX ix_execution_account_id ON execution (account_id);
+
+CREATE INDEX ix_client_client_id ON client (client_id);
+
+CREATE INDEX ix_access_token_refresh_token ON access_token (refresh_token);
+
+CREATE INDEX ix_provider_token_refresh_token ON provider_token (refresh_token);
+
+CREATE UNIQUE INDEX ix_local_account_username ON local_account (username);
+
+CREATE INDEX ix_api_access_token_refresh_token ON api_access_token (refresh_token);
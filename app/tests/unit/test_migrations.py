@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import logging.config
+import os.path
+import sqlite3
+from typing import Any, Dict
+
+from flask import Flask
+from flask_migrate import Migrate, upgrade
+from sqlalchemy import create_engine, inspect
+
+import chaoshubdashboard
+from chaoshubdashboard.model import db
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(chaoshubdashboard.__file__), "migrations")
+BASELINE_SCHEMA = os.path.join(os.path.dirname(__file__), "schema-0.1.0.sql")
+
+
+def describe_schema(db_uri: str) -> Dict[str, Any]:
+    """
+    Describe the tables of the database by their columns, indexes and
+    constraints. Trigram indexes only exist on PostgreSQL and column types
+    differ between SQLite versions of the schema, they are left out.
+    """
+    engine = create_engine(db_uri)
+    try:
+        inspector = inspect(engine)
+        schema = {}
+        for table in inspector.get_table_names():
+            if table == "alembic_version":
+                continue
+
+            schema[table] = {
+                "columns": {
+                    c["name"]: c["nullable"]
+                    for c in inspector.get_columns(table)
+                },
+                "indexes": {
+                    i["name"]: (tuple(i["column_names"]), bool(i["unique"]))
+                    for i in inspector.get_indexes(table)
+                    if not i["name"].endswith("_trgm_idx")
+                },
+                "foreign_keys": sorted(
+                    (tuple(f["constrained_columns"]), f["referred_table"])
+                    for f in inspector.get_foreign_keys(table)),
+                "unique": sorted(
+                    tuple(u["column_names"])
+                    for u in inspector.get_unique_constraints(table))
+            }
+        return schema
+    finally:
+        engine.dispose()
+
+
+def test_migrations_upgrade_the_baseline_schema_to_the_models(
+        tmpdir, monkeypatch):
+    migrated = str(tmpdir.join("migrated.db"))
+    expected = str(tmpdir.join("expected.db"))
+
+    with open(BASELINE_SCHEMA) as f:
+        conn = sqlite3.connect(migrated)
+        conn.executescript(f.read())
+        conn.close()
+
+    # the migration environment configures logging for the command line,
+    # which would disable the loggers of the other tests
+    monkeypatch.setattr(logging.config, "fileConfig", lambda *a, **kw: None)
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///{}".format(migrated)
+    Migrate(app, db, directory=MIGRATIONS_DIR)
+    with app.app_context():
+        upgrade()
+
+    engine = create_engine("sqlite:///{}".format(expected))
+    db.Model.metadata.create_all(engine)
+    engine.dispose()
+
+    assert describe_schema("sqlite:///{}".format(migrated)) == \
+        describe_schema("sqlite:///{}".format(expected))
@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
+import uuid
+
 from flask import Flask
 import pytest
+import shortuuid
+from sqlalchemy.dialects import postgresql, sqlite
 
-from chaoshubdashboard.model import get_user_info_secret_key
+from chaoshubdashboard.model import format_cursor, \
+    get_user_info_secret_key, JSONB, parse_cursor, UUID
 
 
 def test_get_user_info_secret_key(app: Flask):
@@ -16,3 +21,42 @@ def test_get_user_info_secret_key_requires_key_to_be_set(app: Flask):
         with pytest.raises(RuntimeError) as x:
             get_user_info_secret_key()
         assert "User profile secret key not set!" in str(x)
+
+
+def test_jsonb_is_native_on_postgresql():
+    impl = JSONB().dialect_impl(postgresql.dialect())
+    assert isinstance(impl.load_dialect_impl(postgresql.dialect()),
+                      postgresql.JSONB)
+
+
+def test_jsonb_is_text_on_other_dialects():
+    impl = JSONB().dialect_impl(sqlite.dialect())
+    assert impl.compile(dialect=sqlite.dialect()) == "TEXT"
+
+    value = {"status": "completed"}
+    stored = impl.process_bind_param(value, sqlite.dialect())
+    assert impl.process_result_value(stored, sqlite.dialect()) == value
+
+
+def test_uuid_is_native_on_postgresql():
+    assert UUID().compile(dialect=postgresql.dialect()) == "UUID"
+
+
+def test_uuid_is_stored_as_hex_on_other_dialects():
+    impl = UUID().dialect_impl(sqlite.dialect())
+    assert impl.compile(dialect=sqlite.dialect()) == "CHAR(32)"
+
+    value = uuid.uuid4()
+    stored = impl.process_bind_param(value, sqlite.dialect())
+    assert stored == value.hex
+    assert impl.process_result_value(stored, sqlite.dialect()) == value
+
+
+def test_parse_cursor():
+    identifier = uuid.uuid4()
+    cursor = format_cursor(1000, shortuuid.encode(identifier))
+    assert parse_cursor(cursor) == (1000, identifier)
+    assert parse_cursor("1000") == (1000, None)
+    assert parse_cursor(None) is None
+    assert parse_cursor("yesterday") is None
+    assert parse_cursor("1000.!!!") is None
@@ -7,7 +7,9 @@ from flask_caching import Cache
 from requestlogger import WSGILogger
 from werkzeug.contrib.fixers import ProxyFix
 
-from chaoshubdashboard.app import serve_services
+import chaoshubdashboard.app
+from chaoshubdashboard.app import serve_services, \
+    setup_experiment_execution_schedulers
 from chaoshubdashboard.settings import load_settings
 
 
@@ -27,3 +29,21 @@ def test_serve_blueprint():
 
         wsgiapp = wsgiapp.application
         assert isinstance(wsgiapp, ProxyFix)
+
+
+def test_schedulers_are_only_started_on_demand(monkeypatch):
+    started = []
+    monkeypatch.setattr(
+        chaoshubdashboard.app, "register_schedulers", lambda config: {})
+    monkeypatch.setattr(
+        chaoshubdashboard.app, "setup_schedule_progress_updater",
+        lambda app: None)
+    monkeypatch.setattr(
+        chaoshubdashboard.app, "start_schedulers", started.append)
+
+    app = Flask(__name__)
+    setup_experiment_execution_schedulers(app)
+    assert started == []
+
+    setup_experiment_execution_schedulers(app, start=True)
+    assert started == [app]